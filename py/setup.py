@@ -440,6 +440,16 @@ setup(
     license="BSD",
     packages=packages if FX_ONLY else find_packages(),
     package_dir=package_dir if FX_ONLY else {},
+    # Lets torch.compile find the backends before `import torch_tensorrt`,
+    # which registers them as well, for the builds without entry points.
+    entry_points={}
+    if FX_ONLY or LEGACY
+    else {
+        "torch_dynamo_backends": [
+            "torch_tensorrt = torch_tensorrt.dynamo.backend.backends:torch_tensorrt_backend",
+            "aot_torch_tensorrt_aten = torch_tensorrt.dynamo.backend.backends:aot_torch_tensorrt_aten_backend",
+        ]
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Environment :: GPU :: NVIDIA CUDA",
@@ -1,6 +1,7 @@
 import logging
+import time
 from operator import truediv
-from typing import Any, List, Sequence, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import torch
 from torch_tensorrt import _C
@@ -27,6 +28,8 @@ class TRTModuleNext(torch.nn.Module):
         engine (torch.classess.tensorrt.Engine): Torch-TensorRT TensorRT Engine instance, manages [de]serialization, device configuration, profiling
         input_binding_names (List[str]): List of input TensorRT engine binding names in the order they would be passed to the TRT modules
         output_binding_names (List[str]): List of output TensorRT engine binding names in the order they should be returned
+        weight_name_map (Dict[str, RefitWeight]): Map from the engine weight names to the FX weights they are derived from, used by ``refit``
+        metrics (torch_tensorrt.fx.runtime_metrics.ModuleMetrics): Call counts and sampled latencies of the module, None while disabled, see ``enable_metrics``
     """
 
     def __init__(
@@ -36,6 +39,7 @@ class TRTModuleNext(torch.nn.Module):
         input_binding_names: List[str] = [],
         output_binding_names: List[str] = [],
         target_device: Device = Device._current_device(),
+        weight_name_map: Dict[str, Any] = None,
     ):
         """__init__ method for torch_tensorrt.TRTModuleNext
 
@@ -53,6 +57,7 @@ class TRTModuleNext(torch.nn.Module):
             input_binding_names (List[str]): List of input TensorRT engine binding names in the order they would be passed to the TRT modules
             output_binding_names (List[str]): List of output TensorRT engine binding names in the order they should be returned
             target_device: (torch_tensorrt.Device): Device to instantiate TensorRT engine on. Must be a compatible device i.e. same GPU model / compute capability as was used to build the engine
+            weight_name_map (Dict[str, RefitWeight]): ``TRTInterpreterResult.weight_name_map`` of a refittable engine, required by ``refit``
 
         Example:
 
@@ -81,6 +86,13 @@ class TRTModuleNext(torch.nn.Module):
         self.input_binding_names = input_binding_names
         self.output_binding_names = output_binding_names
         self.name = name
+        self.weight_name_map = weight_name_map or {}
+        self.shape_histogram = None
+        # torch_tensorrt.fx.runtime_metrics, imported here so that importing
+        # torch_tensorrt doesn't import the FX frontend.
+        from torch_tensorrt.fx.runtime_metrics import ModuleMetrics
+
+        self.metrics = ModuleMetrics(self.name or None)
 
         if serialized_engine != bytearray():
             self.engine = torch.classes.tensorrt.Engine(
@@ -102,6 +114,7 @@ class TRTModuleNext(torch.nn.Module):
             self.engine.__getstate__() if self.engine is not None else None,
             self.input_binding_names,
             self.output_binding_names,
+            self.weight_name_map,
         )
 
     def set_extra_state(self, state):
@@ -126,6 +139,7 @@ class TRTModuleNext(torch.nn.Module):
 
         self.input_binding_names = state[2]
         self.output_binding_names = state[3]
+        self.weight_name_map = state[4] if len(state) > 4 else {}
 
     def forward(self, *inputs):
         """Implementation of the forward pass for a TensorRT engine
@@ -139,6 +153,11 @@ class TRTModuleNext(torch.nn.Module):
         if self.engine is None:
             raise RuntimeError("Engine has not been initalized yet.")
 
+        metrics = self.metrics
+        sampled = metrics is not None and metrics.sample()
+        if sampled:
+            start = time.perf_counter()
+
         assert len(inputs) == len(
             self.input_binding_names
         ), f"Wrong number of inputs, expected {len(self.input_binding_names)} got {len(inputs)}."
@@ -157,13 +176,120 @@ class TRTModuleNext(torch.nn.Module):
                 f"TRTModuleNext expects a flattened list of tensors as input, found non tensors: {non_tensors}"
             )
 
+        if self.shape_histogram is not None:
+            self.shape_histogram.record(
+                tuple(tuple(i.shape) for i in inputs), [i.dtype for i in inputs]
+            )
+
+        if sampled:
+            inputs_processed = time.perf_counter()
+
         outputs = torch.ops.tensorrt.execute_engine(list(inputs), self.engine)
 
+        if sampled:
+            # The runtime allocates the outputs along with the execution.
+            metrics.record(
+                tuple(tuple(i.shape) for i in inputs),
+                {
+                    "process_inputs": inputs_processed - start,
+                    "execute": time.perf_counter() - inputs_processed,
+                },
+                outputs,
+            )
+
         if len(outputs) == 1:
             return outputs[0]
 
         return tuple(outputs)
 
+    def enable_shape_recording(self, histogram=None):
+        """Count the input shapes of every forward call, e.g. to derive optimization profiles from served traffic
+
+        Keyword Arguments:
+            histogram (torch_tensorrt.fx.tools.shape_profiles.ShapeHistogram): Histogram to record into, a new one by default
+
+        Returns:
+            ShapeHistogram: The histogram the shapes are recorded into
+        """
+        from torch_tensorrt.fx.tools.shape_profiles import ShapeHistogram
+
+        self.shape_histogram = histogram if histogram is not None else ShapeHistogram()
+        return self.shape_histogram
+
+    def disable_shape_recording(self):
+        """Stop recording input shapes
+
+        Returns:
+            ShapeHistogram: The recorded histogram, None if recording was not enabled
+        """
+        histogram, self.shape_histogram = self.shape_histogram, None
+        return histogram
+
+    def enable_metrics(
+        self, name: Optional[str] = None, sample_rate: Optional[float] = None
+    ):
+        """Start the runtime metrics of the module over
+
+        Every call is counted, and one out of ``1 / sample_rate`` is timed and recorded, see ``torch_tensorrt.fx.runtime_metrics``
+
+        Keyword Arguments:
+            name (str): ``module`` label of the exported metrics, the name of the module by default
+            sample_rate (float): Fraction of the calls timed and recorded, in (0, 1], ``DEFAULT_SAMPLE_RATE`` by default
+
+        Returns:
+            ModuleMetrics: The metrics of the module
+        """
+        from torch_tensorrt.fx.runtime_metrics import DEFAULT_SAMPLE_RATE, ModuleMetrics
+
+        self.metrics = ModuleMetrics(
+            name or self.name or None,
+            DEFAULT_SAMPLE_RATE if sample_rate is None else sample_rate,
+        )
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stop counting calls
+
+        Returns:
+            ModuleMetrics: The metrics recorded so far, None if metrics were not enabled
+        """
+        metrics, self.metrics = self.metrics, None
+        return metrics
+
+    def refit(self, state_dict: Mapping[str, torch.Tensor], strict: bool = False):
+        """Update the engine weights with the values of ``state_dict`` without rebuilding it
+
+        The engine is deserialized, refitted and handed back to the runtime, so
+        it must have been built with refit enabled.
+
+        Args:
+            state_dict (Mapping[str, torch.Tensor]): New weights keyed by FX weight names, e.g. the state dict of the module that was lowered. Entries that are not weights of the engine are ignored
+            strict (bool): Raise if some weights of the engine are missing from ``state_dict``
+        """
+        if self.engine is None:
+            raise RuntimeError("Engine has not been initalized yet.")
+        if not self.weight_name_map:
+            raise RuntimeError(
+                "TRTModuleNext has no refittable weights, the engine must be built with refit enabled "
+                "from a module whose weights are not graph inputs, e.g. lifted by AOTAutograd."
+            )
+
+        import base64
+
+        import tensorrt as trt
+        from torch_tensorrt.fx.refit import refit_engine
+
+        serialized_engine_info = list(self.engine.__getstate__()[0])
+        runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        engine = runtime.deserialize_cuda_engine(
+            base64.b64decode(serialized_engine_info[3])
+        )
+        refit_engine(engine, self.weight_name_map, state_dict, strict)
+
+        torch.cuda.synchronize()
+        serialized_engine_info[3] = bytes(engine.serialize())
+        self.engine = torch.classes.tensorrt.Engine(serialized_engine_info)
+
     def enable_profiling(self, profiling_results_dir: str = None):
         """Enable the profiler to collect latency information about the execution of the engine
 
@@ -81,23 +81,79 @@ except:
         for lib in LINUX_LIBS:
             ctypes.CDLL(_find_lib(lib, LINUX_PATHS))
 
+import importlib
 import torch
 
 from torch_tensorrt._compile import *
 from torch_tensorrt._util import *
-from torch_tensorrt import ts
-from torch_tensorrt import ptq
 from torch_tensorrt._enums import *
 from torch_tensorrt import logging
 from torch_tensorrt._Input import Input
 from torch_tensorrt._Device import Device
 from torch_tensorrt._TRTModuleNext import TRTModuleNext
 
-from torch_tensorrt import fx
-
+# Frontends are imported on first access, e.g. torch_tensorrt.fx, to keep
+# `import torch_tensorrt` cheap for processes that only run compiled modules.
+# The torch.compile backends of torch_tensorrt.dynamo are found through the
+# torch_dynamo_backends entry points, and registered below for the builds
+# without them, see `_register_dynamo_backends`.
+_LAZY_SUBMODULES = {
+    "ts": "torch_tensorrt.ts",
+    "ptq": "torch_tensorrt.ptq",
+    "fx": "torch_tensorrt.fx",
+}
 if version.parse(torch.__version__) >= version.parse("2.dev"):
-    from torch_tensorrt import dynamo
-    from torch_tensorrt.dynamo import backend
+    _LAZY_SUBMODULES.update(
+        {
+            "dynamo": "torch_tensorrt.dynamo",
+            "backend": "torch_tensorrt.dynamo.backend",
+        }
+    )
+
+
+def _lazy_dynamo_backend(name: str):
+    def backend(gm, sample_inputs, **kwargs):
+        from torch_tensorrt.dynamo.backend import backends
+
+        return getattr(backends, name)(gm, sample_inputs, **kwargs)
+
+    backend.__name__ = name
+    return backend
+
+
+def _register_dynamo_backends():
+    """
+    Register the torch.compile backends, unless already registered, for the
+    installs whose entry points torch doesn't see, e.g. FX_ONLY builds, Bazel
+    or in-tree runs. The backends are imported on their first call.
+    """
+    import torch._dynamo
+
+    registered = torch._dynamo.list_backends(exclude_tags=())
+    for name, function in (
+        ("torch_tensorrt", "torch_tensorrt_backend"),
+        ("aot_torch_tensorrt_aten", "aot_torch_tensorrt_aten_backend"),
+    ):
+        if name not in registered:
+            torch._dynamo.register_backend(_lazy_dynamo_backend(function), name=name)
+
+
+# Importing torch._dynamo is too slow to be done here, when it is imported
+# later the backends are registered by torch_tensorrt.dynamo.backend.
+if "backend" in _LAZY_SUBMODULES and "torch._dynamo" in sys.modules:
+    _register_dynamo_backends()
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        module = importlib.import_module(_LAZY_SUBMODULES[name])
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_SUBMODULES))
 
 
 def _register_with_torch():
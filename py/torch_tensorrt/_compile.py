@@ -1,12 +1,11 @@
 from typing import List, Dict, Any
-import torch_tensorrt.ts
+import torch_tensorrt
 
 from torch_tensorrt import logging
 import torch
 import torch.fx
 from enum import Enum
 
-import torch_tensorrt.fx
 from torch_tensorrt.fx.utils import LowerPrecision
 
 
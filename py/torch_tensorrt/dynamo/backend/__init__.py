@@ -17,6 +17,9 @@ from torch_tensorrt.dynamo.backend._defaults import (
     MAX_WORKSPACE_SIZE,
     MIN_BLOCK_SIZE,
     PASS_THROUGH_BUILD_FAILURES,
+    PARALLEL_BUILD_WORKERS,
+    COST_MODEL_PARTITIONING,
+    REFIT,
 )
 
 
@@ -31,7 +34,7 @@ def compile(
     disable_tf32=False,
     sparse_weights=False,
     enabled_precisions=set(),
-    refit=False,
+    refit=REFIT,
     debug=DEBUG,
     capability=EngineCapability.default,
     num_avg_timing_iters=1,
@@ -54,7 +57,7 @@ def compile(
         "The Dynamo backend is an experimental feature, for which only the "
         + "following arguments are supported: "
         + "{enabled_precisions, debug, workspace_size, min_block_size, "
-        + "torch_executed_ops, pass_through_build_failures}"
+        + "torch_executed_ops, pass_through_build_failures, refit}"
     )
 
     if not isinstance(inputs, collections.abc.Sequence):
@@ -86,6 +89,7 @@ def compile(
         workspace_size=workspace_size,
         min_block_size=min_block_size,
         torch_executed_ops=torch_executed_ops,
+        refit=refit,
         **kwargs,
     )
 
@@ -109,6 +113,9 @@ def create_backend(
     min_block_size: int = MIN_BLOCK_SIZE,
     torch_executed_ops: Sequence[str] = set(),
     pass_through_build_failures: bool = PASS_THROUGH_BUILD_FAILURES,
+    parallel_build_workers: int = PARALLEL_BUILD_WORKERS,
+    cost_model_partitioning: bool = COST_MODEL_PARTITIONING,
+    refit: bool = REFIT,
     **kwargs,
 ):
     """Create torch.compile backend given specified arguments
@@ -118,6 +125,14 @@ def create_backend(
         debug: Whether to print out verbose debugging information
         workspace_size: Maximum workspace TRT is allowed to use for the module
         precision: Model Layer precision
+        parallel_build_workers: Number of processes building the engines of independent
+            TRT-accelerated submodules concurrently, 0 or 1 builds them one after another
+        cost_model_partitioning: Whether to keep TRT-accelerated blocks based on their
+            estimated FLOPs and memory traffic versus boundary transfer costs, instead of
+            their operator count versus min_block_size
+        refit: Whether to build refittable engines, whose weights can be updated in place
+            with TRTModule.refit instead of rebuilding them. AOTAutograd lifts the parameters
+            to graph inputs, only the weights left in the graph as constants are refittable
     Returns:
         Backend for torch.compile
     """
@@ -131,6 +146,9 @@ def create_backend(
         min_block_size=min_block_size,
         torch_executed_ops=torch_executed_ops,
         pass_through_build_failures=pass_through_build_failures,
+        parallel_build_workers=parallel_build_workers,
+        cost_model_partitioning=cost_model_partitioning,
+        refit=refit,
     )
 
     return partial(
@@ -6,3 +6,6 @@ DEBUG = False
 MAX_WORKSPACE_SIZE = 20 << 30
 MIN_BLOCK_SIZE = 5
 PASS_THROUGH_BUILD_FAILURES = False
+PARALLEL_BUILD_WORKERS = 0
+COST_MODEL_PARTITIONING = False
+REFIT = False
@@ -8,6 +8,9 @@ from torch_tensorrt.dynamo.backend._defaults import (
     MAX_WORKSPACE_SIZE,
     MIN_BLOCK_SIZE,
     PASS_THROUGH_BUILD_FAILURES,
+    PARALLEL_BUILD_WORKERS,
+    COST_MODEL_PARTITIONING,
+    REFIT,
 )
 
 
@@ -19,3 +22,6 @@ class CompilationSettings:
     min_block_size: int = MIN_BLOCK_SIZE
     torch_executed_ops: Sequence[str] = field(default_factory=set)
     pass_through_build_failures: bool = PASS_THROUGH_BUILD_FAILURES
+    parallel_build_workers: int = PARALLEL_BUILD_WORKERS
+    cost_model_partitioning: bool = COST_MODEL_PARTITIONING
+    refit: bool = REFIT
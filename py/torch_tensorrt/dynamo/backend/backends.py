@@ -1,8 +1,8 @@
 import logging
 from typing import Sequence
 import torch
+import torch_tensorrt
 from functools import partial
-import torch._dynamo as td
 
 from torch_tensorrt.dynamo.backend._settings import CompilationSettings
 from torch_tensorrt.dynamo.backend.lowering._decompositions import (
@@ -10,9 +10,16 @@ from torch_tensorrt.dynamo.backend.lowering._decompositions import (
 )
 from torch_tensorrt.dynamo.backend.lowering._partition import (
     partition,
-    get_submod_inputs,
+    capture_submod_inputs,
 )
-from torch_tensorrt.dynamo.backend.conversion import convert_module
+from torch_tensorrt.dynamo.backend.lowering._cost_model import PartitionCostModel
+from torch_tensorrt.dynamo.backend.conversion import (
+    convert_module,
+    create_trt_module,
+    interpret_module,
+)
+from torch_tensorrt.fx.input_tensor_spec import InputTensorSpec
+from torch_tensorrt.fx.tools.parallel_build import build_engines_in_parallel
 
 from torch._dynamo.backends.common import fake_tensor_unsupported
 
@@ -22,7 +29,6 @@ from torch._functorch.aot_autograd import aot_module_simplified, make_boxed_comp
 logger = logging.getLogger(__name__)
 
 
-@td.register_backend(name="torch_tensorrt")
 @fake_tensor_unsupported
 def torch_tensorrt_backend(
     gm: torch.fx.GraphModule,
@@ -34,7 +40,6 @@ def torch_tensorrt_backend(
     return DEFAULT_BACKEND(gm, sample_inputs, settings=settings)
 
 
-@td.register_backend(name="aot_torch_tensorrt_aten")
 @fake_tensor_unsupported
 def aot_torch_tensorrt_aten_backend(
     gm: torch.fx.GraphModule,
@@ -118,22 +123,51 @@ def _compile_module(
         verbose=settings.debug,
         min_block_size=settings.min_block_size,
         torch_executed_ops=settings.torch_executed_ops,
+        cost_model=PartitionCostModel() if settings.cost_model_partitioning else None,
     )
 
     # Iterate over all components that can be accelerated
     # Generate the corresponding TRT Module for those
-    for name, _ in partitioned_module.named_children():
-        submodule = getattr(partitioned_module, name)
+    submodule_names = [name for name, _ in partitioned_module.named_children()]
+
+    # Get the inputs of all submodules with a single forward pass. Only their
+    # shapes and dtypes are needed to build the engines, so no activations are kept
+    submodule_inputs = capture_submod_inputs(
+        partitioned_module,
+        submodule_names,
+        sample_inputs,
+        capture_mode="meta",
+    )
 
-        # Get submodule inputs
-        submodule_inputs = get_submod_inputs(
-            partitioned_module, submodule, sample_inputs
+    if settings.parallel_build_workers > 1 and len(submodule_names) > 1:
+        # Build the engines of all submodules concurrently, then replace
+        # the FX Modules in a deterministic order
+        results = build_engines_in_parallel(
+            partial(interpret_module, settings=settings),
+            [
+                (
+                    name,
+                    (
+                        getattr(partitioned_module, name),
+                        InputTensorSpec.from_tensors(submodule_inputs[name]),
+                    ),
+                )
+                for name in submodule_names
+            ],
+            settings.parallel_build_workers,
         )
+        for name in submodule_names:
+            setattr(partitioned_module, name, create_trt_module(results[name]))
+
+        return partitioned_module
+
+    for name in submodule_names:
+        submodule = getattr(partitioned_module, name)
 
         # Create TRT Module from submodule
         trt_mod = convert_module(
             submodule,
-            submodule_inputs,
+            submodule_inputs[name],
             settings=settings,
         )
 
@@ -141,3 +175,7 @@ def _compile_module(
         setattr(partitioned_module, name, trt_mod)
 
     return partitioned_module
+
+
+# Registered by `import torch_tensorrt` when torch._dynamo was loaded already.
+torch_tensorrt._register_dynamo_backends()
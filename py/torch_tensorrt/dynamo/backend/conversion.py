@@ -1,3 +1,4 @@
+import logging
 from typing import Sequence, Union
 import torch
 from torch_tensorrt.fx.trt_module import TRTModule
@@ -6,32 +7,35 @@ from torch_tensorrt.dynamo.backend._settings import CompilationSettings
 from torch_tensorrt.fx.fx2trt import (
     InputTensorSpec,
     TRTInterpreter,
+    TRTInterpreterResult,
 )
 
 import tensorrt as trt
 
+logger = logging.getLogger(__name__)
 
-def convert_module(
+
+def interpret_module(
     module: torch.fx.GraphModule,
-    inputs: Sequence[torch.Tensor],
+    input_specs: Sequence[InputTensorSpec],
     settings: CompilationSettings = CompilationSettings(),
-) -> Union[TRTModuleNext, TRTModule]:
-    """Convert an FX module to a TRT module
+) -> TRTInterpreterResult:
+    """Build the TRT engine of an FX module
     Args:
         module: FX GraphModule to convert
-        inputs: Sequence of Tensors representing inputs to the module
+        input_specs: Sequence of InputTensorSpec describing the inputs to the module
         settings: Compilation settings
     Returns:
-        TRTModule or TRTModuleNext
+        TRTInterpreterResult
     """
     interp = TRTInterpreter(
         module,
-        InputTensorSpec.from_tensors(inputs),
+        input_specs,
         explicit_batch_dimension=True,
         logger_level=(trt.Logger.VERBOSE if settings.debug else trt.Logger.WARNING),
     )
 
-    r = interp.run(
+    interp_result = interp.run(
         max_workspace_size=settings.workspace_size,
         lower_precision=settings.precision,
         profiling_verbosity=(
@@ -39,6 +43,51 @@ def convert_module(
             if settings.debug
             else trt.ProfilingVerbosity.LAYER_NAMES_ONLY
         ),
+        refit=settings.refit,
+    )
+
+    # AOTAutograd lifts the parameters to graph inputs, so only the constants
+    # left in the graph, if any, can be refitted.
+    if settings.refit and not interp_result.weight_name_map:
+        logger.warning(
+            "refit is enabled but the engine has no weights refittable from a "
+            "state dict, the parameters of the module were lifted to graph "
+            "inputs. TRTModule.refit will raise."
+        )
+
+    return interp_result
+
+
+def create_trt_module(
+    interp_result: TRTInterpreterResult,
+) -> Union[TRTModuleNext, TRTModule]:
+    """Wrap the result of an interpreter run into a TRT module
+    Args:
+        interp_result: Result of the TRTInterpreter run
+    Returns:
+        TRTModule or TRTModuleNext
+    """
+    return TRTModule(
+        engine=interp_result.engine,
+        input_names=interp_result.input_names,
+        output_names=interp_result.output_names,
+        weight_name_map=interp_result.weight_name_map,
     )
 
-    return TRTModule(*r)
+
+def convert_module(
+    module: torch.fx.GraphModule,
+    inputs: Sequence[torch.Tensor],
+    settings: CompilationSettings = CompilationSettings(),
+) -> Union[TRTModuleNext, TRTModule]:
+    """Convert an FX module to a TRT module
+    Args:
+        module: FX GraphModule to convert
+        inputs: Sequence of Tensors representing inputs to the module
+        settings: Compilation settings
+    Returns:
+        TRTModule or TRTModuleNext
+    """
+    return create_trt_module(
+        interpret_module(module, InputTensorSpec.from_tensors(inputs), settings)
+    )
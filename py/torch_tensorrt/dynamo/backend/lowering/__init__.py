@@ -4,4 +4,8 @@ from torch_tensorrt.dynamo.backend.lowering._decompositions import (
 from torch_tensorrt.dynamo.backend.lowering._partition import (
     partition,
     get_submod_inputs,
+    capture_submod_inputs,
+)
+from torch_tensorrt.dynamo.backend.lowering._cost_model import (
+    PartitionCostModel,
 )
@@ -0,0 +1,177 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Sequence, Set, Tuple
+
+import torch
+from torch.fx.node import _get_qualified_name
+
+
+logger = logging.getLogger(__name__)
+
+
+# Operators whose cost is dominated by a reduction over their inner dimension
+_MATMUL_OPS = {
+    "torch.ops.aten.mm",
+    "torch.ops.aten.bmm",
+    "torch.ops.aten.addmm",
+    "torch.ops.aten.baddbmm",
+    "torch.ops.aten.matmul",
+    "torch.ops.aten.linear",
+}
+_CONVOLUTION_OPS = {
+    "torch.ops.aten.convolution",
+    "torch.ops.aten.conv1d",
+    "torch.ops.aten.conv2d",
+    "torch.ops.aten.conv3d",
+}
+
+
+def _node_shape_and_dtype(node: Any) -> Optional[Tuple[Sequence[int], torch.dtype]]:
+    """Shape and dtype of the tensor produced by a node, from its metadata"""
+    if not isinstance(node, torch.fx.Node):
+        return None
+
+    val = node.meta.get("val", None)
+    if isinstance(val, torch.Tensor):
+        return tuple(val.shape), val.dtype
+
+    tensor_meta = node.meta.get("tensor_meta", None)
+    if tensor_meta is not None and hasattr(tensor_meta, "shape"):
+        return tuple(tensor_meta.shape), tensor_meta.dtype
+
+    return None
+
+
+def _numel(shape: Sequence[int]) -> int:
+    try:
+        return int(math.prod(int(s) for s in shape))
+    except TypeError:
+        # Symbolic dimensions
+        return 0
+
+
+def tensor_bytes(node: Any) -> Optional[int]:
+    """Size in bytes of the tensor produced by a node, None if unknown"""
+    shape_and_dtype = _node_shape_and_dtype(node)
+    if shape_and_dtype is None:
+        return None
+    shape, dtype = shape_and_dtype
+    return _numel(shape) * torch.empty((), dtype=dtype).element_size()
+
+
+def estimate_flops(node: torch.fx.Node) -> Optional[int]:
+    """Estimated floating point operations of a node, None if unknown
+
+    Matrix multiplications and convolutions are counted as two operations per
+    multiply-accumulate, every other operator as one operation per output element
+    """
+    output = _node_shape_and_dtype(node)
+    if output is None:
+        return None
+    output_numel = _numel(output[0])
+
+    target_name = (
+        _get_qualified_name(node.target) if callable(node.target) else str(node.target)
+    )
+    # Strip the overload, e.g. torch.ops.aten.mm.default
+    op_name = target_name.rsplit(".", 1)[0] if "." in target_name else target_name
+
+    tensor_args = [
+        _node_shape_and_dtype(arg)
+        for arg in node.args
+        if isinstance(arg, torch.fx.Node)
+    ]
+    tensor_args = [arg for arg in tensor_args if arg is not None]
+
+    if (op_name in _MATMUL_OPS or target_name in _MATMUL_OPS) and tensor_args:
+        # The reduction dimension is the last one of the (last) left-hand operand
+        lhs_shape = tensor_args[-2][0] if len(tensor_args) >= 2 else tensor_args[0][0]
+        reduction = int(lhs_shape[-1]) if len(lhs_shape) > 0 else 1
+        return 2 * output_numel * reduction
+
+    if (op_name in _CONVOLUTION_OPS or target_name in _CONVOLUTION_OPS) and len(
+        tensor_args
+    ) >= 2:
+        weight_shape = tensor_args[1][0]
+        return 2 * output_numel * _numel(weight_shape[1:])
+
+    return output_numel
+
+
+@dataclass(frozen=True)
+class PartitionCostModel:
+    """Estimates whether offloading a partition to TensorRT pays for itself
+
+    A partition is kept if the estimated time saved by running its operators
+    in TensorRT exceeds the cost of the engine invocation plus the cost of
+    materializing every tensor crossing its boundary. Costs are expressed in
+    FLOP-equivalents
+
+    Args:
+        trt_speedup: Assumed speedup of TensorRT over Torch on the partition operators
+        bytes_cost: Cost of accessing one byte of operator inputs or outputs
+        boundary_bytes_cost: Cost of materializing one byte of a boundary tensor
+        boundary_tensor_cost: Fixed cost of each tensor crossing the boundary
+        engine_cost: Fixed cost of invoking a TensorRT engine
+    """
+
+    trt_speedup: float = 2.0
+    bytes_cost: float = 4.0
+    boundary_bytes_cost: float = 8.0
+    boundary_tensor_cost: float = 1e5
+    engine_cost: float = 1e6
+
+    def node_cost(self, node: torch.fx.Node) -> Optional[float]:
+        """Cost of running a node in Torch, None if unknown"""
+        flops = estimate_flops(node)
+        output_bytes = tensor_bytes(node)
+        if flops is None or output_bytes is None:
+            return None
+
+        input_bytes = sum(
+            tensor_bytes(arg) or 0
+            for arg in node.all_input_nodes
+            if arg.op != "get_attr"
+        )
+        return flops + self.bytes_cost * (input_bytes + output_bytes)
+
+    def boundary_tensors(self, nodes: Iterable[torch.fx.Node]) -> Set[torch.fx.Node]:
+        """Nodes whose outputs cross the boundary of the set of nodes"""
+        node_set = set(nodes)
+        boundary = set()
+        for node in node_set:
+            for arg in node.all_input_nodes:
+                # Constants are folded into the engine rather than transferred
+                if arg not in node_set and arg.op != "get_attr":
+                    boundary.add(arg)
+            if any(user not in node_set for user in node.users):
+                boundary.add(node)
+        return boundary
+
+    def partition_benefit(self, nodes: Iterable[torch.fx.Node]) -> Optional[float]:
+        """Estimated cost saved by running the nodes in TensorRT, None if unknown
+
+        Negative values mean the partition is expected to be slower than Torch
+        """
+        nodes = list(nodes)
+        compute_cost = 0.0
+        for node in nodes:
+            if node.op != "call_function":
+                continue
+            cost = self.node_cost(node)
+            if cost is None:
+                return None
+            compute_cost += cost
+
+        boundary_cost = 0.0
+        for node in self.boundary_tensors(nodes):
+            num_bytes = tensor_bytes(node)
+            if num_bytes is None:
+                return None
+            boundary_cost += (
+                self.boundary_tensor_cost + self.boundary_bytes_cost * num_bytes
+            )
+
+        saved = compute_cost * (1.0 - 1.0 / self.trt_speedup)
+        return saved - boundary_cost - self.engine_cost
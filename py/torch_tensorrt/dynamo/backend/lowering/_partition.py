@@ -1,15 +1,17 @@
 import logging
-from typing import Dict, List, Optional, Sequence
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
 
 import torch
 
 from torch_tensorrt.dynamo.backend._defaults import MIN_BLOCK_SIZE
+from torch_tensorrt.dynamo.backend.lowering._cost_model import PartitionCostModel
 from torch.fx.passes.infra.partitioner import CapabilityBasedPartitioner, Partition
 from torch.fx.graph_module import GraphModule
 from torch.fx.node import _get_qualified_name
 from torch.fx.passes.operator_support import OperatorSupport
 
-from torch_tensorrt.fx.converter_registry import CONVERTERS
+from torch_tensorrt.fx.converter_registry import CONVERTERS, load_converters
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,10 @@ class TRTPartitioner(CapabilityBasedPartitioner):
         allowed_single_node_partition_ops: Nodes which can be included in single-node partitons.
             Generally useful for module-level exclusion ops which are intensive despite being single functions
         min_block_size: Minimum number of computational operators per block
+        cost_model: If specified, partitions are kept based on their estimated benefit
+            (operator FLOPs and bytes from node metadata, minus boundary transfer and
+            engine invocation costs) instead of min_block_size. Partitions lacking the
+            metadata needed for an estimate fall back to min_block_size
     Returns:
         torch.fx.GraphModule
     """
@@ -37,6 +43,7 @@ class TRTPartitioner(CapabilityBasedPartitioner):
         non_compute_ops: Optional[Sequence[str]] = None,
         allowed_single_node_partition_ops: Optional[Sequence[str]] = None,
         min_block_size=MIN_BLOCK_SIZE,
+        cost_model: Optional[PartitionCostModel] = None,
     ) -> None:
         super().__init__(
             graph_module,
@@ -47,6 +54,7 @@ class TRTPartitioner(CapabilityBasedPartitioner):
         )
 
         self.min_block_size = min_block_size
+        self.cost_model = cost_model
 
     def propose_partitions(self) -> List[Partition]:
         # Propose partitions using the default, then refine the results
@@ -77,14 +85,27 @@ class TRTPartitioner(CapabilityBasedPartitioner):
                 ):
                     compute_node_count += 1
 
-            if compute_node_count < self.min_block_size and not exempted_partition:
-                partitions_to_remove[id] = compute_node_count
+            if exempted_partition:
+                continue
+
+            if self.cost_model is not None:
+                benefit = self.cost_model.partition_benefit(partition.nodes)
+                if benefit is not None:
+                    if benefit <= 0:
+                        partitions_to_remove[id] = (
+                            f"an estimated benefit of {benefit:.3g} FLOP-equivalents "
+                            f"with {compute_node_count} computational operators"
+                        )
+                    continue
+
+            if compute_node_count < self.min_block_size:
+                partitions_to_remove[
+                    id
+                ] = f"{compute_node_count} < {self.min_block_size} computational operators"
 
         # Remove any nodes violating the criteria specified by the user
-        for id, count in partitions_to_remove.items():
-            logger.debug(
-                f"Removing partition which has {count} < {self.min_block_size} computational operators"
-            )
+        for id, reason in partitions_to_remove.items():
+            logger.debug(f"Removing partition which has {reason}")
             del partitions[id]
 
         return [partitions[k] for k in sorted(partitions.keys())]
@@ -100,6 +121,7 @@ class TorchTensorRTOperatorSupport(OperatorSupport):
 
     def __init__(self, support_dict=None, torch_executed_ops=set()):
         super().__init__(support_dict)
+        load_converters()
 
         # Initialize sets of supported/unsupported operators
         self.supported_operators = set()
@@ -157,6 +179,7 @@ def partition(
     verbose: bool = True,
     min_block_size: int = MIN_BLOCK_SIZE,
     torch_executed_ops: Sequence[str] = set(),
+    cost_model: Optional[PartitionCostModel] = None,
 ) -> torch.fx.GraphModule:
     """Partition an FX GraphModule with aten ops into TRT engines
     Partitioning is based on converter operator support
@@ -166,11 +189,14 @@ def partition(
         verbose: Bool representing whether to print operator support
         min_block_size: Minimum number of operators per TRT-Engine Block
         torch_executed_ops: Sequence of operations to run in Torch, regardless of converter coverage
+        cost_model: Cost model deciding which partitions to keep, see TRTPartitioner
     Returns:
         torch.fx.GraphModule
     """
     supported_ops = TorchTensorRTOperatorSupport(torch_executed_ops=torch_executed_ops)
-    partitioner = TRTPartitioner(gm, supported_ops, min_block_size=min_block_size)
+    partitioner = TRTPartitioner(
+        gm, supported_ops, min_block_size=min_block_size, cost_model=cost_model
+    )
 
     # Determine partitions based on user specifications and operator support
     # Then, fuse partitions and display overview of supported/unsupported operators
@@ -183,6 +209,68 @@ def partition(
     return fused_graph
 
 
+def capture_submod_inputs(
+    mod: torch.fx.GraphModule,
+    submod_names: Sequence[str],
+    inputs: Sequence[torch.Tensor],
+    capture_mode: str = "tensor",
+) -> Dict[str, Sequence[Any]]:
+    """Helper function to get the inputs of several Torch submodules with a single forward pass
+
+    Args:
+        mod: Parent FX GraphModule
+        submod_names: Names of the child modules to record inputs for
+        inputs: Sample inputs to parent module
+        capture_mode: What to record for each tensor input:
+            "tensor": the real activation
+            "meta": a tensor on the meta device carrying only shape and dtype
+            "fake": a FakeTensor carrying shape, dtype and device
+            Recording metadata only keeps peak memory independent of the number of submodules
+    Returns:
+        Dictionary mapping each submodule name to the sequence of its inputs
+    """
+    if capture_mode == "tensor":
+
+        def convert(x: torch.Tensor) -> Any:
+            return x
+
+    elif capture_mode == "meta":
+
+        def convert(x: torch.Tensor) -> Any:
+            return torch.empty_strided(
+                x.size(), x.stride(), dtype=x.dtype, device="meta"
+            )
+
+    elif capture_mode == "fake":
+        from torch._subclasses.fake_tensor import FakeTensorMode
+
+        convert = FakeTensorMode(allow_non_fake_inputs=True).from_tensor
+    else:
+        raise ValueError(
+            f"Invalid capture_mode {capture_mode}. "
+            + "Supported options: {tensor, meta, fake}"
+        )
+
+    submod_inputs: Dict[str, Sequence[Any]] = {}
+
+    def get_input(name, self, inputs):
+        submod_inputs[name] = tuple(
+            convert(x) if isinstance(x, torch.Tensor) else x for x in inputs
+        )
+
+    handles = [
+        mod.get_submodule(name).register_forward_pre_hook(partial(get_input, name))
+        for name in submod_names
+    ]
+    try:
+        mod(*inputs)
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    return submod_inputs
+
+
 def get_submod_inputs(
     mod: torch.fx.GraphModule,
     submod: torch.fx.GraphModule,
@@ -190,6 +278,9 @@ def get_submod_inputs(
 ) -> Sequence[torch.Tensor]:
     """Helper function to get inputs to a Torch submodule
 
+    Prefer `capture_submod_inputs` when inputs of several submodules are needed,
+    since each call to this function runs a full forward pass of the parent module
+
     Args:
         mod: Parent FX GraphModule
         submod: Child FX GraphModule
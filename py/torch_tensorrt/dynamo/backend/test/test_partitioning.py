@@ -1,4 +1,10 @@
-from torch_tensorrt.dynamo.backend.lowering import partition
+from torch_tensorrt.dynamo.backend.lowering import (
+    partition,
+    capture_submod_inputs,
+    get_submod_inputs,
+    PartitionCostModel,
+)
+from torch.fx.passes.shape_prop import ShapeProp
 from torch.testing._internal.common_utils import run_tests, TestCase
 from utils import lower_graph_testing
 import torch
@@ -119,6 +125,103 @@ class TestPartitioning(TestCase):
             "Certain operators are set to run in Torch, expected 1 segment",
         )
 
+    def test_partition_cost_model(self):
+        class CheapAndExpensiveOps(torch.nn.Module):
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+
+            def forward(self, x, y, a, w):
+                # Cheap supported ops on tiny tensors, isolated by an unsupported op
+                sum_1 = torch.ops.aten.add.Tensor(x, y)
+                sum_2 = torch.ops.aten.add.Tensor(sum_1, y)
+                abs_ = torch.ops.aten.abs.default(sum_2)
+                # A single expensive supported op
+                conv_ = torch.ops.aten.convolution.default(
+                    a, w, None, [1, 1], [1, 1], [1, 1], False, [0, 0], 1
+                )
+                return abs_, conv_
+
+        inputs = [
+            torch.randn(5),
+            torch.randn(5),
+            torch.randn(1, 64, 64, 64),
+            torch.randn(64, 64, 3, 3),
+        ]
+        fx_graph = torch.fx.symbolic_trace(CheapAndExpensiveOps())
+        ShapeProp(fx_graph).propagate(*inputs)
+
+        count_partitioned = partition(deepcopy(fx_graph), min_block_size=2)
+        self.assertEquals(
+            len(list(count_partitioned.named_children())),
+            1,
+            "Only the block of two additions reaches min_block_size",
+        )
+
+        cost_partitioned = partition(
+            deepcopy(fx_graph), min_block_size=2, cost_model=PartitionCostModel()
+        )
+        children = list(cost_partitioned.named_children())
+        self.assertEquals(
+            len(children),
+            1,
+            "Only the convolution is worth offloading to TRT",
+        )
+        self.assertIn(
+            torch.ops.aten.convolution.default,
+            [node.target for node in children[0][1].graph.nodes],
+        )
+
+    def test_capture_submod_inputs_single_pass(self):
+        class PartiallySupportedMultiOp(torch.nn.Module):
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+
+            def forward(self, x, y):
+                sum_1 = torch.ops.aten.add.Tensor(x, y)
+                sum_2 = torch.ops.aten.add.Tensor(x, sum_1)
+                div_ = torch.ops.aten.div.Tensor_mode(sum_2, y, rounding_mode="floor")
+                relu_ = torch.ops.aten.relu.default(div_)
+                pow_ = torch.ops.aten.pow.Tensor_Scalar(relu_, 2)
+                return pow_
+
+        inputs = [torch.randn(5), torch.randn(5)]
+        fx_graph = torch.fx.symbolic_trace(PartiallySupportedMultiOp())
+        partitioned_graph = partition(
+            deepcopy(fx_graph),
+            min_block_size=2,
+            torch_executed_ops={"torch.ops.aten.div.Tensor_mode"},
+        )
+        submod_names = [name for name, _ in partitioned_graph.named_children()]
+        self.assertEquals(len(submod_names), 2, "Expected 2 segments")
+
+        forward_calls = 0
+
+        def count_calls(module, inputs):
+            nonlocal forward_calls
+            forward_calls += 1
+
+        handle = partitioned_graph.register_forward_pre_hook(count_calls)
+        captured = capture_submod_inputs(partitioned_graph, submod_names, inputs)
+        handle.remove()
+        self.assertEquals(forward_calls, 1, "Expected a single forward pass")
+
+        for name in submod_names:
+            expected = get_submod_inputs(
+                partitioned_graph, getattr(partitioned_graph, name), inputs
+            )
+            self.assertEquals(len(captured[name]), len(expected))
+            for x, y in zip(captured[name], expected):
+                torch.testing.assert_close(x, y)
+
+        captured_meta = capture_submod_inputs(
+            partitioned_graph, submod_names, inputs, capture_mode="meta"
+        )
+        for name in submod_names:
+            for x, y in zip(captured_meta[name], captured[name]):
+                self.assertTrue(x.is_meta)
+                self.assertEquals(x.shape, y.shape)
+                self.assertEquals(x.dtype, y.dtype)
+
 
 if __name__ == "__main__":
     run_tests()
@@ -1,7 +1,7 @@
 import logging
 import warnings
 from datetime import datetime
-from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import numpy
 
@@ -14,8 +14,11 @@ from torch.fx.node import _get_qualified_name
 from torch.fx.passes.shape_prop import TensorMetadata
 
 from torch_tensorrt.dynamo.fx_ts_compat import CONVERTERS
+from torch_tensorrt.fx.converter_registry import load_converters
 from .input_tensor_spec import InputTensorSpec
 from torch_tensorrt.fx.observer import Observer
+from torch_tensorrt.fx.refit import graph_weights
+from torch_tensorrt.fx.weight_manager import stage_weights, WeightManager
 from torch_tensorrt.fx.utils import get_dynamic_dims, LowerPrecision, torch_dtype_to_trt
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
@@ -60,6 +63,7 @@ class TRTInterpreter(torch.fx.Interpreter):
             flag |= EXPLICIT_PRECISION
         self.network = self.builder.create_network(flag)
 
+        load_converters()
         missing_ops = self.validate_conversion()
         if missing_ops:
             warnings.warn(
@@ -77,6 +81,7 @@ class TRTInterpreter(torch.fx.Interpreter):
         self._itensor_to_tensor_meta: Dict[
             trt.tensorrt.ITensor, TensorMetadata
         ] = dict()
+        self.dynamic_ranges: Dict[str, Tuple[float, float]] = {}
 
     def validate_input_specs(self):
         for shape, _, _, shape_ranges, has_batch_dim in self.input_specs:
@@ -163,6 +168,7 @@ class TRTInterpreter(torch.fx.Interpreter):
         timing_cache=None,
         profiling_verbosity=None,
         tactic_sources=None,
+        dynamic_ranges=None,
     ) -> TRTInterpreterResult:
         """
         Build TensorRT engine with some configs.
@@ -175,6 +181,7 @@ class TRTInterpreter(torch.fx.Interpreter):
             algorithm_selector: set up algorithm selection for certain layer
             timing_cache: enable timing cache for TensorRT
             profiling_verbosity: TensorRT logging level
+            dynamic_ranges: INT8 dynamic range of the output of FX nodes, by node name, e.g. from `torch_tensorrt.fx.tools.calibration.calibrate`
         Return:
             TRTInterpreterResult
         """
@@ -199,8 +206,11 @@ class TRTInterpreter(torch.fx.Interpreter):
             warnings.warn("Current platform doesn't support fast native fp16!")
 
         self.input_specs_iter = 0
+        self.dynamic_ranges = dynamic_ranges or {}
         run_module_start_time = datetime.now()
-        super().run()
+        self.weight_manager = WeightManager(graph_weights(self.module))
+        with stage_weights(self.weight_manager):
+            super().run()
         _LOGGER.info(
             f"TRT INetwork construction elapsed time: {datetime.now() - run_module_start_time}"
         )
@@ -255,6 +265,12 @@ class TRTInterpreter(torch.fx.Interpreter):
 
         engine = self.builder.build_engine(self.network, builder_config)
         assert engine
+        # TensorRT has copied the weights into the engine.
+        self.weight_manager.release()
+        _LOGGER.info(
+            f"Staged {self.weight_manager.staged_bytes / 2**20:.1f} MB of weights, "
+            f"{self.weight_manager.deduplicated_bytes / 2**20:.1f} MB deduplicated"
+        )
 
         serialized_cache = (
             bytearray(cache.serialize())
@@ -286,6 +302,11 @@ class TRTInterpreter(torch.fx.Interpreter):
 
         if isinstance(trt_node, trt.tensorrt.ITensor):
             self._itensor_to_tensor_meta[trt_node] = n.meta.get("tensor_meta")
+            if n.name in self.dynamic_ranges and trt_node.dtype in (
+                trt.float32,
+                trt.float16,
+            ):
+                trt_node.dynamic_range = self.dynamic_ranges[n.name]
 
         return trt_node
 
@@ -1,16 +1,51 @@
-from .converters import *  # noqa: F403 F401
-import logging
+import importlib
+from typing import Any, List
 
 from .converter_registry import (  # noqa
     CONVERTERS,
+    load_converters,
     NO_EXPLICIT_BATCH_DIM_SUPPORT,
     NO_IMPLICIT_BATCH_DIM_SUPPORT,
     tensorrt_converter,
 )
-from .fx2trt import TRTInterpreter, TRTInterpreterResult  # noqa
-from .input_tensor_spec import generate_input_specs, InputTensorSpec  # noqa
-from .lower_setting import LowerSetting  # noqa
-from .trt_module import TRTModule  # noqa
-from .lower import compile  # usort: skip  #noqa
 
-logging.basicConfig(level=logging.INFO)
+# The public API is imported on first access, so that importing
+# torch_tensorrt.fx, e.g. to unpickle a TRTModule, doesn't load the tracer,
+# the acc ops and the converters. Converters are registered by
+# `load_converters` when a TRTInterpreter or splitter is first created.
+_LAZY_ATTRS = {
+    "TRTInterpreter": ".fx2trt",
+    "TRTInterpreterResult": ".fx2trt",
+    "generate_input_specs": ".input_tensor_spec",
+    "InputTensorSpec": ".input_tensor_spec",
+    "LowerSetting": ".lower_setting",
+    "TRTModule": ".trt_module",
+    "compile": ".lower",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            # The converter functions used to be exported from this module.
+            load_converters()
+            converters = importlib.import_module(".converters", __name__)
+            if not hasattr(converters, name):
+                raise AttributeError(
+                    f"module {__name__!r} has no attribute {name!r}"
+                ) from None
+            value = getattr(converters, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
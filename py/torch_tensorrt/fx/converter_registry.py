@@ -1,3 +1,4 @@
+import importlib
 from typing import Any, Callable, Dict
 
 from torch.fx.node import Target
@@ -28,3 +29,12 @@ def tensorrt_converter(
         return register_converter
     else:
         return disable_converter
+
+
+def load_converters() -> None:
+    """
+    Import the converter modules, which register themselves in CONVERTERS.
+    They are loaded on first use rather than when torch_tensorrt.fx is
+    imported, so processes that only run lowered modules don't pay for them.
+    """
+    importlib.import_module("torch_tensorrt.fx.converters")
@@ -10,6 +10,8 @@ import tensorrt as trt
 import torch
 from torch.fx.node import Argument, Target
 
+from ..refit import record_weight
+from ..weight_manager import stage_weight
 from ..types import (
     Shape,
     TRTDataType,
@@ -151,13 +153,19 @@ def extend_mod_attr_to_tuple(mod: torch.nn.Module, name: str, size: int):
     return extend_attr_to_tuple(val, size)
 
 
-def to_numpy(tensor: Optional[torch.Tensor]) -> Optional[np.ndarray]:
+def to_numpy(
+    tensor: Optional[torch.Tensor], dtype: Optional[torch.dtype] = None
+) -> Optional[np.ndarray]:
     """
     Convert a PyTorch Tensor to a Numpy Array. If the tensor is
-    quantized it will be dequantized first.
+    quantized it will be dequantized first. While a network is built by
+    TRTInterpreter, the conversions of a module weight share the same array,
+    see `weight_manager`.
 
     Args:
         tensor (Optional[torch.Tensor]): A PyTorch tensor or None.
+        dtype (Optional[torch.dtype]): If a dtype is given, the tensor is
+            converted to this dtype first.
 
     Returns:
         A Numpy array.
@@ -172,7 +180,9 @@ def to_numpy(tensor: Optional[torch.Tensor]) -> Optional[np.ndarray]:
     if tensor.is_quantized:
         tensor = tensor.dequantize()
 
-    return tensor.cpu().detach().contiguous().numpy()
+    array = stage_weight(tensor, dtype)
+    record_weight(tensor, array, dtype)
+    return array
 
 
 def has_dynamic_shape(shape: Shape) -> bool:
@@ -250,9 +260,8 @@ def create_constant(
     if isinstance(value, float):
         value = torch.Tensor([value])
 
-    if dtype:
-        value = value.to(dtype)
-    constant = network.add_constant(value.shape, to_numpy(value))
+    array = to_numpy(value, dtype)
+    constant = network.add_constant(value.shape, array)
     constant.name = name
     return constant.get_output(0)
 
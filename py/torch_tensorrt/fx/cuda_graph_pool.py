@@ -0,0 +1,105 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, ContextManager, Hashable, List, Optional
+
+import torch
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+class CapturedGraph:
+    """
+    A CUDA graph capturing one engine execution, along with everything the
+    captured launch refers to: the execution context and the static input
+    and output buffers whose addresses are baked into the graph.
+    """
+
+    def __init__(
+        self,
+        graph: Any,
+        context: Any,
+        static_inputs: List[torch.Tensor],
+        static_outputs: List[torch.Tensor],
+        static_hidden_outputs: List[torch.Tensor],
+    ):
+        self.graph = graph
+        self.context = context
+        self.static_inputs = static_inputs
+        self.static_outputs = static_outputs
+        self.static_hidden_outputs = static_hidden_outputs
+
+    def replay(self, inputs: List[torch.Tensor]) -> List[torch.Tensor]:
+        """Copy `inputs` into the static input buffers and replay the graph."""
+        for static_input, x in zip(self.static_inputs, inputs):
+            static_input.copy_(x)
+        self.graph.replay()
+        return self.static_outputs
+
+
+class CudaGraphPool:
+    """
+    A bounded pool of captured CUDA graphs keyed by input shape signature.
+    When full, capturing a new graph evicts the least recently used one.
+
+    Args:
+        max_graphs: Maximum number of graphs kept alive.
+        graph_factory: Creates an empty graph, default to `torch.cuda.CUDAGraph`.
+        capture_context: Given a graph, returns the context manager inside
+            which launches are captured into it, default to `torch.cuda.graph`.
+    """
+
+    def __init__(
+        self,
+        max_graphs: int = 4,
+        graph_factory: Optional[Callable[[], Any]] = None,
+        capture_context: Optional[Callable[[Any], ContextManager]] = None,
+    ):
+        assert max_graphs > 0, f"max_graphs must be positive, got {max_graphs}"
+        self.max_graphs = max_graphs
+        self._graph_factory = graph_factory or torch.cuda.CUDAGraph
+        self._capture_context = capture_context or torch.cuda.graph
+        self._graphs: "OrderedDict[Hashable, CapturedGraph]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._graphs)
+
+    def __contains__(self, signature: Hashable) -> bool:
+        return signature in self._graphs
+
+    def get(self, signature: Hashable) -> Optional[CapturedGraph]:
+        captured = self._graphs.get(signature)
+        if captured is not None:
+            self._graphs.move_to_end(signature)
+        return captured
+
+    def capture(
+        self,
+        signature: Hashable,
+        context: Any,
+        static_inputs: List[torch.Tensor],
+        static_outputs: List[torch.Tensor],
+        static_hidden_outputs: List[torch.Tensor],
+        launch: Callable[[], None],
+    ) -> CapturedGraph:
+        """
+        Capture `launch`, which must enqueue the engine execution on the current
+        stream using the given execution context and static buffers.
+        """
+        # Run once outside of capture so lazy initializations in TensorRT
+        # don't end up in the graph.
+        launch()
+        graph = self._graph_factory()
+        with self._capture_context(graph):
+            launch()
+
+        captured = CapturedGraph(
+            graph, context, static_inputs, static_outputs, static_hidden_outputs
+        )
+        self._graphs[signature] = captured
+        if len(self._graphs) > self.max_graphs:
+            evicted, _ = self._graphs.popitem(last=False)
+            _LOGGER.debug(f"Evicted CUDA graph for input shapes {evicted}")
+        return captured
+
+    def clear(self) -> None:
+        self._graphs.clear()
@@ -2,7 +2,7 @@ import logging
 import os
 import warnings
 from datetime import datetime
-from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import numpy
 
@@ -14,9 +14,11 @@ from torch._ops import OpOverload
 from torch.fx.node import _get_qualified_name
 from torch.fx.passes.shape_prop import TensorMetadata
 
-from .converter_registry import CONVERTERS
+from .converter_registry import CONVERTERS, load_converters
 from .input_tensor_spec import InputTensorSpec
-from .observer import Observer
+from .observer import Observer, span
+from .refit import record_weights, refittable_weights, RefitWeight, WeightRecorder
+from .weight_manager import stage_weights, WeightManager
 from .utils import get_dynamic_dims, LowerPrecision, torch_dtype_to_trt
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
@@ -31,6 +33,9 @@ class TRTInterpreterResult(NamedTuple):
     input_names: Sequence[str]
     output_names: Sequence[str]
     serialized_cache: bytearray
+    # Map from TensorRT weight names to the FX weights they are derived from,
+    # only populated for refittable engines.
+    weight_name_map: Optional[Dict[str, RefitWeight]] = None
 
 
 class TRTInterpreter(torch.fx.Interpreter):
@@ -61,6 +66,7 @@ class TRTInterpreter(torch.fx.Interpreter):
             flag |= EXPLICIT_PRECISION
         self.network = self.builder.create_network(flag)
 
+        load_converters()
         missing_ops = self.validate_conversion()
         if missing_ops:
             warnings.warn(
@@ -78,6 +84,7 @@ class TRTInterpreter(torch.fx.Interpreter):
         self._itensor_to_tensor_meta: Dict[
             trt.tensorrt.ITensor, TensorMetadata
         ] = dict()
+        self.dynamic_ranges: Dict[str, Tuple[float, float]] = {}
 
     def validate_input_specs(self):
         for shape, _, _, shape_ranges, has_batch_dim in self.input_specs:
@@ -164,6 +171,8 @@ class TRTInterpreter(torch.fx.Interpreter):
         timing_cache=None,
         profiling_verbosity=None,
         tactic_sources=None,
+        refit=False,
+        dynamic_ranges=None,
     ) -> TRTInterpreterResult:
         """
         Build TensorRT engine with some configs.
@@ -177,6 +186,8 @@ class TRTInterpreter(torch.fx.Interpreter):
             algorithm_selector: set up algorithm selection for certain layer
             timing_cache: enable timing cache for TensorRT
             profiling_verbosity: TensorRT logging level
+            refit: build a refittable engine and record which FX weights its weights come from
+            dynamic_ranges: INT8 dynamic range of the output of FX nodes, by node name, e.g. from `tools.calibration.calibrate`
         Return:
             TRTInterpreterResult
         """
@@ -201,8 +212,18 @@ class TRTInterpreter(torch.fx.Interpreter):
             warnings.warn("Current platform doesn't support fast native fp16!")
 
         self.input_specs_iter = 0
+        self.dynamic_ranges = dynamic_ranges or {}
         run_module_start_time = datetime.now()
-        super().run()
+        weight_name_map: Dict[str, RefitWeight] = {}
+        self.weight_manager = WeightManager(self._named_weights())
+        with span("network_construction", "engine"), stage_weights(self.weight_manager):
+            if refit:
+                recorder = WeightRecorder(self._named_weights())
+                with record_weights(recorder):
+                    super().run()
+                weight_name_map = recorder.name_weights(self.network)
+            else:
+                super().run()
         _LOGGER.info(
             f"TRT INetwork construction elapsed time: {datetime.now() - run_module_start_time}"
         )
@@ -243,6 +264,9 @@ class TRTInterpreter(torch.fx.Interpreter):
         if strict_type_constraints:
             builder_config.set_flag(trt.BuilderFlag.STRICT_TYPES)
 
+        if refit:
+            builder_config.set_flag(trt.BuilderFlag.REFIT)
+
         if self.optimization_profiles:
             for optimization_profile in self.optimization_profiles:
                 builder_config.add_optimization_profile(optimization_profile)
@@ -254,8 +278,20 @@ class TRTInterpreter(torch.fx.Interpreter):
         if tactic_sources is not None:
             builder_config.set_tactic_sources(tactic_sources=tactic_sources)
 
-        engine = self.builder.build_engine(self.network, builder_config)
+        with span(
+            "build_engine",
+            "engine",
+            num_layers=self.network.num_layers,
+            lower_precision=str(lower_precision),
+        ):
+            engine = self.builder.build_engine(self.network, builder_config)
         assert engine
+        # TensorRT has copied the weights into the engine.
+        self.weight_manager.release()
+        _LOGGER.info(
+            f"Staged {self.weight_manager.staged_bytes / 2**20:.1f} MB of weights, "
+            f"{self.weight_manager.deduplicated_bytes / 2**20:.1f} MB deduplicated"
+        )
 
         serialized_cache = (
             bytearray(cache.serialize())
@@ -266,10 +302,25 @@ class TRTInterpreter(torch.fx.Interpreter):
             f"Build TRT engine elapsed time: {datetime.now() - build_engine_start_time}"
         )
 
+        if refit:
+            weight_name_map = refittable_weights(engine, weight_name_map)
+
         return TRTInterpreterResult(
-            engine, self._input_names, self._output_names, serialized_cache
+            engine,
+            self._input_names,
+            self._output_names,
+            serialized_cache,
+            weight_name_map,
         )
 
+    def _named_weights(self):
+        """FX names and values of the tensors converters may read weights from."""
+        yield from self.module.named_parameters()
+        yield from self.module.named_buffers()
+        for node in self.module.graph.nodes:
+            if node.op == "get_attr":
+                yield node.target, self.fetch_attr(node.target)
+
     def run_node(self, n):
         self._cur_node_name = str(n)
         # add "_itensor_to_tensor_meta"
@@ -278,7 +329,9 @@ class TRTInterpreter(torch.fx.Interpreter):
         n.kwargs = kwargs
 
         # run the node
-        trt_node = super().run_node(n)
+        target = getattr(n.target, "__name__", str(n.target))
+        with span(target, "converter", node=n.name, op=n.op):
+            trt_node = super().run_node(n)
 
         # remove "_itensor_to_tensor_meta"
         kwargs = dict(n.kwargs)
@@ -287,6 +340,11 @@ class TRTInterpreter(torch.fx.Interpreter):
 
         if isinstance(trt_node, trt.tensorrt.ITensor):
             self._itensor_to_tensor_meta[trt_node] = n.meta.get("tensor_meta")
+            if n.name in self.dynamic_ranges and trt_node.dtype in (
+                trt.float32,
+                trt.float16,
+            ):
+                trt_node.dynamic_range = self.dynamic_ranges[n.name]
 
         return trt_node
 
@@ -24,16 +24,7 @@ def generate_input_specs(inputs, lower_setting, additional_inputs=None):
             batch_dims = None
             if not all(x.size(0) == bs for x in inputs):
                 batch_dims = InputTensorSpec.find_batch_size_dim(inputs)
-        return InputTensorSpec.from_tensors_with_dynamic_batch_size(
-            inputs,
-            (
-                0,
-                lower_setting.max_batch_size,
-                lower_setting.max_batch_size,
-            ),
-            lower_setting.opt_profile_replica,
-            batch_dims,
-        )
+        return _dynamic_batch_input_specs(inputs, lower_setting, batch_dims)
     else:
         batch_dims = []
 
@@ -53,16 +44,25 @@ def generate_input_specs(inputs, lower_setting, additional_inputs=None):
                     f"Failed to find batch dimension because shapes are the same, {i.shape}"
                 )
 
-        return InputTensorSpec.from_tensors_with_dynamic_batch_size(
-            inputs,
-            (
-                0,
-                lower_setting.max_batch_size,
-                lower_setting.max_batch_size,
-            ),
-            lower_setting.opt_profile_replica,
-            batch_dims,
+        return _dynamic_batch_input_specs(inputs, lower_setting, batch_dims)
+
+
+def _dynamic_batch_input_specs(inputs, lower_setting, batch_dims):
+    batch_size_profiles = getattr(lower_setting, "batch_size_profiles", None)
+    if batch_size_profiles:
+        return InputTensorSpec.from_tensors_with_batch_size_profiles(
+            inputs, batch_size_profiles, batch_dims
         )
+    return InputTensorSpec.from_tensors_with_dynamic_batch_size(
+        inputs,
+        (
+            0,
+            lower_setting.max_batch_size,
+            lower_setting.max_batch_size,
+        ),
+        lower_setting.opt_profile_replica,
+        batch_dims,
+    )
 
 
 class InputTensorSpec(NamedTuple):
@@ -150,30 +150,85 @@ class InputTensorSpec(NamedTuple):
                 and allow user to specify the batch dims using this arg. Default we treat
                 dim 0 as the batch dim.
 
+        Returns:
+            A list of InputTensorSpec named tuples with dynamic ranges.
+        """
+        return cls.from_tensors_with_batch_size_profiles(
+            tensors, [batch_size_range] * opt_profile_replica, batch_dims
+        )
+
+    @classmethod
+    def from_tensors_with_batch_size_profiles(
+        cls,
+        tensors: Sequence[torch.Tensor],
+        batch_size_profiles: Sequence[Tuple[int, int, int]],
+        batch_dims: Optional[List[int]] = None,
+    ) -> List["InputTensorSpec"]:
+        """
+        Produce a list of InputTenosrSpec named tuples with a dynamic batch
+        dimension and one optimization profile per batch size range.
+
+        Args:
+            tensors (Sequence[torch.Tensor]): A list of PyTorch tensors.
+            batch_size_profiles (Sequence[Tuple[int, int, int]]): The (min, opt, max)
+                batch sizes of each optimization profile.
+            batch_dims (Optional[List[int]]): The batch dim of each tensor, -1 for
+                tensors without one. Default to `find_batch_size_dim`.
+
         Returns:
             A list of InputTensorSpec named tuples with dynamic ranges.
         """
         if batch_dims is None:
             batch_dims = cls.find_batch_size_dim(tensors)
 
-        input_specs = []
         batch_size = tensors[0].size(batch_dims[0])
-
         for i, tensor in enumerate(tensors):
             batch_dim = batch_dims[i]
-            if batch_dim == -1:
-                input_specs.append(cls.from_tensor(tensor))
-            else:
-                shape = list(tensor.shape)
-                assert batch_size == tensor.size(
-                    batch_dim
-                ), f"The {i}th tensor (shape: {tensor.shape}) doesn't have the correct batch size: {batch_size}."
-                shape[batch_dim] = -1
-                shape_ranges: List[ShapeRange] = [tuple(tuple(shape[0:batch_dim] + [bs] + shape[batch_dim + 1 :]) for bs in batch_size_range)] * opt_profile_replica  # type: ignore[list-item]
-                input_specs.append(
-                    cls(tuple(shape), tensor.dtype, tensor.device, shape_ranges)
+            assert batch_dim == -1 or batch_size == tensor.size(
+                batch_dim
+            ), f"The {i}th tensor (shape: {tensor.shape}) doesn't have the correct batch size: {batch_size}."
+
+        input_specs = []
+        for tensor, batch_dim in zip(tensors, batch_dims):
+            input_specs.extend(
+                cls.from_shapes_with_batch_size_profiles(
+                    [tuple(tensor.shape)],
+                    [tensor.dtype],
+                    batch_size_profiles,
+                    [batch_dim],
+                    tensor.device,
                 )
+            )
+        return input_specs
 
+    @classmethod
+    def from_shapes_with_batch_size_profiles(
+        cls,
+        shapes: Sequence[Sequence[int]],
+        dtypes: Sequence[torch.dtype],
+        batch_size_profiles: Sequence[Tuple[int, int, int]],
+        batch_dims: Sequence[int],
+        device: torch.device = torch.device("cpu"),
+    ) -> List["InputTensorSpec"]:
+        """
+        Same as `from_tensors_with_batch_size_profiles` for inputs described by
+        their shapes and dtypes, e.g. recorded at runtime.
+        """
+        input_specs = []
+        for shape, dtype, batch_dim in zip(shapes, dtypes, batch_dims):
+            shape = list(shape)
+            if batch_dim == -1:
+                input_specs.append(cls(tuple(shape), dtype, device))
+                continue
+            shape_ranges: List[ShapeRange] = [
+                tuple(  # type: ignore[misc]
+                    tuple(shape[0:batch_dim] + [bs] + shape[batch_dim + 1 :])
+                    for bs in profile
+                )
+                for profile in batch_size_profiles
+            ]
+            shape[batch_dim] = -1
+            input_specs.append(cls(tuple(shape), dtype, device, shape_ranges))
         return input_specs
 
     @classmethod
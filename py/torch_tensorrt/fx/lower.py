@@ -1,6 +1,7 @@
 import dataclasses as dc
 import logging
-from typing import Any, Callable, Optional, Sequence
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 # @manual=//deeplearning/trt/python:py_tensorrt
 import tensorrt as trt
@@ -8,12 +9,17 @@ import torch
 import torch.fx as fx
 import torch.nn as nn
 import torch_tensorrt.fx.tracer.dispatch_tracer.aten_tracer as aten_tracer
+from torch.fx.passes.pass_manager import PassManager
 from torch.fx.passes.splitter_base import SplitResult
 
 from .fx2trt import TRTInterpreter, TRTInterpreterResult
+from .input_tensor_spec import InputTensorSpec
 from .lower_setting import LowerSetting
 from .passes.lower_pass_manager_builder import LowerPassManagerBuilder
 from .passes.pass_utils import PassFunc, validate_inference
+from .refit import weight_name_map_from_json, weight_name_map_to_json
+from .tools.engine_cache import engine_cache_key, EngineCache
+from .tools.parallel_build import build_engines_in_parallel
 from .tools.timing_cache_utils import TimingCacheManager
 from .tools.trt_splitter import TRTSplitter, TRTSplitterSetting
 
@@ -43,6 +49,10 @@ def compile(
     use_experimental_fx_rt=False,
     correctness_atol=1e-1,
     correctness_rtol=1e-1,
+    engine_cache_dir="",
+    refit=False,
+    calibration_data=None,
+    calibration_method="entropy",
 ) -> nn.Module:
     """
     Takes in original module, input and lowering setting, run lowering workflow to turn module
@@ -62,6 +72,10 @@ def compile(
         cuda_graph_batch_size: Cuda graph batch size, default to be -1.
         dynamic_batch: batch dimension (dim=0) is dynamic.
         use_experimental_fx_rt: Uses the next generation TRTModule which supports both Python and TorchScript based execution (including in C++).
+        engine_cache_dir: Directory of the persistent engine cache, engines of unchanged splits are loaded from there instead of rebuilt.
+        refit: Build refittable engines, whose weights can be updated with `torch_tensorrt.fx.refit.refit_module`.
+        calibration_data: Batches of inputs to calibrate the INT8 dynamic ranges on when lower_precision is INT8, a list or a DataLoader.
+        calibration_method: "minmax", "percentile" or "entropy", see `torch_tensorrt.fx.tools.calibration`.
     Returns:
         A torch.nn.Module lowered by TensorRT.
     """
@@ -85,6 +99,10 @@ def compile(
         use_experimental_rt=use_experimental_fx_rt,
         correctness_atol=correctness_atol,
         correctness_rtol=correctness_rtol,
+        engine_cache_dir=engine_cache_dir,
+        refit=refit,
+        calibration_data=calibration_data,
+        calibration_method=calibration_method,
     )
     lowerer = Lowerer.create(lower_setting=lower_setting)
     return lowerer(module, input)
@@ -94,13 +112,58 @@ def compile(
 class LowerTrtInterpreter:
     lower_setting: LowerSetting
     timing_cache_manager: TimingCacheManager
+    engine_cache: Optional[EngineCache] = None
 
     @classmethod
     def create(cls, lower_setting):
         timing_cache_manager = TimingCacheManager(
-            lower_setting.timing_cache_prefix, lower_setting.save_timing_cache
+            lower_setting.timing_cache_prefix,
+            lower_setting.save_timing_cache,
+            lower_setting.shared_timing_cache,
+        )
+        engine_cache = (
+            EngineCache(
+                lower_setting.engine_cache_dir, lower_setting.engine_cache_max_size
+            )
+            if lower_setting.engine_cache_dir
+            else None
+        )
+        return LowerTrtInterpreter(lower_setting, timing_cache_manager, engine_cache)
+
+    def _builder_settings(self) -> Dict[str, Any]:
+        """Settings that affect the built engine, used to key the engine cache."""
+        return {
+            "max_batch_size": self.lower_setting.max_batch_size,
+            "max_workspace_size": self.lower_setting.max_workspace_size,
+            "lower_precision": self.lower_setting.lower_precision,
+            "explicit_batch_dimension": self.lower_setting.explicit_batch_dimension,
+            "explicit_precision": self.lower_setting.explicit_precision,
+            "strict_type_constraints": self.lower_setting.strict_type_constraints,
+            "algo_selector": self.lower_setting.algo_selector,
+            "tactic_sources": self.lower_setting.tactic_sources,
+            "verbose_profile": self.lower_setting.verbose_profile,
+            "refit": self.lower_setting.refit,
+        }
+
+    def _load_cached_engine(self, cache_key: str) -> Optional[TRTInterpreterResult]:
+        entry = self.engine_cache.get(cache_key)
+        if entry is None:
+            return None
+
+        runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        engine = runtime.deserialize_cuda_engine(entry.serialized_engine)
+        if engine is None:
+            logger.warning(f"Cannot deserialize cached engine {cache_key}, rebuilding.")
+            self.engine_cache.remove(cache_key)
+            return None
+
+        return TRTInterpreterResult(
+            engine,
+            entry.input_names,
+            entry.output_names,
+            bytearray(),
+            weight_name_map_from_json(entry.metadata.get("weight_name_map", {})),
         )
-        return LowerTrtInterpreter(lower_setting, timing_cache_manager)
 
     def __call__(self, mod, input, split_name) -> TRTInterpreterResult:
         assert self.lower_setting.input_specs, "Can't find input specs for lowering!"
@@ -108,6 +171,25 @@ class LowerTrtInterpreter:
             f"split_name={split_name}, input_specs={self.lower_setting.input_specs}"
         )
 
+        # The dynamic ranges of the nodes of this split only.
+        dynamic_ranges = {
+            node.name: self.lower_setting.dynamic_ranges[node.name]
+            for node in mod.graph.nodes
+            if node.name in self.lower_setting.dynamic_ranges
+        }
+
+        cache_key = None
+        if self.engine_cache:
+            cache_key = engine_cache_key(
+                mod,
+                self.lower_setting.input_specs,
+                {**self._builder_settings(), "dynamic_ranges": dynamic_ranges},
+            )
+            cached_result = self._load_cached_engine(cache_key)
+            if cached_result is not None:
+                logger.info(f"Engine cache hit for {split_name}, skip building.")
+                return cached_result
+
         # Prepare algorithm selector and timing_cache for TRTInterpreter
         algo_selector = None
         if self.lower_setting.algo_selector:
@@ -142,6 +224,8 @@ class LowerTrtInterpreter:
             if self.lower_setting.verbose_profile
             else trt.ProfilingVerbosity.LAYER_NAMES_ONLY,
             tactic_sources=self.lower_setting.tactic_sources,
+            refit=self.lower_setting.refit,
+            dynamic_ranges=dynamic_ranges,
         )
 
         # Update timing cache file if needed
@@ -149,6 +233,18 @@ class LowerTrtInterpreter:
         if timing_cache and self.timing_cache_manager:
             self.timing_cache_manager.update_timing_cache(split_name, timing_cache)
 
+        if self.engine_cache:
+            self.engine_cache.put(
+                cache_key,
+                interp_result.engine.serialize(),
+                interp_result.input_names,
+                interp_result.output_names,
+                split_name=split_name,
+                weight_name_map=weight_name_map_to_json(
+                    interp_result.weight_name_map or {}
+                ),
+            )
+
         return interp_result
 
 
@@ -168,18 +264,94 @@ def create_lower_trt_interpreter(lower_setting: LowerSetting) -> LowerTrtInterpr
     return LowerTrtInterpreter.create(lower_setting)
 
 
+def _lower_split_in_worker(
+    create_trt_interpreter: Callable[[LowerSetting], LowerTrtInterpreter],
+    mod: nn.Module,
+    input: Input,
+    lower_setting: LowerSetting,
+    split_name: str,
+) -> TRTInterpreterResult:
+    return create_trt_interpreter(lower_setting)(mod, input, split_name)
+
+
+def default_parallel_build(
+    create_trt_interpreter: Callable[[LowerSetting], LowerTrtInterpreter],
+) -> Callable:
+    def parallel_build(
+        jobs: Sequence[Tuple[str, nn.Module, Input, List[InputTensorSpec]]],
+        lower_setting: LowerSetting,
+    ) -> Dict[str, TRTInterpreterResult]:
+        """
+        Build the engines of several splits concurrently. Each job is a tuple of
+        (split name, submodule, submodule inputs, input specs).
+        """
+        # Fuse passes and calibration data are not needed to build an engine
+        # and may not be picklable, so they are not sent to the workers. Timing
+        # caches are saved once by the parent after merging all the workers'.
+        def worker_lower_setting(input_specs: List[InputTensorSpec]) -> LowerSetting:
+            setting = dc.replace(
+                lower_setting,
+                customized_fuse_pass=PassManager.build_from_passlist([]),
+                lower_basic_fuse_pass=PassManager.build_from_passlist([]),
+                save_timing_cache=False,
+                calibration_data=None,
+                input_specs=input_specs,
+            )
+            # Not a dataclass field, so dc.replace doesn't copy it.
+            setting.algo_selector = lower_setting.algo_selector
+            return setting
+
+        results = build_engines_in_parallel(
+            partial(_lower_split_in_worker, create_trt_interpreter),
+            [
+                (
+                    name,
+                    (
+                        mod,
+                        input,
+                        worker_lower_setting(input_specs),
+                        name,
+                    ),
+                )
+                for name, mod, input, input_specs in jobs
+            ],
+            lower_setting.parallel_build_workers,
+        )
+
+        TimingCacheManager(
+            lower_setting.timing_cache_prefix,
+            lower_setting.save_timing_cache,
+            lower_setting.shared_timing_cache,
+        ).update_timing_caches(
+            {
+                name: result.serialized_cache
+                for name, result in results.items()
+                if result.serialized_cache
+            }
+        )
+        return results
+
+    return parallel_build
+
+
 def default_lower_pass(
     create_trt_interpreter: Callable[[LowerSetting], LowerTrtInterpreter],
 ) -> PassFunc:
     def lower_pass(
-        mod: nn.Module, input: Input, lower_setting: LowerSetting, module_name: str
+        mod: nn.Module,
+        input: Input,
+        lower_setting: LowerSetting,
+        module_name: str,
+        interp_res: Optional[TRTInterpreterResult] = None,
     ) -> nn.Module:
         """
         Create a module transformation pass which lowers an `fx.GraphModule` into a
-        `TRTModule`
+        `TRTModule`. If `interp_res` is given, the engine was already built
+        (e.g. by a parallel build) and is only wrapped.
         """
-        interpreter = create_trt_interpreter(lower_setting)
-        interp_res: TRTInterpreterResult = interpreter(mod, input, module_name)
+        if interp_res is None:
+            interpreter = create_trt_interpreter(lower_setting)
+            interp_res = interpreter(mod, input, module_name)
         if lower_setting.use_experimental_rt:
             import io
 
@@ -196,6 +368,7 @@ def default_lower_pass(
                 input_binding_names=interp_res.input_names,
                 output_binding_names=interp_res.output_names,
                 target_device=Device(f"cuda:{torch.cuda.current_device()}"),
+                weight_name_map=interp_res.weight_name_map,
                 # cuda_graph_batch_size=lower_setting.cuda_graph_batch_size, # NOTE: Not sure what this is supposed to do
             )
             return trt_module
@@ -206,6 +379,7 @@ def default_lower_pass(
                 input_names=interp_res.input_names,
                 output_names=interp_res.output_names,
                 cuda_graph_batch_size=lower_setting.cuda_graph_batch_size,
+                weight_name_map=interp_res.weight_name_map,
             )
             return trt_module
 
@@ -256,6 +430,7 @@ class Lowerer:
                     ),
                     split_func=split_func,
                     lower_func=default_lower_pass(interpreter_builder),
+                    parallel_build_func=default_parallel_build(interpreter_builder),
                 )
             )
         # proxytensor_trace
@@ -268,6 +443,7 @@ class Lowerer:
                     ),
                     split_func=split_func,
                     lower_func=default_lower_pass(interpreter_builder),
+                    parallel_build_func=default_parallel_build(interpreter_builder),
                 )
             )
 
@@ -282,10 +458,6 @@ class Lowerer:
         atol = lower_setting.correctness_atol
         rtol = lower_setting.correctness_rtol
 
-        @validate_inference(
-            atol=atol,
-            rtol=rtol,
-        )
         def do_lower(module: nn.Module, inputs: Input) -> nn.Module:
             module.eval()
             if (
@@ -317,4 +489,8 @@ class Lowerer:
             lower_result = pm(module)
             return lower_result
 
+        # With validate_splits, the lowered splits are validated one by one
+        # instead of the whole lowered module.
+        if not lower_setting.validate_splits:
+            do_lower = validate_inference(atol=atol, rtol=rtol)(do_lower)
         return do_lower(module, inputs)
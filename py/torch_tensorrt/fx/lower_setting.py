@@ -1,5 +1,5 @@
 import dataclasses as dc
-from typing import List, Optional, Set, Type
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
 
 from torch import nn
 from torch.fx.passes.pass_manager import PassManager
@@ -63,17 +63,64 @@ class LowerSetting(LowerSettingBasic):
     cache file at execution time if valid timing cache file is provided.
     save_timing_cache: Save updated timing cache data into timing cache file if the timing
     cache file is provided.
+    shared_timing_cache: Path of a timing cache shared by all splits, used instead of the per
+    split files of timing_cache_prefix. It is loaded once per process, and with
+    save_timing_cache the caches of all the builds are merged into it and it is written
+    atomically under a file lock, so concurrent compile jobs can share and grow one cache.
     cuda_graph_batch_size (int): Cuda graph batch size, default to be -1.
     preset_lowerer (str): when specified, use a preset logic to build the
     instance of Lowerer.
     only used by explicit batch dim with dynamic shape mode. In general, we use 2 GPU setting with
     2 stream on each. Set total number to 8 as a safe default value.
+    batch_size_profiles: (min, opt, max) batch sizes of the optimization profiles of dynamic batch
+    engines, e.g. derived from recorded traffic with `tools.shape_profiles.cluster_batch_sizes`.
+    When set, it replaces the opt_profile_replica identical (0, max_batch_size, max_batch_size)
+    profiles.
     dynamic_batch: enable the dynamic shape in TRT with dim=-1 for the 1st dimension.
     tactic_sources: tactic sources for TensorRT kernel selection. Default to None,
     meaning all possible tactic sources.
     correctness_atol: absolute tolerance for correctness check
     correctness_rtol: relative tolerance for correctness check
     use_experimental_rt: Uses the next generation TRTModule which supports both Python and TorchScript based execution (including in C++).
+    engine_cache_dir: Directory of the persistent engine cache. When set, engines are looked up
+    by a hash of the submodule graph, weights, input specs and builder settings before building,
+    and stored there after building. Empty string disables the cache.
+    engine_cache_max_size: Size budget of the engine cache in bytes. Least recently used engines
+    are evicted once it is exceeded. 0 means unbounded.
+    parallel_build_workers: When greater than 1, the engines of independent TRT splits are built
+    concurrently in a pool of that many worker processes. The interpreter builder passed to the
+    `Lowerer` must be picklable in this mode.
+    refit: Build refittable engines and record which FX weights their weights come from, so
+    the lowered TRTModules can be updated with new weights by `TRTModule.refit` instead of
+    being rebuilt. Refittable engines may be slightly slower.
+    refit_identical_splits: Build a single refittable engine for each group of TRT splits with
+    identical graphs, shapes and dtypes, e.g. repeated layers, and lower the other splits of the
+    group by refitting a copy of it with their own weights. Splits whose weights can't all be
+    refitted by name are built as usual.
+    calibration_data: Batches of inputs, each a tensor or a list of tensors, to calibrate INT8
+    dynamic ranges on when lower_precision is INT8. It is iterated twice by the histogram
+    methods, so it must be a list or a DataLoader rather than a generator. None lowers INT8
+    without dynamic ranges, which only works for graphs with explicit quantization.
+    calibration_method: "minmax", "percentile" or "entropy", see `tools.calibration`.
+    calibration_percentile: Percentile of the absolute values used by the "percentile" method.
+    calibration_cache_dir: Directory of the calibration cache, keyed by graph. Empty string
+    disables the cache.
+    dynamic_ranges: INT8 dynamic ranges by FX node name, passed to `TRTInterpreter.run`. Filled
+    by the calibration pass, or set directly.
+    drop_lowered_weights: Once the TRT splits are lowered, free the PyTorch weights read only by
+    them, which are also emptied in the module passed to the lowering. Weights still read by
+    fallback submodules are kept.
+    lowered_weights_offload_device: With drop_lowered_weights, move these weights to this device,
+    e.g. "cpu", instead of freeing them. Empty string frees them.
+    validate_splits: Check each lowered TRT split alone against the inputs and outputs of the
+    original split, recorded in one run of the split module, with correctness_atol and
+    correctness_rtol, instead of comparing the whole original and lowered modules. Lowering
+    stops at the first split out of tolerance.
+    validation_cache_dir: Directory where the reference activations of validate_splits are kept,
+    keyed by split graph and model inputs, so later lowerings of the same model reuse them.
+    Empty string uses a temporary directory, for the activations spilled to disk only.
+    validation_cache_max_memory: Bytes of reference activations kept in memory, the others are
+    spilled to disk.
     """
 
     input_specs: List[InputTensorSpec] = dc.field(default_factory=list)
@@ -93,11 +140,28 @@ class LowerSetting(LowerSettingBasic):
     algo_selector = None
     timing_cache_prefix: str = ""
     save_timing_cache: bool = False
+    shared_timing_cache: str = ""
     cuda_graph_batch_size: int = -1
     preset_lowerer: str = ""
     opt_profile_replica: int = 8
+    batch_size_profiles: List[Tuple[int, int, int]] = dc.field(default_factory=list)
     dynamic_batch: bool = True
     tactic_sources: Optional[int] = None
     correctness_atol: float = 0.1
     correctness_rtol: float = 0.1
     use_experimental_rt: bool = False
+    engine_cache_dir: str = ""
+    engine_cache_max_size: int = 0
+    parallel_build_workers: int = 0
+    refit: bool = False
+    refit_identical_splits: bool = False
+    calibration_data: Optional[Iterable[Any]] = None
+    calibration_method: str = "entropy"
+    calibration_percentile: float = 99.99
+    calibration_cache_dir: str = ""
+    dynamic_ranges: Dict[str, Tuple[float, float]] = dc.field(default_factory=dict)
+    drop_lowered_weights: bool = False
+    lowered_weights_offload_device: str = ""
+    validate_splits: bool = False
+    validation_cache_dir: str = ""
+    validation_cache_max_memory: int = 1 << 30
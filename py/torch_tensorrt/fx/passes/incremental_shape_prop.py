@@ -0,0 +1,317 @@
+import contextlib
+import logging
+from typing import Any, Dict, Optional, Sequence, Set, Type
+
+import torch
+from torch import fx
+from torch.fx.node import map_aggregate
+from torch.fx.passes.shape_prop import (
+    _extract_tensor_metadata,
+    ShapeProp,
+    TensorMetadata,
+)
+
+from ..observer import span
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+"""
+Incremental shape propagation.
+
+The lowering pipeline needs up to date `tensor_meta` on every node before each
+pass, but re-running the whole model on real inputs once per pass dominates
+lowering time on large graphs. After a propagation every node is stamped with
+a signature of what its metadata depends on: op, target, arguments, the
+shapes and dtypes of the parameters it reads and, for submodules, their
+`extra_repr`, e.g. the stride of a convolution, or their code for graph
+modules. Before the next pass only the nodes whose signature changed (new or
+rewritten nodes), or which were explicitly marked dirty, are re-propagated
+along with their downstream cone.
+The nodes re-propagated run on fake tensors rebuilt from the `tensor_meta` of
+their clean inputs, so clean nodes are never executed again.
+"""
+
+# If False, propagate_shapes always runs a full shape propagation.
+INCREMENTAL_SHAPE_PROP: bool = True
+
+_SIGNATURE_KEY = "shape_prop_signature"
+_DIRTY_KEY = "shape_prop_dirty"
+
+
+@contextlib.contextmanager
+def override_incremental_shape_prop(enabled: bool):
+    """
+    A context manager to turn incremental shape propagation on or off.
+
+    Example:
+
+    >>> # always run full shape propagation
+    >>> with override_incremental_shape_prop(False):
+    >>>     lower(module, sample_input)
+    """
+    global INCREMENTAL_SHAPE_PROP
+    old_value = INCREMENTAL_SHAPE_PROP
+    INCREMENTAL_SHAPE_PROP = enabled
+    try:
+        yield
+    finally:
+        INCREMENTAL_SHAPE_PROP = old_value
+
+
+def mark_dirty(*nodes: fx.Node) -> None:
+    """
+    Force `nodes` to be re-propagated by the next shape propagation. Only
+    needed for rewrites the node signature doesn't capture, e.g. changing an
+    attribute of a submodule missing from its `extra_repr`. New nodes and
+    nodes whose arguments changed are detected automatically.
+    """
+    for node in nodes:
+        node.meta[_DIRTY_KEY] = True
+
+
+def propagate_shapes(
+    gm: fx.GraphModule,
+    inputs: Sequence[Any],
+    shape_prop_cls: Type[ShapeProp] = ShapeProp,
+) -> None:
+    """
+    Populate `tensor_meta` of the nodes of `gm`, incrementally if enabled.
+    """
+    with span(
+        shape_prop_cls.__name__,
+        "shape_prop",
+        incremental=INCREMENTAL_SHAPE_PROP,
+        num_nodes=len(gm.graph.nodes),
+    ):
+        if INCREMENTAL_SHAPE_PROP:
+            IncrementalShapeProp(gm, shape_prop_cls).propagate(*inputs)
+        else:
+            shape_prop_cls(gm).propagate(*inputs)
+
+
+def _tensor_signature(t: Any) -> Any:
+    if isinstance(t, torch.Tensor):
+        return ("tensor", tuple(t.shape), t.dtype, t.is_quantized)
+    return ("value", id(t))
+
+
+def _arg_signature(arg: Any) -> Any:
+    def sign(a: Any) -> Any:
+        if isinstance(a, fx.Node):
+            return ("node", a.name)
+        if isinstance(a, torch.Tensor):
+            return _tensor_signature(a)
+        return a
+
+    return map_aggregate(arg, sign)
+
+
+def _module_config(module: torch.nn.Module) -> str:
+    """The non tensor configuration of `module` that may change its outputs."""
+    if isinstance(module, fx.GraphModule):
+        return module.code
+    return module.extra_repr()
+
+
+def _node_signature(gm: fx.GraphModule, node: fx.Node, input_value: Any) -> Any:
+    if node.op == "placeholder":
+        target: Any = (node.target, _tensor_signature(input_value))
+    elif node.op == "get_attr":
+        attr: Any = gm
+        for atom in str(node.target).split("."):
+            attr = getattr(attr, atom)
+        target = (node.target, _tensor_signature(attr))
+    elif node.op == "call_module":
+        submod = gm.get_submodule(str(node.target))
+        target = (
+            node.target,
+            tuple(
+                (name, type(m), _module_config(m)) for name, m in submod.named_modules()
+            ),
+            tuple(
+                (name, _tensor_signature(t))
+                for name, t in submod.state_dict(keep_vars=True).items()
+            ),
+        )
+    else:
+        target = node.target
+    return (
+        node.op,
+        target,
+        _arg_signature(node.args),
+        _arg_signature(dict(node.kwargs)),
+    )
+
+
+def _can_reconstruct(meta: Any) -> bool:
+    """Whether a value matching the `tensor_meta` `meta` can be rebuilt."""
+    if isinstance(meta, TensorMetadata):
+        return not meta.is_quantized
+    if isinstance(meta, (list, tuple)):
+        return all(_can_reconstruct(m) for m in meta)
+    if isinstance(meta, dict):
+        return all(_can_reconstruct(m) for m in meta.values())
+    return False
+
+
+def _signature_changed(node: fx.Node, signature: Any) -> bool:
+    if node.meta.get(_DIRTY_KEY, False) or _SIGNATURE_KEY not in node.meta:
+        return True
+    try:
+        return bool(node.meta[_SIGNATURE_KEY] != signature)
+    except Exception:
+        return True
+
+
+class IncrementalShapeProp:
+    """
+    Shape propagation that only re-runs the nodes whose metadata may have
+    changed since the last propagation of the graph.
+
+    Args:
+        gm: The graph module to propagate shapes through.
+        shape_prop_cls: ShapeProp class used to run nodes, e.g. AccShapeProp
+            to get its fp16 fallback.
+        tensor_mode: "fake" to re-propagate on fake tensors, which works with
+            real parameters, or "meta" to re-propagate on meta tensors, which
+            only works for graphs without parameters.
+    """
+
+    def __init__(
+        self,
+        gm: fx.GraphModule,
+        shape_prop_cls: Type[ShapeProp] = ShapeProp,
+        tensor_mode: str = "fake",
+    ):
+        assert tensor_mode in ("fake", "meta"), f"Unknown tensor mode {tensor_mode}"
+        self.gm = gm
+        self.shape_prop_cls = shape_prop_cls
+        self.tensor_mode = tensor_mode
+
+    def propagate(self, *args: Any) -> None:
+        nodes = [n for n in self.gm.graph.nodes if n.op != "output"]
+        placeholder_values: Dict[fx.Node, Any] = dict(
+            zip([n for n in nodes if n.op == "placeholder"], args)
+        )
+        signatures = {
+            n: _node_signature(self.gm, n, placeholder_values.get(n)) for n in nodes
+        }
+        dirty = [n for n in nodes if _signature_changed(n, signatures[n])]
+
+        if not dirty:
+            return
+
+        if len(dirty) == len(nodes):
+            self._full_propagate(args, signatures)
+            return
+
+        try:
+            num_run = self._incremental_propagate(dirty, placeholder_values)
+        except Exception as e:
+            _LOGGER.debug(
+                f"Incremental shape propagation failed, falling back to a full one: {e}"
+            )
+            self._full_propagate(args, signatures)
+            return
+
+        _LOGGER.debug(f"Incrementally propagated {num_run} of {len(nodes)} nodes")
+        self._stamp(signatures)
+
+    def _full_propagate(self, args: Sequence[Any], signatures: Dict[fx.Node, Any]):
+        self.shape_prop_cls(self.gm).propagate(*args)
+        self._stamp(signatures)
+
+    def _stamp(self, signatures: Dict[fx.Node, Any]) -> None:
+        for node, signature in signatures.items():
+            node.meta[_SIGNATURE_KEY] = signature
+            node.meta.pop(_DIRTY_KEY, None)
+
+    def _incremental_propagate(
+        self,
+        dirty: Sequence[fx.Node],
+        placeholder_values: Dict[fx.Node, Any],
+    ) -> int:
+        # Dirty nodes and their downstream cone.
+        to_run: Set[fx.Node] = set()
+        worklist = list(dirty)
+        while worklist:
+            node = worklist.pop()
+            if node in to_run or node.op == "output":
+                continue
+            to_run.add(node)
+            worklist.extend(node.users)
+
+        # Inputs of the nodes to run that can't be rebuilt from their metadata,
+        # e.g. python scalars, are run as well.
+        worklist = list(to_run)
+        while worklist:
+            node = worklist.pop()
+            for in_node in node.all_input_nodes:
+                if in_node in to_run or in_node.op in ("placeholder", "get_attr"):
+                    continue
+                if not _can_reconstruct(in_node.meta.get("tensor_meta")):
+                    to_run.add(in_node)
+                    worklist.append(in_node)
+
+        # Rebuilt tensors live on the device of the inputs.
+        device = next(
+            (
+                v.device
+                for v in placeholder_values.values()
+                if isinstance(v, torch.Tensor)
+            ),
+            torch.device("cpu"),
+        )
+        if self.tensor_mode == "meta":
+            device = torch.device("meta")
+
+        interpreter = self.shape_prop_cls(self.gm)
+        fake_mode = self._fake_mode()
+        with fake_mode or contextlib.nullcontext():
+            for node in self.gm.graph.nodes:
+                if node.op == "output":
+                    continue
+                if node.op == "placeholder":
+                    value = placeholder_values[node]
+                    if node in to_run and isinstance(value, torch.Tensor):
+                        node.meta["tensor_meta"] = _extract_tensor_metadata(value)
+                    interpreter.env[node] = self._convert(value, fake_mode)
+                elif node in to_run or node.op == "get_attr":
+                    interpreter.env[node] = interpreter.run_node(node)
+                elif any(user in to_run for user in node.users):
+                    interpreter.env[node] = self._reconstruct(
+                        node.meta["tensor_meta"], device
+                    )
+
+        return len(to_run)
+
+    def _fake_mode(self) -> Optional[Any]:
+        if self.tensor_mode != "fake":
+            return None
+        from torch._subclasses.fake_tensor import FakeTensorMode
+
+        return FakeTensorMode(allow_non_fake_inputs=True)
+
+    def _convert(self, value: Any, fake_mode: Optional[Any]) -> Any:
+        if not isinstance(value, torch.Tensor):
+            return value
+        if fake_mode is not None:
+            return fake_mode.from_tensor(value)
+        return value.to("meta")
+
+    def _reconstruct(self, meta: Any, device: torch.device) -> Any:
+        """Build a tensor, or structure of tensors, matching `meta`."""
+        if isinstance(meta, TensorMetadata):
+            return torch.empty_strided(
+                meta.shape,
+                meta.stride,
+                dtype=meta.dtype,
+                device=device,
+                requires_grad=meta.requires_grad,
+            )
+        if isinstance(meta, tuple) and hasattr(meta, "_fields"):
+            return type(meta)(*(self._reconstruct(m, device) for m in meta))
+        if isinstance(meta, (list, tuple)):
+            return type(meta)(self._reconstruct(m, device) for m in meta)
+        assert isinstance(meta, dict)
+        return {k: self._reconstruct(v, device) for k, v in meta.items()}
@@ -1,12 +1,12 @@
+import dataclasses as dc
 import datetime
 import logging
 from functools import partial, wraps
-from typing import Any, Callable, Optional, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 import torch
 from torch import nn
 from torch.fx.passes.pass_manager import inplace_wrapper, PassManager
-from torch.fx.passes.shape_prop import ShapeProp
 from torch.fx.passes.splitter_base import generate_inputs_for_submodules, SplitResult
 from torch_tensorrt.fx.passes.pass_utils import apply_bfloat_float_conversion
 from torch_tensorrt.fx.utils import LowerPrecision
@@ -14,8 +14,14 @@ from torch_tensorrt.fx.utils import LowerPrecision
 from ..input_tensor_spec import generate_input_specs
 
 from ..lower_setting import LowerSetting
-from ..observer import Observer
+from ..observer import Observer, span
+from ..refit import refitted_copy
+from ..tools.calibration import calibrate
+from ..tools.engine_cache import graph_fingerprint, input_specs_fingerprint
+from ..tools.split_validation import ActivationCache, SplitValidator
+from ..weight_manager import release_lowered_weights
 from ..passes.remove_duplicate_output_args import remove_duplicate_output_args
+from .incremental_shape_prop import propagate_shapes
 from .graph_opts import common_subexpression_elimination
 
 from .lower_basic_pass import (  # noqa
@@ -61,11 +67,36 @@ LOWER_SPLIT_POST_OBSERVER: Observer[Callable[[str, nn.Module, Input], None]] = O
 # ----------------------------------------------------------------------
 
 
+def _traced(pass_: Callable, name: Optional[str] = None) -> Callable:
+    """Wrap a pass to report a span, see `observer.span`, each time it runs."""
+    if name is None:
+        func = pass_.func if isinstance(pass_, partial) else pass_
+        name = getattr(func, "__name__", type(func).__name__)
+
+    def traced_pass(*args, **kwargs):
+        with span(name, "pass"):
+            return pass_(*args, **kwargs)
+
+    return traced_pass
+
+
+def _build_pass_manager(passes: Sequence[Callable]) -> PassManager:
+    return PassManager.build_from_passlist([_traced(p) for p in passes])
+
+
+def _refit_lower_setting(lower_setting: LowerSetting) -> LowerSetting:
+    """A copy of `lower_setting` building refittable engines."""
+    setting = dc.replace(lower_setting, refit=True)
+    # Not a dataclass field, so dc.replace doesn't copy it.
+    setting.algo_selector = lower_setting.algo_selector
+    return setting
+
+
 def wrapper(fn: Callable, input) -> Callable:
     @wraps(fn)
     def wrapped_fn(gm):
         if isinstance(gm, torch.fx.GraphModule):
-            ShapeProp(gm).propagate(*input)
+            propagate_shapes(gm, input)
         return fn(gm, input)
 
     return wrapped_fn
@@ -81,6 +112,10 @@ class LowerPassManagerBuilder:
         _split_func: the fx2trt split function.
         _lower_func: function to create and run `TRTInterpreter` to convert `fx.GraphModule`
             into a TensorRT engine.
+        _parallel_build_func: optional function building the engines of several splits
+            concurrently, used when `lower_setting.parallel_build_workers` > 1. It takes a list
+            of (split name, submodule, inputs, input specs) and returns the interpreter result of
+            each split, which is then passed to `_lower_func` as `interp_res`.
 
     """
 
@@ -90,18 +125,20 @@ class LowerPassManagerBuilder:
         trace_func: Callable,
         split_func: Callable,
         lower_func: Callable,
+        parallel_build_func: Optional[Callable] = None,
     ):
         self.lower_setting = lower_setting
         self._trace_func = trace_func
         self._split_func = split_func
         self._lower_func = lower_func
+        self._parallel_build_func = parallel_build_func
 
     def _const_fold_pass(self) -> PassManager:
         passes = [
             wrapper(self._trace_func, self._input),
             run_const_fold,
         ]
-        return PassManager.build_from_passlist(passes)
+        return _build_pass_manager(passes)
 
     def graph_optimization_pass(self) -> PassManager:
         passes = [
@@ -126,7 +163,7 @@ class LowerPassManagerBuilder:
         )
         passes.append(fix_reshape_batch_dim)
 
-        return PassManager.build_from_passlist(passes)
+        return _build_pass_manager(passes)
 
     def graph_optimization_pass_aten(self) -> PassManager:
         passes = []
@@ -151,7 +188,27 @@ class LowerPassManagerBuilder:
         # TODO we most likely do not need it for aten
         # passes.append(fix_reshape_batch_dim)
 
-        return PassManager.build_from_passlist(passes)
+        return _build_pass_manager(passes)
+
+    def _calibration_pass(self) -> PassManager:
+        def calibration_func(mod: nn.Module) -> nn.Module:
+            # Node names are preserved by the split, so the ranges calibrated
+            # on the whole graph apply to the nodes of the TRT splits.
+            if (
+                getattr(self.lower_setting, "lower_precision", None)
+                is LowerPrecision.INT8
+                and getattr(self.lower_setting, "calibration_data", None) is not None
+            ):
+                self.lower_setting.dynamic_ranges = calibrate(
+                    mod,
+                    self.lower_setting.calibration_data,
+                    method=self.lower_setting.calibration_method,
+                    percentile=self.lower_setting.calibration_percentile,
+                    cache_dir=self.lower_setting.calibration_cache_dir,
+                )
+            return mod
+
+        return _build_pass_manager([calibration_func])
 
     def _split_pass(self) -> PassManager:
         passes = [
@@ -166,7 +223,7 @@ class LowerPassManagerBuilder:
                 )
             )
         )
-        return PassManager.build_from_passlist(passes)
+        return _build_pass_manager(passes)
 
     def _trt_lower_pass(self) -> PassManager:
         def lower_func(split_result: SplitResult) -> nn.Module:
@@ -183,8 +240,113 @@ class LowerPassManagerBuilder:
             else:
                 additional_submodule_inputs = None
 
+            def submod_input_specs(submod_name, submod_inputs):
+                return generate_input_specs(
+                    submod_inputs,
+                    self.lower_setting,
+                    additional_submodule_inputs[submod_name]
+                    if additional_submodule_inputs
+                    else None,
+                )
+
+            acc_submodule_names = [
+                submod_name
+                for submod_name in split_result.submodule_inputs
+                if not submod_name.startswith(split_result.non_acc_submodule_prefix)
+            ]
+
+            # Structurally identical submodules, e.g. repeated layers, get a
+            # copy of the refittable engine built for the first one of their
+            # group (its representative), refitted with their own weights.
+            representative: Dict[str, str] = {}
+            if getattr(self.lower_setting, "refit_identical_splits", False):
+                groups: Dict[Any, List[str]] = {}
+                for submod_name in acc_submodule_names:
+                    submod = getattr(split_result.split_module, submod_name)
+                    key = (
+                        graph_fingerprint(
+                            submod, include_weights=False, include_names=False
+                        ),
+                        input_specs_fingerprint(
+                            submod_input_specs(
+                                submod_name, split_result.submodule_inputs[submod_name]
+                            )
+                        ),
+                    )
+                    groups.setdefault(key, []).append(submod_name)
+                for names in groups.values():
+                    if len(names) > 1:
+                        _LOGGER.info(
+                            f"Submodules {names} are identical, building {names[0]} only"
+                        )
+                        for submod_name in names:
+                            representative[submod_name] = names[0]
+
+            def submod_lower_setting(submod_name):
+                if representative.get(submod_name) == submod_name:
+                    return _refit_lower_setting(self.lower_setting)
+                return self.lower_setting
+
+            prebuilt_results = {}
+            parallel_build_workers = getattr(
+                self.lower_setting, "parallel_build_workers", 0
+            )
+            # Siblings of a representative are not built.
+            to_build = [
+                submod_name
+                for submod_name in acc_submodule_names
+                if representative.get(submod_name, submod_name) == submod_name
+            ]
+            if (
+                self._parallel_build_func
+                and parallel_build_workers > 1
+                and len(to_build) > 1
+            ):
+                _LOGGER.info(
+                    f"Building {len(to_build)} submodules with {parallel_build_workers} workers"
+                )
+                for refit in (False, True):
+                    jobs = [
+                        (
+                            submod_name,
+                            getattr(split_result.split_module, submod_name),
+                            split_result.submodule_inputs[submod_name],
+                            submod_input_specs(
+                                submod_name, split_result.submodule_inputs[submod_name]
+                            ),
+                        )
+                        for submod_name in to_build
+                        if (submod_name in representative) == refit
+                    ]
+                    if jobs:
+                        prebuilt_results.update(
+                            self._parallel_build_func(
+                                jobs,
+                                _refit_lower_setting(self.lower_setting)
+                                if refit
+                                else self.lower_setting,
+                            )
+                        )
+
+            # Reference activations are recorded before any split is lowered.
+            validator = None
+            if getattr(self.lower_setting, "validate_splits", False):
+                validator = SplitValidator(
+                    atol=self.lower_setting.correctness_atol,
+                    rtol=self.lower_setting.correctness_rtol,
+                    cache=ActivationCache(
+                        self.lower_setting.validation_cache_dir,
+                        self.lower_setting.validation_cache_max_memory,
+                    ),
+                )
+                validator.record(
+                    split_result.split_module, acc_submodule_names, self._input
+                )
+
+            original_submodules = {}
             for submod_name, submod_inputs in split_result.submodule_inputs.items():
                 submod = getattr(split_result.split_module, submod_name)
+                original_submodules[submod_name] = submod
 
                 LOWER_SPLIT_PRE_OBSERVER.observe(submod_name, submod, submod_inputs)
 
@@ -192,28 +354,65 @@ class LowerPassManagerBuilder:
                 if not submod_name.startswith(split_result.non_acc_submodule_prefix):
                     _LOGGER.info(f"Now lowering submodule {submod_name}")
                     lowering_start_time = datetime.datetime.now()
-
-                    self.lower_setting.input_specs = generate_input_specs(
-                        submod_inputs,
-                        self.lower_setting,
-                        additional_submodule_inputs[submod_name]
-                        if additional_submodule_inputs
-                        else None,
-                    )
-                    lowered_module = self._lower_func(
-                        submod, submod_inputs, self.lower_setting, submod_name
-                    )
-                    setattr(split_result.split_module, submod_name, lowered_module)
-                    LOWER_SPLIT_POST_OBSERVER.observe(
-                        submod_name, lowered_module, submod_inputs
-                    )
-                    _LOGGER.info(
-                        f"Lowering submodule {submod_name} elapsed time {datetime.datetime.now() - lowering_start_time}"
-                    )
+                    with span(submod_name, "split"):
+                        self.lower_setting.input_specs = submod_input_specs(
+                            submod_name, submod_inputs
+                        )
+                        lowered_module = None
+                        rep_name = representative.get(submod_name, submod_name)
+                        if rep_name != submod_name:
+                            lowered_module = refitted_copy(
+                                getattr(split_result.split_module, rep_name),
+                                original_submodules[rep_name],
+                                submod,
+                            )
+                            if lowered_module is None:
+                                _LOGGER.info(
+                                    f"Cannot refit the engine of {rep_name} for {submod_name}, building it"
+                                )
+                            else:
+                                _LOGGER.info(
+                                    f"Lowered {submod_name} by refitting the engine of {rep_name}"
+                                )
+
+                        if lowered_module is None and submod_name in prebuilt_results:
+                            lowered_module = self._lower_func(
+                                submod,
+                                submod_inputs,
+                                submod_lower_setting(submod_name),
+                                submod_name,
+                                interp_res=prebuilt_results[submod_name],
+                            )
+                        elif lowered_module is None:
+                            lowered_module = self._lower_func(
+                                submod,
+                                submod_inputs,
+                                submod_lower_setting(submod_name),
+                                submod_name,
+                            )
+                        setattr(split_result.split_module, submod_name, lowered_module)
+                        LOWER_SPLIT_POST_OBSERVER.observe(
+                            submod_name, lowered_module, submod_inputs
+                        )
+                        _LOGGER.info(
+                            f"Lowering submodule {submod_name} elapsed time {datetime.datetime.now() - lowering_start_time}"
+                        )
+                    if validator is not None:
+                        validator.check(submod_name, lowered_module)
+
+            if validator is not None:
+                validator.close()
+
+            if getattr(self.lower_setting, "drop_lowered_weights", False):
+                release_lowered_weights(
+                    [original_submodules[name] for name in acc_submodule_names],
+                    split_result.split_module,
+                    self.lower_setting.lowered_weights_offload_device or None,
+                )
 
             return split_result.split_module
 
-        return PassManager.build_from_passlist([lower_func])
+        return _build_pass_manager([lower_func])
 
     def _default_lower_pass(self) -> PassManager:
         def lower_func(split_result: SplitResult) -> nn.Module:
@@ -234,33 +433,33 @@ class LowerPassManagerBuilder:
                 if not submod_name.startswith(split_result.non_acc_submodule_prefix):
                     _LOGGER.info(f"ACC submodule graph: {submod.graph}")
                     lowering_start_time = datetime.datetime.now()
-
-                    self.lower_setting.additional_inputs = (
-                        additional_submodule_inputs[submod_name]
-                        if additional_submodule_inputs
-                        else None,
-                    )
-
-                    lowered_module = self._lower_func(
-                        submod, submod_inputs, self.lower_setting, submod_name
-                    )
-                    setattr(split_result.split_module, submod_name, lowered_module)
-                    LOWER_SPLIT_POST_OBSERVER.observe(
-                        submod_name, lowered_module, submod_inputs
-                    )
-                    _LOGGER.info(
-                        f"Lowering submodule {submod_name} elapsed time {datetime.datetime.now() - lowering_start_time}"
-                    )
+                    with span(submod_name, "split"):
+                        self.lower_setting.additional_inputs = (
+                            additional_submodule_inputs[submod_name]
+                            if additional_submodule_inputs
+                            else None,
+                        )
+
+                        lowered_module = self._lower_func(
+                            submod, submod_inputs, self.lower_setting, submod_name
+                        )
+                        setattr(split_result.split_module, submod_name, lowered_module)
+                        LOWER_SPLIT_POST_OBSERVER.observe(
+                            submod_name, lowered_module, submod_inputs
+                        )
+                        _LOGGER.info(
+                            f"Lowering submodule {submod_name} elapsed time {datetime.datetime.now() - lowering_start_time}"
+                        )
                 else:
                     _LOGGER.info(f"GPU submodule graph: {submod.graph}")
                     apply_bfloat_float_conversion(submod, submod_inputs, submod_name)
 
             return split_result.split_module
 
-        return PassManager.build_from_passlist([lower_func])
+        return _build_pass_manager([lower_func])
 
     def _default_replace_mutable_op_pass(self) -> PassManager:
-        return PassManager.build_from_passlist([replace_mutable_op])
+        return _build_pass_manager([replace_mutable_op])
 
     def build_trt_lower_pipeline(
         self, input: Input, additional_input: Optional[Input] = None
@@ -269,11 +468,19 @@ class LowerPassManagerBuilder:
         self._additional_input = additional_input
         passes = []
 
-        passes.append(self._default_replace_mutable_op_pass())
-        passes.append(self._const_fold_pass())
-        passes.append(self.graph_optimization_pass())
-        passes.append(self._split_pass())
-        passes.append(self._trt_lower_pass())
+        passes.append(
+            _traced(
+                self._default_replace_mutable_op_pass(),
+                "default_replace_mutable_op_pass",
+            )
+        )
+        passes.append(_traced(self._const_fold_pass(), "const_fold_pass"))
+        passes.append(
+            _traced(self.graph_optimization_pass(), "graph_optimization_pass")
+        )
+        passes.append(_traced(self._calibration_pass(), "calibration_pass"))
+        passes.append(_traced(self._split_pass(), "split_pass"))
+        passes.append(_traced(self._trt_lower_pass(), "trt_lower_pass"))
 
         pm = PassManager.build_from_passlist(passes)
         return pm
@@ -285,11 +492,13 @@ class LowerPassManagerBuilder:
         self._additional_input = additional_input
         passes = []
         passes.append(
-            wrapper(self._trace_func, self._input),
+            _traced(wrapper(self._trace_func, self._input)),
+        )
+        passes.append(
+            _traced(self.graph_optimization_pass_aten(), "graph_optimization_pass_aten")
         )
-        passes.append(self.graph_optimization_pass_aten())
-        passes.append(self._split_pass())
-        passes.append(self._trt_lower_pass())
+        passes.append(_traced(self._split_pass(), "split_pass"))
+        passes.append(_traced(self._trt_lower_pass(), "trt_lower_pass"))
 
         pm = PassManager.build_from_passlist(passes)
         return pm
@@ -301,11 +510,18 @@ class LowerPassManagerBuilder:
         self._additional_input = additional_input
         passes = []
 
-        passes.append(self._default_replace_mutable_op_pass())
-        passes.append(self._const_fold_pass())
-        passes.append(self.graph_optimization_pass())
-        passes.append(self._split_pass())
-        passes.append(self._default_lower_pass())
+        passes.append(
+            _traced(
+                self._default_replace_mutable_op_pass(),
+                "default_replace_mutable_op_pass",
+            )
+        )
+        passes.append(_traced(self._const_fold_pass(), "const_fold_pass"))
+        passes.append(
+            _traced(self.graph_optimization_pass(), "graph_optimization_pass")
+        )
+        passes.append(_traced(self._split_pass(), "split_pass"))
+        passes.append(_traced(self._default_lower_pass(), "default_lower_pass"))
 
         pm = PassManager.build_from_passlist(passes)
         return pm
@@ -12,7 +12,8 @@ import torch
 import torch_tensorrt.fx.diagnostics as diagnostics
 from torch import fx
 from torch.fx.node import Node
-from torch.fx.passes.shape_prop import ShapeProp
+
+from .incremental_shape_prop import propagate_shapes
 
 # Create an alias for module input type to avoid littering pyre-ignore for Any
 # throughout the file.
@@ -141,7 +142,7 @@ def chain_passes(*passes: PassFunc) -> PassFunc:
     def parent_pass(module: fx.GraphModule, input: Input) -> fx.GraphModule:
         for pass_ in passes:
             if isinstance(module, torch.fx.GraphModule):
-                ShapeProp(module).propagate(*input)
+                propagate_shapes(module, input)
             module = pass_(module, input)
         return module
 
@@ -0,0 +1,381 @@
+import contextlib
+import copy
+import logging
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+# @manual=//deeplearning/trt/python:py_tensorrt
+import tensorrt as trt
+import torch
+import torch.fx
+
+logger = logging.getLogger(__name__)
+
+"""
+Weight refitting of TensorRT engines.
+
+While a network is built for a refittable engine, every weight array handed to
+TensorRT that is a view of a module parameter, buffer or `get_attr` tensor is
+named after it with `INetworkDefinition.set_weights_name`. The resulting map
+from TensorRT weight names to their FX source lets new weights be pushed into
+the built engine with a `trt.Refitter` instead of rebuilding it.
+"""
+
+
+class RefitWeight(NamedTuple):
+    """
+    How an engine weight is derived from an FX weight: the tensor `name`,
+    of shape `source_shape`, viewed with `shape`, `stride` and
+    `storage_offset` and cast to `dtype`.
+    """
+
+    name: str
+    source_shape: Tuple[int, ...]
+    shape: Tuple[int, ...]
+    stride: Tuple[int, ...]
+    storage_offset: int
+    dtype: torch.dtype
+
+    def materialize(self, tensor: torch.Tensor) -> np.ndarray:
+        """Derive the engine weight from a new value of the FX weight."""
+        if tuple(tensor.shape) != self.source_shape:
+            raise RuntimeError(
+                f"Cannot refit {self.name}, expected shape {self.source_shape}, "
+                f"got {tuple(tensor.shape)}."
+            )
+        tensor = tensor.detach()
+        if tensor.is_quantized:
+            tensor = tensor.dequantize()
+        tensor = tensor.contiguous()
+        view = tensor.as_strided(
+            self.shape, self.stride, tensor.storage_offset() + self.storage_offset
+        )
+        return view.to(self.dtype).cpu().contiguous().numpy()
+
+
+def weight_name_map_to_json(weight_name_map: Dict[str, RefitWeight]) -> Dict[str, Any]:
+    """Convert a weight name map to JSON serializable values."""
+    return {
+        trt_name: [
+            w.name,
+            list(w.source_shape),
+            list(w.shape),
+            list(w.stride),
+            w.storage_offset,
+            str(w.dtype).split(".")[-1],
+        ]
+        for trt_name, w in weight_name_map.items()
+    }
+
+
+def weight_name_map_from_json(data: Dict[str, Any]) -> Dict[str, RefitWeight]:
+    """Inverse of `weight_name_map_to_json`."""
+    return {
+        trt_name: RefitWeight(
+            name,
+            tuple(source_shape),
+            tuple(shape),
+            tuple(stride),
+            storage_offset,
+            getattr(torch, dtype),
+        )
+        for trt_name, (
+            name,
+            source_shape,
+            shape,
+            stride,
+            storage_offset,
+            dtype,
+        ) in data.items()
+    }
+
+
+def _storage_key(tensor: torch.Tensor) -> Tuple[torch.device, int]:
+    return tensor.device, tensor.untyped_storage().data_ptr()
+
+
+class WeightRecorder:
+    """
+    Records the weight arrays converters pass to TensorRT that are views of
+    the tensors in `named_tensors`, so they can be named in the network.
+
+    Args:
+        named_tensors: (FX name, tensor) pairs of the weights of the module
+            being converted.
+    """
+
+    def __init__(self, named_tensors: Iterable[Tuple[str, Any]]):
+        self._sources: Dict[Tuple[torch.device, int], Tuple[str, torch.Tensor]] = {}
+        for name, tensor in named_tensors:
+            if (
+                not isinstance(tensor, torch.Tensor)
+                or tensor.is_quantized
+                or tensor.numel() == 0
+                or not tensor.is_contiguous()
+            ):
+                continue
+            self._sources.setdefault(_storage_key(tensor), (name, tensor))
+        self._records: List[Tuple[np.ndarray, RefitWeight]] = []
+
+    def record(
+        self,
+        tensor: torch.Tensor,
+        array: np.ndarray,
+        dtype: Optional[torch.dtype] = None,
+    ) -> None:
+        """
+        Record that `array`, given to TensorRT, holds `tensor` cast to `dtype`.
+        Ignored if `tensor` doesn't view one of the recorded weights.
+        """
+        if tensor.is_quantized or tensor.numel() == 0:
+            return
+        source = self._sources.get(_storage_key(tensor))
+        if source is None:
+            return
+        name, source_tensor = source
+        if tensor.dtype != source_tensor.dtype:
+            return
+        self._records.append(
+            (
+                array,
+                RefitWeight(
+                    name,
+                    tuple(source_tensor.shape),
+                    tuple(tensor.shape),
+                    tuple(tensor.stride()),
+                    tensor.storage_offset() - source_tensor.storage_offset(),
+                    dtype or tensor.dtype,
+                ),
+            )
+        )
+
+    def name_weights(self, network: "trt.INetworkDefinition") -> Dict[str, RefitWeight]:
+        """
+        Name the recorded weights in `network` and return the map from their
+        TensorRT names to their source. Arrays that converters transformed
+        further before handing them to TensorRT are not used by the network.
+        FX weights with such a use are left out of the map altogether, since
+        refitting only their other uses would leave the engine inconsistent.
+        """
+        weight_name_map: Dict[str, RefitWeight] = {}
+        transformed: Set[str] = set()
+        # Arrays of a weight shared by several layers are named once.
+        named: Set[Tuple[int, RefitWeight]] = set()
+        for array, weight in self._records:
+            if (array.ctypes.data, weight) in named:
+                continue
+            named.add((array.ctypes.data, weight))
+            trt_name = weight.name
+            suffix = 0
+            while trt_name in weight_name_map:
+                suffix += 1
+                trt_name = f"{weight.name}_{suffix}"
+            if network.set_weights_name(trt.Weights(array), trt_name):
+                weight_name_map[trt_name] = weight
+            else:
+                transformed.add(weight.name)
+        return {k: w for k, w in weight_name_map.items() if w.name not in transformed}
+
+
+_active = threading.local()
+
+
+@contextlib.contextmanager
+def record_weights(recorder: WeightRecorder) -> Iterator[WeightRecorder]:
+    """Make `recorder` receive the weights converted in this thread."""
+    previous = getattr(_active, "recorder", None)
+    _active.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _active.recorder = previous
+
+
+def record_weight(
+    tensor: torch.Tensor, array: np.ndarray, dtype: Optional[torch.dtype] = None
+) -> None:
+    """Report a weight array to the active recorder, if any."""
+    recorder = getattr(_active, "recorder", None)
+    if recorder is not None:
+        recorder.record(tensor, array, dtype)
+
+
+def refittable_weights(
+    engine: "trt.ICudaEngine", weight_name_map: Dict[str, RefitWeight]
+) -> Dict[str, RefitWeight]:
+    """Restrict `weight_name_map` to the weights `engine` can refit."""
+    if not engine.refittable:
+        return {}
+    refitter = trt.Refitter(engine, trt.Logger(trt.Logger.WARNING))
+    if not hasattr(refitter, "get_all_weights"):
+        return weight_name_map
+    names = set(refitter.get_all_weights())
+    return {k: v for k, v in weight_name_map.items() if k in names}
+
+
+def refit_engine(
+    engine: "trt.ICudaEngine",
+    weight_name_map: Dict[str, RefitWeight],
+    state_dict: Mapping[str, torch.Tensor],
+    strict: bool = False,
+) -> List[str]:
+    """
+    Update the weights of `engine` in place with the values of `state_dict`.
+
+    Args:
+        engine: A refittable engine.
+        weight_name_map: Map from TensorRT weight names to their FX source, as
+            returned in `TRTInterpreterResult.weight_name_map`.
+        state_dict: New values, keyed by FX weight names. Entries that are not
+            weights of the engine are ignored.
+        strict: Raise if some weights of the engine are missing from `state_dict`.
+
+    Returns:
+        The TensorRT names of the weights that were updated.
+    """
+    if not engine.refittable:
+        raise RuntimeError(
+            "The engine is not refittable, it must be built with refit enabled."
+        )
+
+    missing = sorted({w.name for w in weight_name_map.values()} - set(state_dict))
+    if strict and missing:
+        raise RuntimeError(f"Missing weights to refit the engine: {missing}")
+
+    refitter = trt.Refitter(engine, trt.Logger(trt.Logger.WARNING))
+    # The refitter reads the arrays when refitting, keep them alive until then.
+    arrays: List[np.ndarray] = []
+    updated: List[str] = []
+    for trt_name, weight in weight_name_map.items():
+        if weight.name not in state_dict:
+            continue
+        array = weight.materialize(state_dict[weight.name])
+        arrays.append(array)
+        if not refitter.set_named_weights(trt_name, trt.Weights(array)):
+            raise RuntimeError(f"Failed to set weights {trt_name} ({weight.name}).")
+        updated.append(trt_name)
+
+    if not updated:
+        return updated
+
+    missing_weights = refitter.get_missing_weights()
+    if missing_weights:
+        raise RuntimeError(
+            "Refitting also requires the weights "
+            f"{list(missing_weights)}, which are not in state_dict or were "
+            "transformed by their converter and can't be refitted by name."
+        )
+
+    if not refitter.refit_cuda_engine():
+        raise RuntimeError("Failed to refit the engine.")
+    logger.info(f"Refitted {len(updated)} weights")
+    return updated
+
+
+def refit_module(
+    module: torch.nn.Module, state_dict: Mapping[str, torch.Tensor]
+) -> int:
+    """
+    Refit every refittable TRTModule and TRTModuleNext in `module`, e.g. a
+    lowered model, with the weights of `state_dict`, e.g. the state dict of
+    the original model. Returns the number of refitted submodules.
+    """
+    num_refitted = 0
+    for submod in module.modules():
+        if getattr(submod, "weight_name_map", None) and hasattr(submod, "refit"):
+            submod.refit(state_dict)
+            num_refitted += 1
+    return num_refitted
+
+
+def graph_weights(gm: torch.fx.GraphModule) -> List[Tuple[str, torch.Tensor]]:
+    """
+    FX names and values of the tensors read by the nodes of `gm`, in graph
+    order: `get_attr` tensors and the state of the called submodules.
+    """
+    weights = []
+    for node in gm.graph.nodes:
+        if node.op == "get_attr":
+            attr: Any = gm
+            for atom in str(node.target).split("."):
+                attr = getattr(attr, atom)
+            if isinstance(attr, torch.Tensor):
+                weights.append((str(node.target), attr))
+        elif node.op == "call_module":
+            submod = gm.get_submodule(str(node.target))
+            for name, tensor in submod.state_dict().items():
+                weights.append((f"{node.target}.{name}", tensor))
+    return [(name, tensor) for name, tensor in weights if tensor.numel() > 0]
+
+
+def refitted_copy(
+    lowered: torch.nn.Module,
+    src: torch.fx.GraphModule,
+    dst: torch.fx.GraphModule,
+) -> Optional[torch.nn.Module]:
+    """
+    Create the lowered module of `dst` from `lowered`, the refittable
+    TRTModule or TRTModuleNext of `src`, by refitting a copy of its engine
+    with the weights of `dst`. `src` and `dst` must be structurally identical,
+    e.g. have the same `graph_fingerprint` without weights and names, and
+    their lowered modules take the same input specs.
+
+    Returns None if some weights of `src` can't be refitted by name, in which
+    case the engine of `dst` has to be built.
+    """
+    weight_name_map = getattr(lowered, "weight_name_map", None)
+    if not weight_name_map:
+        return None
+
+    src_weights = graph_weights(src)
+    dst_weights = graph_weights(dst)
+    if len(src_weights) != len(dst_weights) or any(
+        s.shape != d.shape or s.dtype != d.dtype
+        for (_, s), (_, d) in zip(src_weights, dst_weights)
+    ):
+        return None
+
+    refittable = {w.name for w in weight_name_map.values()}
+    if not refittable <= {name for name, _ in src_weights}:
+        return None
+    not_refittable = [name for name, _ in src_weights if name not in refittable]
+    if not_refittable:
+        logger.info(
+            f"Can't reuse the engine, weights {not_refittable} are not refittable."
+        )
+        return None
+
+    # Weights of dst keyed by the names of the corresponding weights of src.
+    state_dict = {
+        src_name: tensor for (src_name, _), (_, tensor) in zip(src_weights, dst_weights)
+    }
+    dst_names = {
+        src_name: dst_name
+        for (src_name, _), (dst_name, _) in zip(src_weights, dst_weights)
+    }
+
+    if hasattr(lowered, "get_extra_state"):
+        # TRTModuleNext, whose TorchBind engine is copied through its state.
+        module = type(lowered)()
+        module.load_state_dict(lowered.state_dict())
+    else:
+        module = copy.deepcopy(lowered)
+    module.refit(state_dict, strict=True)
+    module.weight_name_map = {
+        trt_name: w._replace(name=dst_names[w.name])
+        for trt_name, w in weight_name_map.items()
+    }
+    return module
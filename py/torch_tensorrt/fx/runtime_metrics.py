@@ -0,0 +1,354 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .utils import atomic_write
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+"""
+Runtime metrics of TRTModule and TRTModuleNext.
+
+Every module instance owns a `ModuleMetrics`, enabled by default. Each call is
+counted, and one call out of `1 / sample_rate` is timed and recorded: latency
+histograms of its stages, its input shapes signature and the bytes of its
+outputs. Unsampled calls only cost an increment and a modulo, sampled
+ones a few `time.perf_counter` calls and a histogram update under a lock.
+
+Latencies are host side: "execute" is the time to enqueue the engine, the GPU
+runs it asynchronously.
+
+The metrics of all the live modules are exported in the Prometheus text format
+with `prometheus_text`, or periodically handed to a callback by a
+`MetricsExporter`:
+
+    exporter = MetricsExporter(
+        lambda snapshots: write_prometheus_text_file("/var/lib/node_exporter/trt.prom", snapshots),
+        interval=15.0,
+    )
+    exporter.start()
+"""
+
+# Stages of a forward call whose latency is recorded.
+STAGES = ("process_inputs", "allocate_outputs", "execute")
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    1e-2,
+    2.5e-2,
+    5e-2,
+    1e-1,
+    2.5e-1,
+    1.0,
+)
+DEFAULT_SAMPLE_RATE = 0.01
+# Beyond this number of distinct input shapes signatures, the calls of a module
+# are counted as "other" to bound the memory and the export size.
+MAX_SHAPE_SIGNATURES = 256
+
+ShapeSignature = Tuple[Tuple[int, ...], ...]
+
+_REGISTRY: "weakref.WeakSet[ModuleMetrics]" = weakref.WeakSet()
+_REGISTRY_LOCK = threading.Lock()
+_DEFAULT_NAMES = itertools.count()
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds, Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One more count for the observations above the last bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        """Number of observations less or equal to each bound, then the total."""
+        return list(itertools.accumulate(self.counts))
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    """The metrics of one module at a point in time."""
+
+    module: str
+    calls: int
+    sampled_calls: int
+    latencies: Dict[str, Histogram]
+    output_bytes: int
+    shape_signature_calls: Dict[ShapeSignature, int]
+    other_shape_signature_calls: int
+
+
+class ModuleMetrics:
+    """
+    Metrics of a TRTModule or TRTModuleNext instance.
+
+    Everything but `calls` covers the sampled calls only, multiply by
+    `sample_interval` to estimate the totals.
+
+    Args:
+        module: Name of the module, the `module` label of the exported metrics.
+            A unique one is generated by default.
+        sample_rate: Fraction of the calls timed and recorded, in (0, 1].
+        buckets: Upper bounds, in seconds, of the latency histograms.
+    """
+
+    def __init__(
+        self,
+        module: Optional[str] = None,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}.")
+        self.module = module if module else f"trt_module_{next(_DEFAULT_NAMES)}"
+        self.sample_rate = sample_rate
+        self.sample_interval = max(1, round(1 / sample_rate))
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+        with _REGISTRY_LOCK:
+            _REGISTRY.add(self)
+
+    def __reduce__(self):
+        # Only the configuration is saved along with a module, the counters of
+        # the loaded module start from zero.
+        return (ModuleMetrics, (self.module, self.sample_rate, self.buckets))
+
+    def reset(self) -> None:
+        with self._lock:
+            # Counted without taking the lock, calls made concurrently from
+            # several threads may be miscounted.
+            self._calls = 0
+            self.sampled_calls = 0
+            self.latencies = {stage: Histogram(self.buckets) for stage in STAGES}
+            self.output_bytes = 0
+            self.shape_signature_calls: Dict[ShapeSignature, int] = {}
+            self.other_shape_signature_calls = 0
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def sample(self) -> bool:
+        """Count a call and return whether it is to be recorded."""
+        calls = self._calls
+        self._calls = calls + 1
+        return calls % self.sample_interval == 0
+
+    def record(
+        self,
+        signature: ShapeSignature,
+        durations: Dict[str, float],
+        outputs: Iterable,
+    ) -> None:
+        """
+        Record a sampled call: the duration in seconds of its stages, a subset
+        of `STAGES`, its input shapes and its output tensors.
+        """
+        output_bytes = sum(o.numel() * o.element_size() for o in outputs)
+        with self._lock:
+            self.sampled_calls += 1
+            for stage, duration in durations.items():
+                self.latencies[stage].observe(duration)
+            self.output_bytes += output_bytes
+            if signature in self.shape_signature_calls:
+                self.shape_signature_calls[signature] += 1
+            elif len(self.shape_signature_calls) < MAX_SHAPE_SIGNATURES:
+                self.shape_signature_calls[signature] = 1
+            else:
+                self.other_shape_signature_calls += 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            return MetricsSnapshot(
+                module=self.module,
+                calls=self.calls,
+                sampled_calls=self.sampled_calls,
+                latencies={
+                    stage: histogram.copy()
+                    for stage, histogram in self.latencies.items()
+                },
+                output_bytes=self.output_bytes,
+                shape_signature_calls=dict(self.shape_signature_calls),
+                other_shape_signature_calls=self.other_shape_signature_calls,
+            )
+
+
+def collect_metrics() -> List[MetricsSnapshot]:
+    """Snapshots of the metrics of every live module, sorted by module name."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY)
+    return sorted((m.snapshot() for m in metrics), key=lambda s: s.module)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_shapes(signature: ShapeSignature) -> str:
+    return ",".join("x".join(str(d) for d in shape) for shape in signature)
+
+
+def prometheus_text(snapshots: Optional[Sequence[MetricsSnapshot]] = None) -> str:
+    """
+    The metrics in the Prometheus text exposition format, of every live module
+    by default.
+    """
+    if snapshots is None:
+        snapshots = collect_metrics()
+
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help: str) -> str:
+        name = f"torch_tensorrt_module_{name}"
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    name = family("calls_total", "counter", "Forward calls.")
+    for s in snapshots:
+        lines.append(f"{name}{_labels(module=s.module)} {s.calls}")
+
+    name = family("sampled_calls_total", "counter", "Forward calls recorded.")
+    for s in snapshots:
+        lines.append(f"{name}{_labels(module=s.module)} {s.sampled_calls}")
+
+    name = family(
+        "stage_latency_seconds",
+        "histogram",
+        "Host latency of the stages of the recorded calls.",
+    )
+    for s in snapshots:
+        for stage, histogram in s.latencies.items():
+            if histogram.count == 0:
+                continue
+            counts = histogram.cumulative_counts()
+            for bound, count in zip(histogram.buckets, counts):
+                labels = _labels(module=s.module, stage=stage, le=repr(float(bound)))
+                lines.append(f"{name}_bucket{labels} {count}")
+            labels = _labels(module=s.module, stage=stage, le="+Inf")
+            lines.append(f"{name}_bucket{labels} {counts[-1]}")
+            labels = _labels(module=s.module, stage=stage)
+            lines.append(f"{name}_sum{labels} {histogram.sum!r}")
+            lines.append(f"{name}_count{labels} {histogram.count}")
+
+    name = family(
+        "output_bytes_total", "counter", "Bytes of the outputs of the recorded calls."
+    )
+    for s in snapshots:
+        lines.append(f"{name}{_labels(module=s.module)} {s.output_bytes}")
+
+    name = family(
+        "shape_signature_calls_total",
+        "counter",
+        "Recorded calls per input shapes, 'other' past the signature limit.",
+    )
+    for s in snapshots:
+        for signature, count in sorted(s.shape_signature_calls.items()):
+            labels = _labels(module=s.module, shapes=_format_shapes(signature))
+            lines.append(f"{name}{labels} {count}")
+        if s.other_shape_signature_calls:
+            labels = _labels(module=s.module, shapes="other")
+            lines.append(f"{name}{labels} {s.other_shape_signature_calls}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_text_file(
+    path: str, snapshots: Optional[Sequence[MetricsSnapshot]] = None
+) -> None:
+    """
+    Atomically write `prometheus_text` to `path`, e.g. for the textfile
+    collector of the node exporter.
+    """
+    text = prometheus_text(snapshots)
+    with atomic_write(path, "w") as f:
+        f.write(text)
+
+
+class MetricsExporter:
+    """
+    Hands the snapshots of every live module to `callback` every `interval`
+    seconds, from a daemon thread. Exceptions raised by the callback are
+    logged and the export goes on.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[MetricsSnapshot]], None],
+        interval: float = 60.0,
+    ):
+        self.callback = callback
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> None:
+        """Export once, now."""
+        try:
+            self.callback(collect_metrics())
+        except Exception:
+            _LOGGER.exception("Failed to export the TensorRT module metrics")
+
+    def _run(self) -> None:
+        next_export = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_export - time.monotonic())):
+            self.export()
+            next_export += self.interval
+
+    def start(self) -> "MetricsExporter":
+        if self._thread is not None:
+            raise RuntimeError("The exporter is already started.")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="trt-metrics-exporter", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread, after a last export."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.export()
+
+    def __enter__(self) -> "MetricsExporter":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
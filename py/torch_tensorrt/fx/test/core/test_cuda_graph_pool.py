@@ -0,0 +1,227 @@
+import contextlib
+import functools
+import unittest
+from unittest import mock
+
+import tensorrt as trt
+import torch
+from torch_tensorrt.fx.cuda_graph_pool import CudaGraphPool
+from torch_tensorrt.fx.trt_module import TRTModule
+
+
+class FakeGraph:
+    """Records the launches made during capture and re-runs them on replay."""
+
+    capturing = None
+
+    def __init__(self):
+        self.launches = []
+
+    def replay(self):
+        for launch in self.launches:
+            launch()
+
+
+class FakeContext:
+    """Stands in for an execution context computing `outputs = inputs * 2`."""
+
+    def __init__(self, static_inputs, static_outputs):
+        self.static_inputs = static_inputs
+        self.static_outputs = static_outputs
+        self.num_executions = 0
+
+    def execute(self):
+        if FakeGraph.capturing is not None:
+            FakeGraph.capturing.launches.append(self.execute)
+            return
+        self.num_executions += 1
+        for x, out in zip(self.static_inputs, self.static_outputs):
+            out.copy_(x * 2)
+
+
+@contextlib.contextmanager
+def fake_capture(graph):
+    FakeGraph.capturing = graph
+    try:
+        yield
+    finally:
+        FakeGraph.capturing = None
+
+
+class FakeExecutionContext:
+    """
+    Stands in for the execution context of a `FakeEngine`, recording the
+    bindings of every execution.
+    """
+
+    def __init__(self):
+        self.binding_shapes = {}
+        self.executions = []
+
+    def set_binding_shape(self, idx, shape):
+        self.binding_shapes[idx] = tuple(shape)
+
+    def get_binding_shape(self, idx):
+        # The output has the shape of the input.
+        return self.binding_shapes[0]
+
+    def execute_async_v2(self, bindings, stream_handle):
+        bindings = list(bindings)
+        if FakeGraph.capturing is not None:
+            FakeGraph.capturing.launches.append(
+                lambda: self.execute_async_v2(bindings, stream_handle)
+            )
+        else:
+            self.executions.append(bindings)
+        return True
+
+
+class FakeEngine:
+    """Stands in for an explicit batch engine with one input and one output."""
+
+    num_bindings = 2
+    num_optimization_profiles = 1
+    has_implicit_batch_dimension = False
+
+    def __init__(self):
+        self.contexts = []
+
+    def get_binding_index(self, name):
+        return ["x", "y"].index(name)
+
+    def get_binding_name(self, idx):
+        return ["x", "y"][idx]
+
+    def get_binding_dtype(self, idx):
+        return trt.float32
+
+    def get_binding_shape(self, idx):
+        return (-1, 3)
+
+    def create_execution_context(self):
+        context = FakeExecutionContext()
+        self.contexts.append(context)
+        return context
+
+
+class CudaGraphPoolTest(unittest.TestCase):
+    def _capture(self, pool, signature):
+        static_inputs = [torch.zeros(signature)]
+        static_outputs = [torch.zeros(signature)]
+        context = FakeContext(static_inputs, static_outputs)
+        captured = pool.capture(
+            signature, context, static_inputs, static_outputs, [], context.execute
+        )
+        return captured, context
+
+    def test_capture_and_replay(self):
+        pool = CudaGraphPool(
+            max_graphs=2, graph_factory=FakeGraph, capture_context=fake_capture
+        )
+        captured, context = self._capture(pool, (2, 3))
+        # The warm-up launch runs eagerly, the captured one doesn't.
+        self.assertEqual(context.num_executions, 1)
+        self.assertEqual(len(captured.graph.launches), 1)
+
+        x = torch.randn(2, 3)
+        outputs = captured.replay([x])
+        self.assertEqual(context.num_executions, 2)
+        torch.testing.assert_close(outputs[0], x * 2)
+        self.assertIs(pool.get((2, 3)), captured)
+
+    def test_lru_eviction(self):
+        pool = CudaGraphPool(
+            max_graphs=2, graph_factory=FakeGraph, capture_context=fake_capture
+        )
+        self._capture(pool, (1,))
+        self._capture(pool, (2,))
+        # Make (1,) the most recently used graph.
+        pool.get((1,))
+        self._capture(pool, (3,))
+
+        self.assertEqual(len(pool), 2)
+        self.assertIn((1,), pool)
+        self.assertNotIn((2,), pool)
+        self.assertIn((3,), pool)
+
+
+@unittest.skipIf(not torch.cuda.is_available(), "gpu is not available.")
+class TRTModuleCudaGraphTest(unittest.TestCase):
+    def _trt_module(self, max_cuda_graphs):
+        engine = FakeEngine()
+        with mock.patch(
+            "torch_tensorrt.fx.trt_module.CudaGraphPool",
+            functools.partial(
+                CudaGraphPool, graph_factory=FakeGraph, capture_context=fake_capture
+            ),
+        ):
+            trt_mod = TRTModule(engine, ["x"], ["y"], max_cuda_graphs=max_cuda_graphs)
+        return trt_mod, engine
+
+    def test_capture_and_replay(self):
+        trt_mod, engine = self._trt_module(max_cuda_graphs=1)
+        trt_mod.register_cuda_graph_shapes((2, 3))
+
+        output = trt_mod(torch.randn(2, 3).cuda())
+        self.assertEqual(output.shape, (2, 3))
+        # The graph gets its own context, which runs the warm-up launch and
+        # the replay of the captured one.
+        self.assertEqual(len(engine.contexts), 2)
+        graph_context = engine.contexts[1]
+        self.assertEqual(graph_context.binding_shapes, {0: (2, 3)})
+        self.assertEqual(len(graph_context.executions), 2)
+        self.assertEqual(engine.contexts[0].executions, [])
+
+        captured = trt_mod._cuda_graphs.get(((2, 3),))
+        self.assertIs(captured.context, graph_context)
+        self.assertEqual(len(captured.graph.launches), 1)
+
+        x = torch.randn(2, 3).cuda()
+        output = trt_mod(x)
+        # Replayed without capturing again, on the static buffers.
+        self.assertEqual(len(engine.contexts), 2)
+        self.assertEqual(len(graph_context.executions), 3)
+        self.assertEqual(
+            graph_context.executions[-1],
+            [
+                captured.static_inputs[0].data_ptr(),
+                captured.static_outputs[0].data_ptr(),
+            ],
+        )
+        torch.testing.assert_close(captured.static_inputs[0], x)
+        # The static outputs are cloned unless output storage is reused.
+        self.assertNotEqual(output.data_ptr(), captured.static_outputs[0].data_ptr())
+
+    def test_unregistered_shapes_fall_back_to_execute(self):
+        trt_mod, engine = self._trt_module(max_cuda_graphs=1)
+        trt_mod.register_cuda_graph_shapes((2, 3))
+
+        x = torch.randn(3, 3).cuda()
+        output = trt_mod(x)
+        self.assertEqual(output.shape, (3, 3))
+        self.assertEqual(len(engine.contexts), 1)
+        self.assertEqual(len(trt_mod._cuda_graphs), 0)
+        context = engine.contexts[0]
+        self.assertEqual(context.binding_shapes, {0: (3, 3)})
+        self.assertEqual(context.executions, [[x.data_ptr(), output.data_ptr()]])
+
+    def test_lru_eviction(self):
+        trt_mod, engine = self._trt_module(max_cuda_graphs=1)
+        trt_mod.register_cuda_graph_shapes((2, 3))
+        trt_mod.register_cuda_graph_shapes((4, 3))
+
+        trt_mod(torch.randn(2, 3).cuda())
+        trt_mod(torch.randn(4, 3).cuda())
+        self.assertEqual(len(engine.contexts), 3)
+        self.assertNotIn(((2, 3),), trt_mod._cuda_graphs)
+        self.assertIn(((4, 3),), trt_mod._cuda_graphs)
+
+        # The evicted graph is captured again on a new context.
+        trt_mod(torch.randn(2, 3).cuda())
+        self.assertEqual(len(engine.contexts), 4)
+        self.assertEqual(engine.contexts[3].binding_shapes, {0: (2, 3)})
+        self.assertEqual(len(trt_mod._cuda_graphs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
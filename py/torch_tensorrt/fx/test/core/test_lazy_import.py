@@ -0,0 +1,81 @@
+# Owner(s): ["oncall: gpu_enablement"]
+
+import json
+import subprocess
+import sys
+import unittest
+
+# Modules that only compiling needs, and importing TRTModule must not load.
+COMPILE_ONLY_MODULES = [
+    "torch_tensorrt.fx.converters",
+    "torch_tensorrt.fx.converters.acc_ops_converters",
+    "torch_tensorrt.fx.tracer.acc_tracer.acc_ops",
+    "torch_tensorrt.fx.tracer.acc_tracer.acc_tracer",
+    "torch_tensorrt.fx.lower",
+    "torch_tensorrt.dynamo",
+]
+
+_SCRIPT = """
+import json, sys
+import torch
+before = set(sys.modules)
+{statement}
+print(json.dumps({{
+    "loaded": [m for m in {modules!r} if m in sys.modules],
+    "num_imported": len(set(sys.modules) - before),
+}}))
+"""
+
+
+def _run_import(statement: str, modules=COMPILE_ONLY_MODULES):
+    """
+    Run `statement` in a fresh interpreter, after torch is imported, and
+    return which of `modules` it loaded and how many modules it imported.
+    """
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            _SCRIPT.format(statement=statement, modules=modules),
+        ],
+        text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_import_trt_module_is_lazy(self):
+        lazy = _run_import(
+            "import torch_tensorrt\nfrom torch_tensorrt.fx import TRTModule"
+        )
+        self.assertEqual(lazy["loaded"], [])
+
+        eager = _run_import(
+            "import torch_tensorrt\n"
+            "from torch_tensorrt.fx import TRTModule, compile\n"
+            "torch_tensorrt.fx.load_converters()"
+        )
+        self.assertIn("torch_tensorrt.fx.converters", eager["loaded"])
+        # Import time budget, in modules rather than seconds to be stable.
+        self.assertLess(lazy["num_imported"], eager["num_imported"] / 2)
+
+    def test_import_does_not_load_dynamo(self):
+        # torch._dynamo alone takes about 0.2s to import.
+        result = _run_import("import torch_tensorrt", ["torch._dynamo"])
+        self.assertEqual(result["loaded"], [])
+
+    def test_import_does_not_load_runtime_metrics(self):
+        modules = ["torch_tensorrt.fx.runtime_metrics"]
+        self.assertEqual(_run_import("import torch_tensorrt", modules)["loaded"], [])
+
+    def test_lazy_attributes(self):
+        result = _run_import(
+            "import torch_tensorrt.fx as fx\n"
+            "assert fx.InputTensorSpec is fx.input_tensor_spec.InputTensorSpec\n"
+            "assert fx.LowerSetting is fx.lower_setting.LowerSetting"
+        )
+        self.assertNotIn("torch_tensorrt.fx.converters", result["loaded"])
+
+
+if __name__ == "__main__":
+    unittest.main()
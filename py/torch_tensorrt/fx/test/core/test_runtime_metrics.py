@@ -0,0 +1,90 @@
+# Owner(s): ["oncall: gpu_enablement"]
+
+import os
+import tempfile
+import unittest
+
+import torch
+from torch_tensorrt.fx.runtime_metrics import (
+    collect_metrics,
+    Histogram,
+    MetricsExporter,
+    ModuleMetrics,
+    prometheus_text,
+    write_prometheus_text_file,
+)
+
+
+class TestRuntimeMetrics(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((1.0, 2.0))
+        for value in (0.5, 1.0, 1.5, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative_counts(), [2, 3, 4])
+        self.assertEqual(histogram.sum, 6.0)
+        self.assertEqual(histogram.count, 4)
+
+    def test_sampling(self):
+        metrics = ModuleMetrics("sampled", sample_rate=0.25)
+        self.assertEqual(
+            [metrics.sample() for _ in range(8)],
+            [True, False, False, False] * 2,
+        )
+        self.assertEqual(metrics.calls, 8)
+        with self.assertRaises(ValueError):
+            ModuleMetrics(sample_rate=0)
+
+    def test_prometheus_text(self):
+        metrics = ModuleMetrics('say "hi"', sample_rate=1.0)
+        self.assertTrue(metrics.sample())
+        metrics.record(
+            ((2, 3), (4,)),
+            {"process_inputs": 1e-6, "execute": 3e-4},
+            [torch.empty(2, 3, dtype=torch.float16)],
+        )
+        text = prometheus_text([metrics.snapshot()])
+        lines = text.splitlines()
+        self.assertIn(
+            'torch_tensorrt_module_calls_total{module="say \\"hi\\""} 1', lines
+        )
+        self.assertIn(
+            'torch_tensorrt_module_output_bytes_total{module="say \\"hi\\""} 12', lines
+        )
+        self.assertIn(
+            'torch_tensorrt_module_shape_signature_calls_total{module="say \\"hi\\"",shapes="2x3,4"} 1',
+            lines,
+        )
+        self.assertIn(
+            'torch_tensorrt_module_stage_latency_seconds_bucket{module="say \\"hi\\"",stage="execute",le="0.0005"} 1',
+            lines,
+        )
+        self.assertIn(
+            'torch_tensorrt_module_stage_latency_seconds_bucket{module="say \\"hi\\"",stage="execute",le="0.00025"} 0',
+            lines,
+        )
+        # Stages without observations are left out.
+        self.assertNotIn('stage="allocate_outputs"', text)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "trt.prom")
+            write_prometheus_text_file(path, [metrics.snapshot()])
+            with open(path) as f:
+                self.assertEqual(f.read(), text)
+
+    def test_exporter(self):
+        metrics = ModuleMetrics("exported")
+        metrics.sample()
+        exported = []
+        with MetricsExporter(exported.append, interval=3600.0):
+            pass
+        # Stopping the exporter exports a last time.
+        self.assertEqual(len(exported), 1)
+        snapshots = {s.module: s for s in exported[0]}
+        self.assertEqual(snapshots["exported"].calls, 1)
+
+        del metrics
+        self.assertNotIn("exported", [s.module for s in collect_metrics()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,9 @@
 
 import io
 import os
+import threading
 
+import tensorrt as trt
 import torch
 import torch.fx
 
@@ -15,6 +17,30 @@ from torch_tensorrt.fx import InputTensorSpec, TRTInterpreter, TRTModule
 from torch_tensorrt.fx.utils import LowerPrecision
 
 
+class AdderModule(torch.nn.Module):
+    def forward(self, x):
+        return x + x
+
+
+def _build_adder_module(profiles=((1, 2, 4),), **kwargs) -> TRTModule:
+    """
+    A TRTModule computing `x + x` for inputs of shape (batch_size, 3), with one
+    optimization profile per (min, opt, max) batch size range of `profiles`.
+    `kwargs` are passed to TRTModule.
+    """
+    inputs = [torch.randn(2, 3)]
+    mod = acc_tracer.trace(AdderModule().eval(), inputs)
+    interp = TRTInterpreter(
+        mod,
+        input_specs=InputTensorSpec.from_tensors_with_batch_size_profiles(
+            inputs, profiles
+        ),
+        explicit_batch_dimension=True,
+    )
+    res = interp.run(lower_precision=LowerPrecision.FP32)
+    return TRTModule(res.engine, res.input_names, res.output_names, **kwargs)
+
+
 class TestTRTModule(TestCase):
     def test_save_and_load_trt_module(self):
         class TestModule(torch.nn.Module):
@@ -57,6 +83,189 @@ class TestTRTModule(TestCase):
             new_trt_mod(inputs[0].cuda()).cpu(), ref_output, rtol=1e-04, atol=1e-04
         )
 
+    def test_reuse_output_storage(self):
+        trt_mod = _build_adder_module(reuse_output_storage=True)
+
+        x = torch.randn(2, 3).cuda()
+        out0 = trt_mod(x)
+        torch.testing.assert_close(out0, x + x)
+        out1 = trt_mod(x * 2)
+        self.assertEqual(out0.data_ptr(), out1.data_ptr())
+        torch.testing.assert_close(out1, x * 4)
+
+        # A new input shape gets its own output shape and storage.
+        y = torch.randn(4, 3).cuda()
+        out2 = trt_mod(y)
+        self.assertEqual(out2.shape, (4, 3))
+        torch.testing.assert_close(out2, y + y)
+
+    def test_execution_context_pool(self):
+        trt_mod = _build_adder_module(
+            profiles=[(1, 2, 4)] * 2, num_execution_contexts=2
+        )
+
+        # Each context is bound to its own optimization profile.
+        with trt_mod.execution_context() as slot0, trt_mod.execution_context() as slot1:
+            self.assertEqual({slot0.profile_index, slot1.profile_index}, {0, 1})
+
+        errors = []
+
+        def run(batch_size):
+            try:
+                with torch.cuda.stream(torch.cuda.Stream()):
+                    for _ in range(10):
+                        x = torch.randn(batch_size, 3).cuda()
+                        torch.testing.assert_close(trt_mod(x), x + x)
+                    torch.cuda.current_stream().synchronize()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(bs,)) for bs in (1, 2, 4, 3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+        new_trt_mod = TRTModule()
+        new_trt_mod.load_state_dict(trt_mod.state_dict())
+        self.assertEqual(new_trt_mod.num_execution_contexts, 2)
+        x = torch.randn(4, 3).cuda()
+        torch.testing.assert_close(new_trt_mod(x), x + x)
+
+    def test_profiling_execution_context_pool(self):
+        class LayerCounter(trt.IProfiler):
+            def __init__(self):
+                trt.IProfiler.__init__(self)
+                self.num_layers = 0
+
+            def report_layer_time(self, layer_name, ms):
+                self.num_layers += 1
+
+        trt_mod = _build_adder_module(
+            profiles=[(1, 2, 4)] * 2, num_execution_contexts=2
+        )
+
+        profiler = LayerCounter()
+        trt_mod.enable_profiling(profiler)
+        for profile_index in (0, 1):
+            num_layers = profiler.num_layers
+            with trt_mod.execution_context(profile_index=profile_index):
+                x = torch.randn(2, 3).cuda()
+                torch.testing.assert_close(trt_mod(x), x + x)
+            torch.cuda.synchronize()
+            self.assertGreater(profiler.num_layers, num_layers)
+
+        trt_mod.disable_profiling()
+        for slot in trt_mod._execution_slots:
+            self.assertFalse(slot.context.profiler)
+        num_layers = profiler.num_layers
+        x = torch.randn(2, 3).cuda()
+        torch.testing.assert_close(trt_mod(x), x + x)
+        torch.cuda.synchronize()
+        self.assertEqual(profiler.num_layers, num_layers)
+
+    def test_optimization_profile_selection(self):
+        trt_mod = _build_adder_module(profiles=[(1, 2, 4), (1, 16, 32)])
+
+        # The tightest profile containing the shapes comes first.
+        self.assertEqual(trt_mod._select_profiles(((2, 3),)), [0, 1])
+        self.assertEqual(trt_mod._select_profiles(((16, 3),)), [1])
+        with self.assertRaises(RuntimeError):
+            trt_mod._select_profiles(((64, 3),))
+
+        for batch_size in (2, 16, 4, 32, 1):
+            x = torch.randn(batch_size, 3).cuda()
+            torch.testing.assert_close(trt_mod(x), x + x)
+
+        with trt_mod.execution_context(profile_index=0) as slot:
+            self.assertEqual(slot.profile_index, 0)
+            x = torch.randn(4, 3).cuda()
+            torch.testing.assert_close(trt_mod(x), x + x)
+            with self.assertRaises(RuntimeError):
+                trt_mod(torch.randn(8, 3).cuda())
+
+    def test_shape_recording(self):
+        trt_mod = _build_adder_module()
+
+        histogram = trt_mod.enable_shape_recording()
+        for batch_size in (1, 4, 4):
+            trt_mod(torch.randn(batch_size, 3).cuda())
+        self.assertIs(trt_mod.disable_shape_recording(), histogram)
+        trt_mod(torch.randn(2, 3).cuda())
+
+        self.assertEqual(histogram.counts, {((1, 3),): 1, ((4, 3),): 2})
+        self.assertEqual(histogram.dtypes, [torch.float32])
+
+    def test_runtime_metrics(self):
+        trt_mod = _build_adder_module()
+        self.assertIsNotNone(trt_mod.metrics)
+
+        metrics = trt_mod.enable_metrics("adder", sample_rate=0.5)
+        for batch_size in (1, 4, 4, 4):
+            trt_mod(torch.randn(batch_size, 3).cuda())
+        self.assertIs(trt_mod.disable_metrics(), metrics)
+        trt_mod(torch.randn(2, 3).cuda())
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot.calls, 4)
+        # The first and third calls are sampled.
+        self.assertEqual(snapshot.sampled_calls, 2)
+        self.assertEqual(snapshot.shape_signature_calls, {((1, 3),): 1, ((4, 3),): 1})
+        self.assertEqual(snapshot.output_bytes, (1 + 4) * 3 * 4)
+        for histogram in snapshot.latencies.values():
+            self.assertEqual(histogram.count, 2)
+
+        # The configuration survives pickling, the counters start over.
+        trt_mod.enable_metrics("adder")
+        buffer = io.BytesIO()
+        torch.save(trt_mod, buffer)
+        buffer.seek(0)
+        reloaded = torch.load(buffer)
+        self.assertEqual(reloaded.metrics.module, "adder")
+        self.assertEqual(reloaded.metrics.calls, 0)
+
+    def test_refit(self):
+        class TestModule(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.linear = torch.nn.Linear(3, 4)
+
+            def forward(self, x):
+                return self.linear(x).relu()
+
+        inputs = [torch.randn(2, 3)]
+        mod = TestModule().eval()
+        traced = acc_tracer.trace(mod, inputs)
+        interp = TRTInterpreter(
+            traced,
+            input_specs=InputTensorSpec.from_tensors(inputs),
+            explicit_batch_dimension=True,
+        )
+        res = interp.run(lower_precision=LowerPrecision.FP32, refit=True)
+        self.assertEqual(
+            {w.name for w in res.weight_name_map.values()},
+            {"linear.weight", "linear.bias"},
+        )
+        trt_mod = TRTModule(
+            res.engine,
+            res.input_names,
+            res.output_names,
+            weight_name_map=res.weight_name_map,
+        )
+
+        x = inputs[0].cuda()
+        torch.testing.assert_close(trt_mod(x).cpu(), mod(inputs[0]))
+
+        new_mod = TestModule().eval()
+        trt_mod.refit(new_mod.state_dict(), strict=True)
+        torch.testing.assert_close(trt_mod(x).cpu(), new_mod(inputs[0]))
+
+        reloaded_trt_mod = TRTModule()
+        reloaded_trt_mod.load_state_dict(trt_mod.state_dict())
+        self.assertEqual(reloaded_trt_mod.weight_name_map, res.weight_name_map)
+        torch.testing.assert_close(reloaded_trt_mod(x).cpu(), new_mod(inputs[0]))
+
 
 # TODO add unittest.skip later
 # class TestTRTModuleNext(TestCase):
@@ -0,0 +1,107 @@
+import torch
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch.testing._internal.common_utils import run_tests, TestCase
+from torch_tensorrt.fx import InputTensorSpec, TRTInterpreter, TRTModule
+from torch_tensorrt.fx.converters.converter_utils import to_numpy
+from torch_tensorrt.fx.utils import LowerPrecision
+from torch_tensorrt.fx.weight_manager import (
+    release_lowered_weights,
+    stage_weights,
+    WeightManager,
+)
+
+
+class TestWeightManager(TestCase):
+    def test_deduplicate_weights(self):
+        weight = torch.randn(4, 3)
+        manager = WeightManager([("weight", weight)])
+        with stage_weights(manager):
+            first = to_numpy(weight)
+            # Reused once in fp32.
+            self.assertIs(to_numpy(weight), first)
+            # Views of the same storage and other dtypes are distinct weights.
+            self.assertIsNot(to_numpy(weight.t()), first)
+            half = to_numpy(weight, torch.float16)
+            self.assertIsNot(half, first)
+            # Reused once in fp16.
+            self.assertIs(to_numpy(weight, torch.half), half)
+            # Tensors that are not module weights are not kept.
+            other = torch.randn(4, 3)
+            self.assertIsNot(to_numpy(other), to_numpy(other))
+
+        self.assertEqual(manager.deduplicated_bytes, 4 * 3 * (4 + 2))
+        self.assertEqual(manager.staged_bytes, 4 * 3 * (4 + 4 + 2) + 2 * 4 * 3 * 4)
+        torch.testing.assert_close(torch.from_numpy(first), weight)
+
+        manager.release()
+        with stage_weights(manager):
+            self.assertIsNot(to_numpy(weight), first)
+
+        # Without an active manager, every call converts.
+        self.assertIsNot(to_numpy(weight), to_numpy(weight))
+
+    def test_tied_weights(self):
+        class TestModule(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.first = torch.nn.Linear(3, 3)
+                self.second = torch.nn.Linear(3, 3)
+                self.second.weight = self.first.weight
+
+            def forward(self, x):
+                return self.second(self.first(x).relu())
+
+        inputs = [torch.randn(2, 3)]
+        mod = TestModule().eval().cuda()
+        traced = acc_tracer.trace(mod, [i.cuda() for i in inputs])
+        interp = TRTInterpreter(
+            traced,
+            input_specs=InputTensorSpec.from_tensors(inputs),
+            explicit_batch_dimension=True,
+        )
+        res = interp.run(lower_precision=LowerPrecision.FP32, refit=True)
+        self.assertGreater(interp.weight_manager.deduplicated_bytes, 0)
+
+        trt_mod = TRTModule(
+            res.engine,
+            res.input_names,
+            res.output_names,
+            weight_name_map=res.weight_name_map,
+        )
+        x = inputs[0].cuda()
+        torch.testing.assert_close(trt_mod(x), mod(x))
+
+        new_mod = TestModule().eval().cuda()
+        trt_mod.refit(new_mod.state_dict())
+        torch.testing.assert_close(trt_mod(x), new_mod(x))
+
+    def test_release_lowered_weights(self):
+        shared = torch.nn.Linear(3, 3)
+        lowered = torch.nn.Sequential(torch.nn.Linear(3, 3), shared)
+        fallback = torch.nn.Sequential(shared)
+        original = torch.nn.Sequential(lowered, fallback)
+        lowered_weight = lowered[0].weight
+
+        # The lowered submodule has been replaced by an engine.
+        result = torch.nn.Sequential(torch.nn.Identity(), fallback)
+        released = release_lowered_weights([lowered], result)
+        self.assertEqual(released, 4 * (3 * 3 + 3))
+        # Emptied in the original module as well, the shared ones are kept.
+        self.assertIs(original[0][0].weight, lowered_weight)
+        self.assertEqual(lowered_weight.numel(), 0)
+        self.assertEqual(shared.weight.shape, (3, 3))
+
+    def test_offload_lowered_weights(self):
+        lowered = torch.fx.symbolic_trace(torch.nn.Linear(3, 3).cuda())
+        weight = lowered.weight
+        expected = weight.detach().cpu()
+        released = release_lowered_weights(
+            [lowered], torch.nn.Identity(), offload_device="cpu"
+        )
+        self.assertEqual(released, 4 * (3 * 3 + 3))
+        self.assertEqual(weight.device, torch.device("cpu"))
+        torch.testing.assert_close(weight.detach(), expected)
+
+
+if __name__ == "__main__":
+    run_tests()
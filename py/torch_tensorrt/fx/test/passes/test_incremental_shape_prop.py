@@ -0,0 +1,109 @@
+import unittest
+
+import torch
+import torch.fx
+from torch.fx.passes.shape_prop import ShapeProp
+from torch_tensorrt.fx.passes.incremental_shape_prop import (
+    IncrementalShapeProp,
+    mark_dirty,
+)
+
+
+class CountingShapeProp(ShapeProp):
+    run_nodes = []
+
+    def run_node(self, n):
+        CountingShapeProp.run_nodes.append(n.name)
+        return super().run_node(n)
+
+
+class TestModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(4, 8)
+
+    def forward(self, x):
+        y = self.linear(x)
+        z = torch.relu(y)
+        return torch.sigmoid(z) + 1
+
+
+class IncrementalShapePropTest(unittest.TestCase):
+    def setUp(self):
+        CountingShapeProp.run_nodes = []
+
+    def _propagate(self, gm, *inputs):
+        IncrementalShapeProp(gm, CountingShapeProp).propagate(*inputs)
+        run_nodes = CountingShapeProp.run_nodes
+        CountingShapeProp.run_nodes = []
+        return run_nodes
+
+    def test_only_rewritten_cone_is_propagated(self):
+        gm = torch.fx.symbolic_trace(TestModule())
+        x = torch.randn(2, 4)
+        self.assertIn("linear", self._propagate(gm, x))
+        # Nothing changed since the last propagation.
+        self.assertEqual(self._propagate(gm, x), [])
+
+        # Insert a transpose between relu and sigmoid.
+        relu = next(n for n in gm.graph.nodes if n.target == torch.relu)
+        with gm.graph.inserting_after(relu):
+            transpose = gm.graph.call_function(torch.transpose, (relu, 0, 1))
+        relu.replace_all_uses_with(transpose)
+        transpose.args = (relu, 0, 1)
+        gm.recompile()
+
+        run_nodes = self._propagate(gm, x)
+        self.assertNotIn("linear", run_nodes)
+        self.assertNotIn("relu", run_nodes)
+        self.assertIn(transpose.name, run_nodes)
+        self.assertIn("sigmoid", run_nodes)
+
+        expected = {}
+        ShapeProp(gm).propagate(x)
+        for node in gm.graph.nodes:
+            if "tensor_meta" in node.meta:
+                expected[node.name] = node.meta["tensor_meta"].shape
+        for node in gm.graph.nodes:
+            if node.name in expected:
+                self.assertEqual(node.meta["tensor_meta"].shape, expected[node.name])
+        add = next(n for n in gm.graph.nodes if n.name == "add")
+        self.assertEqual(add.meta["tensor_meta"].shape, torch.Size([8, 2]))
+
+    def test_new_input_shape(self):
+        gm = torch.fx.symbolic_trace(TestModule())
+        self._propagate(gm, torch.randn(2, 4))
+        self._propagate(gm, torch.randn(3, 4))
+        for node in gm.graph.nodes:
+            if node.op not in ("placeholder", "output"):
+                self.assertEqual(node.meta["tensor_meta"].shape[0], 3)
+
+    def test_mark_dirty(self):
+        gm = torch.fx.symbolic_trace(TestModule())
+        x = torch.randn(2, 4)
+        self._propagate(gm, x)
+        sigmoid = next(n for n in gm.graph.nodes if n.target == torch.sigmoid)
+        mark_dirty(sigmoid)
+        self.assertEqual(self._propagate(gm, x), ["sigmoid", "add"])
+
+    def test_submodule_config_change(self):
+        class ConvModule(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.conv = torch.nn.Conv2d(3, 4, 3)
+
+            def forward(self, x):
+                return torch.relu(self.conv(x))
+
+        gm = torch.fx.symbolic_trace(ConvModule())
+        x = torch.randn(1, 3, 8, 8)
+        self._propagate(gm, x)
+        # Same parameters, different output shape.
+        gm.conv.stride = (2, 2)
+        self.assertEqual(self._propagate(gm, x), ["conv", "relu"])
+        conv = next(n for n in gm.graph.nodes if n.target == "conv")
+        self.assertEqual(conv.meta["tensor_meta"].shape, torch.Size([1, 4, 3, 3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch_tensorrt.fx.tools.calibration import _entropy_amax, calibrate
+
+
+class _Model(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(8, 8)
+
+    def forward(self, x):
+        return torch.relu(self.linear(x)) * 2
+
+
+class CalibrationTest(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = _Model().eval()
+        self.data = [torch.randn(4, 8) for _ in range(4)]
+        self.gm = acc_tracer.trace(self.model, [self.data[0]])
+
+    def test_minmax(self):
+        ranges = calibrate(self.gm, self.data, method="minmax")
+        x = next(n for n in self.gm.graph.nodes if n.op == "placeholder")
+        amax = max(float(d.abs().max()) for d in self.data)
+        self.assertAlmostEqual(ranges[x.name][1], amax, places=5)
+        self.assertAlmostEqual(ranges[x.name][0], -amax, places=5)
+
+        output = next(n for n in self.gm.graph.nodes if n.op == "output")
+        out_amax = max(float(self.model(d).abs().max()) for d in self.data)
+        self.assertAlmostEqual(ranges[output.args[0].name][1], out_amax, places=4)
+
+    def test_histogram_methods_clip(self):
+        minmax = calibrate(self.gm, self.data, method="minmax")
+        for method in ("percentile", "entropy"):
+            ranges = calibrate(self.gm, self.data, method=method, percentile=99.0)
+            self.assertEqual(ranges.keys(), minmax.keys())
+            for name, (lo, hi) in ranges.items():
+                self.assertEqual(lo, -hi)
+                self.assertGreater(hi, 0)
+                self.assertLessEqual(hi, minmax[name][1] + 1e-6)
+
+    def test_entropy_ignores_outliers(self):
+        # Gaussian values and a single far outlier.
+        values = np.abs(np.random.RandomState(0).randn(100000))
+        hist, _ = np.histogram(np.append(values, 100.0), bins=2048, range=(0, 100))
+        self.assertLess(_entropy_amax(hist, 100.0), 10.0)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            calibrate(self.gm, self.data, method="mse")
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ranges = calibrate(self.gm, self.data, method="minmax", cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            # The cache is keyed by graph, not by data.
+            cached = calibrate(self.gm, [], method="minmax", cache_dir=cache_dir)
+            for name, (lo, hi) in ranges.items():
+                self.assertAlmostEqual(cached[name][0], lo)
+                self.assertAlmostEqual(cached[name][1], hi)
+
+            calibrate(self.gm, self.data, method="entropy", cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch_tensorrt.fx import InputTensorSpec, TRTInterpreter
+from torch_tensorrt.fx.observer import span
+from torch_tensorrt.fx.tools.compile_profiler import CompileProfiler
+
+
+class CompileProfilerTest(unittest.TestCase):
+    def test_spans(self):
+        with CompileProfiler() as profiler:
+            with span("outer", "pass"):
+                with span("inner", "converter", node="add_1"):
+                    pass
+        # Not recorded once the profiler exited.
+        with span("ignored", "pass"):
+            pass
+
+        self.assertEqual([p.span.name for p in profiler.spans], ["inner", "outer"])
+        inner, outer = profiler.spans
+        self.assertLessEqual(outer.span.start, inner.span.start)
+        self.assertGreaterEqual(outer.span.end, inner.span.end)
+        self.assertEqual(inner.span.args, {"node": "add_1"})
+
+        trace = profiler.chrome_trace()
+        complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual([e["name"] for e in complete], ["outer", "inner"])
+        self.assertEqual(complete[1]["cat"], "converter")
+
+        totals = profiler.totals()
+        self.assertEqual(totals[("pass", "outer")][0], 1)
+        self.assertIn("outer", profiler.summary())
+
+    def test_interpreter_spans(self):
+        class TestModule(torch.nn.Module):
+            def forward(self, x):
+                return torch.relu(x + x)
+
+        inputs = [torch.randn(2, 3)]
+        mod = acc_tracer.trace(TestModule().eval(), inputs)
+        with CompileProfiler() as profiler:
+            TRTInterpreter(mod, InputTensorSpec.from_tensors(inputs)).run()
+
+        names = {(p.span.category, p.span.name) for p in profiler.spans}
+        self.assertIn(("engine", "network_construction"), names)
+        self.assertIn(("engine", "build_engine"), names)
+        self.assertIn(("converter", "relu"), names)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "trace.json")
+            profiler.save_chrome_trace(path)
+            with open(path) as f:
+                self.assertTrue(json.load(f)["traceEvents"])
+
+
+if __name__ == "__main__":
+    unittest.main()
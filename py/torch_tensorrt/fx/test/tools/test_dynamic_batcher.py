@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import unittest
+
+import torch
+from torch import nn
+from torch_tensorrt.fx.tools.dynamic_batcher import DynamicBatcher
+
+
+class RecordingModule(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def forward(self, x, y):
+        self.batch_sizes.append(x.shape[0])
+        return x + y, x * 2
+
+
+class DynamicBatcherTest(unittest.TestCase):
+    def _run_requests(self, batcher, requests):
+        async def run():
+            try:
+                return await asyncio.gather(
+                    *(batcher.submit(*inputs) for inputs in requests)
+                )
+            finally:
+                await batcher.close()
+
+        return asyncio.run(run())
+
+    def test_results_are_scattered_back(self):
+        mod = RecordingModule()
+        batcher = DynamicBatcher(mod, max_batch_size=8, max_delay_ms=50)
+        requests = [(torch.randn(1, 3), torch.randn(1, 3)) for _ in range(5)]
+        results = self._run_requests(batcher, requests)
+
+        self.assertEqual(mod.batch_sizes, [5])
+        for (x, y), (out0, out1) in zip(requests, results):
+            torch.testing.assert_close(out0, x + y)
+            torch.testing.assert_close(out1, x * 2)
+
+        stats = batcher.stats.as_dict()
+        self.assertEqual(stats["num_requests"], 5)
+        self.assertEqual(stats["num_batches"], 1)
+        self.assertEqual(stats["avg_batch_size"], 5)
+
+    def test_flush_on_max_batch_size(self):
+        mod = RecordingModule()
+        batcher = DynamicBatcher(mod, max_batch_size=4, max_delay_ms=50)
+        requests = [(torch.randn(1, 3), torch.randn(1, 3)) for _ in range(6)]
+        self._run_requests(batcher, requests)
+        self.assertEqual(mod.batch_sizes, [4, 2])
+
+    def test_pad_to_bucket(self):
+        mod = RecordingModule()
+        batcher = DynamicBatcher(
+            mod, max_batch_size=8, max_delay_ms=50, batch_size_buckets=[1, 4, 8]
+        )
+        requests = [(torch.randn(1, 3), torch.randn(1, 3)) for _ in range(3)]
+        results = self._run_requests(batcher, requests)
+
+        self.assertEqual(mod.batch_sizes, [4])
+        self.assertEqual(batcher.stats.num_padded_samples, 1)
+        for (x, y), (out0, _) in zip(requests, results):
+            self.assertEqual(out0.shape, (1, 3))
+            torch.testing.assert_close(out0, x + y)
+
+    def test_unbatched_output_fails_the_batch(self):
+        batcher = DynamicBatcher(lambda x: x.sum(), max_batch_size=8, max_delay_ms=50)
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    *(batcher.submit(torch.randn(1, 3)) for _ in range(3)),
+                    return_exceptions=True,
+                )
+            finally:
+                await batcher.close()
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        self.assertEqual(batcher.stats.num_failed_batches, 1)
+
+    def test_close_cancels_running_batch(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(x):
+            started.set()
+            release.wait(10)
+            return x
+
+        batcher = DynamicBatcher(slow, max_batch_size=1, max_delay_ms=0)
+
+        async def run():
+            request = asyncio.ensure_future(batcher.submit(torch.randn(1, 3)))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            # close waits for the running call to return.
+            threading.Timer(0.1, release.set).start()
+            await batcher.close()
+            with self.assertRaises(asyncio.CancelledError):
+                await request
+
+            # The batcher starts again after being closed.
+            x = torch.randn(1, 3)
+            try:
+                torch.testing.assert_close(await batcher.submit(x), x)
+            finally:
+                await batcher.close()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
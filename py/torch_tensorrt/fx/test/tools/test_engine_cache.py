@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+import unittest
+
+import torch
+import torch.fx
+from torch import nn
+from torch_tensorrt.fx.tools.engine_cache import EngineCache, graph_fingerprint
+
+
+class TestModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(4, 4)
+
+    def forward(self, x):
+        return torch.relu(self.linear(x)) + 1
+
+
+class GraphFingerprintTest(unittest.TestCase):
+    def test_fingerprint_is_stable_across_traces(self):
+        mod = TestModel()
+        self.assertEqual(
+            graph_fingerprint(torch.fx.symbolic_trace(mod)),
+            graph_fingerprint(torch.fx.symbolic_trace(mod)),
+        )
+
+    def test_fingerprint_depends_on_weights(self):
+        mod_a, mod_b = TestModel(), TestModel()
+        gm_a, gm_b = torch.fx.symbolic_trace(mod_a), torch.fx.symbolic_trace(mod_b)
+        self.assertNotEqual(graph_fingerprint(gm_a), graph_fingerprint(gm_b))
+        self.assertEqual(
+            graph_fingerprint(gm_a, include_weights=False),
+            graph_fingerprint(gm_b, include_weights=False),
+        )
+
+
+class EngineCacheTest(unittest.TestCase):
+    def test_put_and_get(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = EngineCache(cache_dir)
+            self.assertIsNone(cache.get("key"))
+
+            cache.put("key", b"plan", ["x"], ["output0"])
+            entry = cache.get("key")
+            self.assertEqual(entry.serialized_engine, b"plan")
+            self.assertEqual(entry.input_names, ["x"])
+            self.assertEqual(entry.output_names, ["output0"])
+
+    def test_corrupted_entry_is_removed(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = EngineCache(cache_dir)
+            cache.put("key", b"plan", ["x"], ["output0"])
+            with open(os.path.join(cache_dir, "key.engine"), "wb") as f:
+                f.write(b"corrupted")
+
+            self.assertIsNone(cache.get("key"))
+            self.assertNotIn("key", cache)
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = EngineCache(cache_dir, max_size_bytes=8)
+            cache.put("a", b"1234", ["x"], ["output0"])
+            cache.put("b", b"1234", ["x"], ["output0"])
+            # Make "a" the most recently used entry.
+            past = time.time() - 10
+            os.utime(os.path.join(cache_dir, "b.engine"), (past, past))
+            cache.get("a")
+
+            cache.put("c", b"1234", ["x"], ["output0"])
+            self.assertIn("a", cache)
+            self.assertNotIn("b", cache)
+            self.assertIn("c", cache)
+            self.assertLessEqual(cache.size(), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
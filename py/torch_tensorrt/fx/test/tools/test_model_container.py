@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+import torch
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch_tensorrt.fx import InputTensorSpec, TRTInterpreter, TRTModule
+from torch_tensorrt.fx.tools.model_container import (
+    load_model_container,
+    read_model_container_manifest,
+    save_model_container,
+)
+from torch_tensorrt.fx.utils import LowerPrecision
+
+
+class _Glue(torch.nn.Module):
+    def __init__(self, first: torch.nn.Module, second: torch.nn.Module):
+        super().__init__()
+        self.first = first
+        self.second = second
+        self.scale = torch.nn.Parameter(torch.tensor(3.0))
+
+    def forward(self, x):
+        return self.second(self.first(x) * self.scale)
+
+
+class ModelContainerTest(unittest.TestCase):
+    def _trt_module(self, mod: torch.nn.Module) -> TRTModule:
+        inputs = [torch.randn(2, 3)]
+        traced = acc_tracer.trace(mod.eval(), inputs)
+        interp = TRTInterpreter(
+            traced,
+            input_specs=InputTensorSpec.from_tensors_with_dynamic_batch_size(
+                inputs, (1, 2, 4)
+            ),
+            explicit_batch_dimension=True,
+        )
+        res = interp.run(lower_precision=LowerPrecision.FP32)
+        return TRTModule(res.engine, res.input_names, res.output_names)
+
+    def test_save_and_load(self):
+        class Add(torch.nn.Module):
+            def forward(self, x):
+                return x + x
+
+        class Relu(torch.nn.Module):
+            def forward(self, x):
+                return torch.relu(x)
+
+        model = _Glue(self._trt_module(Add()), self._trt_module(Relu())).cuda()
+        model.first.register_cuda_graph_shapes((4, 3))
+        x = torch.randn(4, 3).cuda()
+        expected = model(x)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "model.trt")
+            save_model_container(model, path)
+            # The original model still holds its engines.
+            self.assertIsInstance(model.first, TRTModule)
+
+            manifest = read_model_container_manifest(path)
+            self.assertEqual(len(manifest["engines"]), 2)
+            for entry in manifest["engines"]:
+                self.assertEqual(entry["offset"] % 4096, 0)
+
+            loaded = load_model_container(path)
+
+        self.assertIsInstance(loaded.first, TRTModule)
+        self.assertEqual(loaded.first.cuda_graph_shapes, {((4, 3),)})
+        torch.testing.assert_close(loaded(x), expected)
+
+        # A bare TRTModule round trips as well.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "module.trt")
+            save_model_container(model.second, path)
+            loaded_second = load_model_container(path)
+        self.assertIsInstance(loaded_second, TRTModule)
+        torch.testing.assert_close(loaded_second(x), torch.relu(x))
+
+
+if __name__ == "__main__":
+    unittest.main()
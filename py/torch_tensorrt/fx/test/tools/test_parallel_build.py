@@ -0,0 +1,32 @@
+import unittest
+
+from torch_tensorrt.fx.converter_registry import (
+    CONVERTERS,
+    load_converters,
+    tensorrt_converter,
+)
+from torch_tensorrt.fx.tools.parallel_build import _converter_modules
+
+
+def _custom_op(x):
+    return x
+
+
+class ParallelBuildTest(unittest.TestCase):
+    def test_user_converter_modules_are_forwarded(self):
+        load_converters()
+
+        @tensorrt_converter(_custom_op)
+        def convert_custom_op(network, target, args, kwargs, name):
+            return args[0]
+
+        try:
+            modules = _converter_modules()
+        finally:
+            del CONVERTERS[_custom_op]
+        self.assertIn(__name__, modules)
+        self.assertIn("torch_tensorrt.fx.converters.acc_ops_converters", modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
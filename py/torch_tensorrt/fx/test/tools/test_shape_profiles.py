@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import torch
+from torch_tensorrt.fx.input_tensor_spec import generate_input_specs
+from torch_tensorrt.fx.lower_setting import LowerSetting
+from torch_tensorrt.fx.tools.shape_profiles import (
+    cluster_batch_sizes,
+    input_specs_from_histogram,
+    ShapeHistogram,
+)
+
+
+class ShapeProfilesTest(unittest.TestCase):
+    def _histogram(self):
+        histogram = ShapeHistogram()
+        for batch_size, count in [(1, 50), (2, 30), (3, 5), (60, 10), (64, 40)]:
+            for _ in range(count):
+                histogram.record(((batch_size, 16), (4,)), [torch.float16, torch.int32])
+        return histogram
+
+    def test_cluster_batch_sizes(self):
+        counts = self._histogram().batch_size_counts([0, -1])
+        self.assertEqual(counts, {1: 50, 2: 30, 3: 5, 60: 10, 64: 40})
+
+        self.assertEqual(cluster_batch_sizes(counts, 2), [(1, 1, 59), (60, 64, 64)])
+        self.assertEqual(
+            cluster_batch_sizes(counts, 2, min_batch_size=0, max_batch_size=128),
+            [(0, 1, 59), (60, 64, 128)],
+        )
+        # Never more profiles than distinct batch sizes.
+        self.assertEqual(len(cluster_batch_sizes(counts, 10)), 5)
+        self.assertEqual(cluster_batch_sizes(counts, 1), [(1, 1, 64)])
+
+    def test_input_specs_from_histogram(self):
+        specs = input_specs_from_histogram(self._histogram(), 2, batch_dims=[0, -1])
+        self.assertEqual(specs[0].shape, (-1, 16))
+        self.assertEqual(specs[0].dtype, torch.float16)
+        self.assertEqual(
+            specs[0].shape_ranges,
+            [((1, 16), (1, 16), (59, 16)), ((60, 16), (64, 16), (64, 16))],
+        )
+        self.assertEqual(specs[1].shape, (4,))
+        self.assertEqual(specs[1].dtype, torch.int32)
+        self.assertEqual(specs[1].shape_ranges, [])
+
+    def test_save_and_load(self):
+        histogram = self._histogram()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "histogram.json")
+            histogram.save(path)
+            loaded = ShapeHistogram.load(path)
+        self.assertEqual(loaded.counts, histogram.counts)
+        self.assertEqual(loaded.dtypes, histogram.dtypes)
+
+        loaded.merge(histogram)
+        self.assertEqual(loaded.total(), 2 * histogram.total())
+
+    def test_lower_setting_batch_size_profiles(self):
+        lower_setting = LowerSetting(batch_size_profiles=[(1, 2, 8), (9, 32, 64)])
+        specs = generate_input_specs([torch.randn(4, 3)], lower_setting)
+        self.assertEqual(
+            specs[0].shape_ranges,
+            [((1, 3), (2, 3), (8, 3)), ((9, 3), (32, 3), (64, 3))],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import torch
+import torch.fx
+from torch import nn
+from torch_tensorrt.fx.tools.split_validation import ActivationCache, SplitValidator
+
+
+class _Split(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.first = torch.fx.symbolic_trace(nn.Linear(3, 3))
+        self.second = torch.fx.symbolic_trace(nn.Linear(3, 3))
+
+    def forward(self, x):
+        return self.second(torch.relu(self.first(x)))
+
+
+class _Counting(nn.Module):
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+        self.calls = 0
+
+    def forward(self, *args):
+        self.calls += 1
+        return self.module(*args)
+
+
+class SplitValidationTest(unittest.TestCase):
+    def test_activation_cache_spill(self):
+        cache = ActivationCache(max_memory=3 * 4)
+        first = {"inputs": [torch.randn(3)], "outputs": []}
+        second = {"inputs": [torch.randn(3)], "outputs": []}
+        cache.put("first", first)
+        cache.put("second", second)
+        self.assertEqual(cache.memory, 3 * 4)
+        self.assertEqual(os.listdir(cache.directory), ["second.pt"])
+        self.assertIn("second", cache)
+        torch.testing.assert_close(cache.get("second"), second)
+
+        directory = cache.directory
+        cache.close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_check_splits(self):
+        torch.manual_seed(0)
+        split = _Split()
+        inputs = [torch.randn(2, 3)]
+        validator = SplitValidator(atol=1e-5, rtol=1e-5)
+        validator.record(split, ["first", "second"], inputs)
+
+        validator.check("first", split.first)
+        validator.check("second", split.second)
+        with self.assertRaisesRegex(RuntimeError, "second"):
+            validator.check("second", nn.Linear(3, 3))
+        validator.close()
+
+    def test_reuse_cached_activations(self):
+        split = _Split()
+        inputs = [torch.randn(2, 3)]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            validator = SplitValidator(cache=ActivationCache(cache_dir))
+            validator.record(split, ["first", "second"], inputs)
+            validator.close()
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # The split module doesn't run again.
+            split.first = _Counting(split.first)
+            validator = SplitValidator(cache=ActivationCache(cache_dir))
+            validator.record(split, ["second"], inputs)
+            validator.check("second", split.second)
+            validator.close()
+            self.assertEqual(split.first.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
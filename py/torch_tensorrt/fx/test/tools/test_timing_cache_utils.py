@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import torch
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch_tensorrt.fx import InputTensorSpec, TRTInterpreter
+from torch_tensorrt.fx.tools.timing_cache_utils import (
+    SharedTimingCache,
+    TimingCacheManager,
+)
+from torch_tensorrt.fx.utils import LowerPrecision
+
+
+def build_timing_cache(mod, inputs) -> bytearray:
+    mod = acc_tracer.trace(mod.eval(), inputs)
+    interp = TRTInterpreter(mod, InputTensorSpec.from_tensors(inputs))
+    return interp.run(lower_precision=LowerPrecision.FP32).serialized_cache
+
+
+class TimingCacheManagerTest(unittest.TestCase):
+    def test_per_split_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manager = TimingCacheManager(
+                os.path.join(tmp_dir, "cache"), save_timing_cache=True
+            )
+            self.assertIsNone(manager.get_timing_cache_trt("split0"))
+            manager.update_timing_cache("split0", bytearray(b"cache"))
+            self.assertEqual(manager.get_timing_cache_trt("split0"), b"cache")
+            self.assertEqual(os.listdir(tmp_dir), ["cache_split0.npy"])
+
+    def test_shared_cache_merges_builds(self):
+        cache_a = build_timing_cache(torch.nn.Linear(8, 8), [torch.randn(4, 8)])
+        cache_b = build_timing_cache(
+            torch.nn.Conv2d(3, 8, 3), [torch.randn(1, 3, 16, 16)]
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "shared.cache")
+            manager = TimingCacheManager(
+                save_timing_cache=True, shared_timing_cache=path
+            )
+            self.assertIs(manager.shared_timing_cache, SharedTimingCache.get(path))
+            manager.update_timing_caches({"split0": cache_a, "split1": cache_b})
+
+            # Another process loading the file sees both builds.
+            reloaded = SharedTimingCache(path).serialize()
+            self.assertGreater(len(reloaded), max(len(cache_a), len(cache_b)))
+            self.assertEqual(
+                manager.get_timing_cache_trt("split2"),
+                manager.shared_timing_cache.serialize(),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
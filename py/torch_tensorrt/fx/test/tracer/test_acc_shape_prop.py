@@ -5,6 +5,7 @@ import unittest
 
 import torch
 
+import torch_tensorrt.fx.tracer.acc_tracer.acc_ops as acc_ops
 import torch_tensorrt.fx.tracer.acc_tracer.acc_shape_prop as acc_shape_prop
 import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
 from parameterized import param, parameterized
@@ -96,3 +97,34 @@ class AccShapePropTest(unittest.TestCase):
                 self.assertEqual(node.meta["tensor_meta"][1].dtype, torch.float16)
             else:
                 self.assertEqual(node.meta["tensor_meta"].dtype, torch.float16)
+
+    @parameterized.expand(
+        [
+            param("fake", mode="fake"),
+            param("meta", mode="meta"),
+        ]
+    )
+    def test_trace_without_real_tensors(self, _, mode):
+        class TestModule(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.linear = torch.nn.Linear(4, 6)
+
+            def forward(self, x):
+                return torch.sigmoid(self.linear(x.relu())).sum(dim=1)
+
+        m = TestModule()
+        if mode == "meta":
+            m = m.to("meta")
+        x = torch.rand(3, 4)
+        gm = acc_tracer.trace(m, [x], shape_prop_mode=mode)
+
+        for node in gm.graph.nodes:
+            if node.op != "call_function":
+                continue
+            self.assertEqual(node.meta["type"], torch.Tensor)
+            self.assertEqual(node.meta["tensor_meta"].dtype, torch.float32)
+            if node.target == acc_ops.linear:
+                self.assertEqual(node.meta["tensor_meta"].shape, torch.Size([3, 6]))
+            if node.target == acc_ops.sum:
+                self.assertEqual(node.meta["tensor_meta"].shape, torch.Size([3]))
@@ -2,16 +2,46 @@
 
 import logging
 import unittest
+from unittest import mock
 
 import torch
 import torch.fx as fx
 import torch.nn as nn
+from torch_tensorrt.fx.fx2trt import TRTInterpreter
 from torch_tensorrt.fx.lower import Lowerer, LowerSetting
 from torch_tensorrt.fx.passes.lower_basic_pass import replace_mutable_op
+from torch_tensorrt.fx.refit import refitted_copy
+from torch_tensorrt.fx.trt_module import TRTModule
 
 logger = logging.getLogger(__name__)
 
 
+class Unsupported(nn.Module):
+    def forward(self, x):
+        return x.sort()[0]
+
+
+class TwoSplitModule(nn.Module):
+    """Two identical TRT splits around a module TensorRT doesn't support."""
+
+    def __init__(self):
+        super().__init__()
+        self.linear0 = nn.Linear(3, 3)
+        self.unsupported = Unsupported()
+        self.linear1 = nn.Linear(3, 3)
+
+    def forward(self, x):
+        x = torch.relu(self.linear0(x))
+        x = self.unsupported(x)
+        return torch.relu(self.linear1(x))
+
+
+def _two_split_lowerer(**kwargs) -> Lowerer:
+    return Lowerer.create(
+        LowerSetting(min_acc_module_size=1, leaf_module_list={Unsupported}, **kwargs)
+    )
+
+
 class Fx2trtLowerTests(unittest.TestCase):
     def test_fx2trt_lower(self):
         class _Mod(nn.Module):
@@ -55,6 +85,59 @@ class Fx2trtLowerTests(unittest.TestCase):
         lower = Lowerer.create(LowerSetting())
         lower(TestModule(), [torch.randn([2, 2])])
 
+    def test_lower_parallel_build(self):
+        module = TwoSplitModule().cuda().eval()
+        inputs = [torch.randn(2, 3).cuda()]
+        lowered = {}
+        for workers in (0, 2):
+            lowered[workers] = _two_split_lowerer(parallel_build_workers=workers)(
+                module, inputs
+            )
+            self.assertEqual(
+                len(
+                    [m for m in lowered[workers].modules() if isinstance(m, TRTModule)]
+                ),
+                2,
+            )
+
+        x = torch.randn(2, 3).cuda()
+        torch.testing.assert_close(lowered[2](x), lowered[0](x))
+        torch.testing.assert_close(lowered[2](x), module(x), atol=1e-3, rtol=1e-3)
+
+    def test_lower_refit_identical_splits(self):
+        module = TwoSplitModule().cuda().eval()
+        inputs = [torch.randn(2, 3).cuda()]
+        lower = _two_split_lowerer(refit_identical_splits=True)
+        with mock.patch.object(
+            TRTInterpreter, "run", autospec=True, side_effect=TRTInterpreter.run
+        ) as run, mock.patch(
+            "torch_tensorrt.fx.passes.lower_pass_manager_builder.refitted_copy",
+            wraps=refitted_copy,
+        ) as refit:
+            lowered = lower(module, inputs)
+        # Only the first split is built, the second one is refitted from it.
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(refit.call_count, 1)
+
+        trt_modules = [m for m in lowered.modules() if isinstance(m, TRTModule)]
+        self.assertEqual(len(trt_modules), 2)
+        self.assertEqual(
+            [{w.name for w in m.weight_name_map.values()} for m in trt_modules],
+            [
+                {"linear0.weight", "linear0.bias"},
+                {"linear1.weight", "linear1.bias"},
+            ],
+        )
+        torch.testing.assert_close(lowered(*inputs), module(*inputs))
+
+    def test_lower_validate_splits(self):
+        module = TwoSplitModule().cuda().eval()
+        inputs = [torch.randn(2, 3).cuda()]
+        lowered = _two_split_lowerer(validate_splits=True)(module, inputs)
+        self.assertEqual(
+            len([m for m in lowered.modules() if isinstance(m, TRTModule)]), 2
+        )
+
     def test_replace_mutable_op(self):
         class TestModule(torch.nn.Module):
             def forward(self, x, y):
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import math
+import os
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.fx
+
+from ..utils import atomic_write
+from .engine_cache import graph_fingerprint
+
+logger = logging.getLogger(__name__)
+
+"""
+Post-training INT8 calibration of FX graphs.
+
+`calibrate` runs a traced graph over calibration batches, on whatever device
+the graph and the batches are on, and derives a symmetric dynamic range for
+the float output of every node:
+
+    minmax:     the largest absolute value seen.
+    percentile: the given percentile of the absolute values.
+    entropy:    the threshold minimizing the KL divergence between the
+                histogram of the absolute values and its 128 level
+                quantization, as TensorRT's entropy calibrator does.
+
+The ranges are keyed by node name, `TRTInterpreter.run(dynamic_ranges=...)`
+applies them to the network tensors of the nodes converted with an INT8
+precision, so lowering needs neither QAT nor a TensorRT calibrator. Ranges are
+cached in versioned files keyed by the graph fingerprint, weights included,
+and the calibration settings. The cache doesn't know about the calibration
+data, delete it to recalibrate on different data.
+"""
+
+CALIBRATION_FORMAT_VERSION = 1
+CALIBRATION_METHODS = ("minmax", "percentile", "entropy")
+DEFAULT_NUM_BINS = 2048
+# Number of levels of the positive half of the INT8 range.
+_NUM_QUANTIZED_BINS = 128
+
+DynamicRanges = Dict[str, Tuple[float, float]]
+
+
+class _NodeOutputObserver(torch.fx.Interpreter):
+    """Runs a graph and hands the float tensor output of each node to `observe`."""
+
+    def __init__(
+        self, module: torch.fx.GraphModule, observe: Callable[[str, torch.Tensor], None]
+    ):
+        super().__init__(module)
+        self.observe = observe
+
+    def run_node(self, n: torch.fx.Node) -> Any:
+        result = super().run_node(n)
+        if (
+            isinstance(result, torch.Tensor)
+            and result.is_floating_point()
+            and result.numel() > 0
+        ):
+            self.observe(n.name, result.detach())
+        return result
+
+
+def _run_over(
+    gm: torch.fx.GraphModule,
+    calibration_data: Iterable[Any],
+    observe: Callable[[str, torch.Tensor], None],
+) -> int:
+    interpreter = _NodeOutputObserver(gm, observe)
+    num_batches = 0
+    with torch.no_grad():
+        for batch in calibration_data:
+            inputs = batch if isinstance(batch, (list, tuple)) else [batch]
+            interpreter.run(*inputs)
+            num_batches += 1
+    return num_batches
+
+
+def _percentile_amax(hist: np.ndarray, amax: float, percentile: float) -> float:
+    cdf = np.cumsum(hist)
+    index = int(np.searchsorted(cdf, cdf[-1] * percentile / 100.0))
+    return min(amax, (index + 1) * amax / len(hist))
+
+
+def _kl_divergence(p: np.ndarray, q: np.ndarray) -> float:
+    p = p / p.sum()
+    q = q / max(q.sum(), 1e-12)
+    mask = p > 0
+    return float(np.sum(p[mask] * np.log(p[mask] / np.maximum(q[mask], 1e-12))))
+
+
+def _entropy_amax(hist: np.ndarray, amax: float) -> float:
+    hist = hist.astype(np.float64)
+    num_bins = len(hist)
+    if num_bins <= _NUM_QUANTIZED_BINS:
+        return amax
+
+    best_divergence, best_bins = math.inf, num_bins
+    # Thresholds are evaluated every `stride` bins, at most ~128 of them.
+    stride = max(1, (num_bins - _NUM_QUANTIZED_BINS) // 128)
+    for i in range(_NUM_QUANTIZED_BINS, num_bins + 1, stride):
+        clipped = hist[:i]
+        # Values past the threshold saturate into the last bin.
+        reference = clipped.copy()
+        reference[-1] += hist[i:].sum()
+        if reference.sum() == 0:
+            continue
+
+        # Quantize the clipped histogram into 128 levels, then spread each
+        # level uniformly over the non empty bins it covers.
+        edges = np.arange(_NUM_QUANTIZED_BINS) * i // _NUM_QUANTIZED_BINS
+        nonzero = clipped != 0
+        level_sums = np.add.reduceat(clipped, edges)
+        level_counts = np.add.reduceat(nonzero.astype(np.float64), edges)
+        level_of_bin = np.searchsorted(edges, np.arange(i), side="right") - 1
+        expanded = np.where(
+            nonzero, (level_sums / np.maximum(level_counts, 1))[level_of_bin], 0.0
+        )
+
+        divergence = _kl_divergence(reference, expanded)
+        if divergence < best_divergence:
+            best_divergence, best_bins = divergence, i
+    return min(amax, (best_bins + 0.5) * amax / num_bins)
+
+
+def _cache_key(
+    gm: torch.fx.GraphModule, method: str, percentile: float, num_bins: int
+) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(
+        json.dumps(
+            {
+                "format": CALIBRATION_FORMAT_VERSION,
+                "graph": graph_fingerprint(gm),
+                "method": method,
+                "percentile": percentile if method == "percentile" else None,
+                "num_bins": num_bins if method != "minmax" else None,
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    return hasher.hexdigest()
+
+
+def _load_cached_ranges(path: str, gm: torch.fx.GraphModule) -> Optional[DynamicRanges]:
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != CALIBRATION_FORMAT_VERSION:
+        return None
+    # Ranges are stored by node position, node names may differ between traces.
+    names = [node.name for node in gm.graph.nodes]
+    return {
+        names[int(index)]: (float(lo), float(hi))
+        for index, (lo, hi) in cached["ranges"].items()
+    }
+
+
+def _save_ranges(path: str, gm: torch.fx.GraphModule, ranges: DynamicRanges) -> None:
+    positions = {node.name: i for i, node in enumerate(gm.graph.nodes)}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path, "w") as f:
+        json.dump(
+            {
+                "version": CALIBRATION_FORMAT_VERSION,
+                "ranges": {str(positions[name]): list(r) for name, r in ranges.items()},
+            },
+            f,
+        )
+
+
+def calibrate(
+    gm: torch.fx.GraphModule,
+    calibration_data: Iterable[Any],
+    method: str = "entropy",
+    percentile: float = 99.99,
+    num_bins: int = DEFAULT_NUM_BINS,
+    cache_dir: str = "",
+) -> DynamicRanges:
+    """
+    Dynamic range of the float output of every node of `gm`, keyed by node name.
+
+    Args:
+        gm: Traced graph, e.g. by acc_tracer, on the device to calibrate on.
+        calibration_data: Batches of inputs of `gm`, each a tensor or a list of
+            tensors. The histogram methods go over it twice, so it must be
+            iterable more than once, e.g. a list or a DataLoader.
+        method: One of `CALIBRATION_METHODS`.
+        percentile: Percentile of the absolute values used by "percentile".
+        num_bins: Number of bins of the histograms of the absolute values.
+        cache_dir: Directory of the calibration cache, empty to disable it.
+    """
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(
+            f"Unknown calibration method {method}, expected one of {CALIBRATION_METHODS}."
+        )
+
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(
+            cache_dir, _cache_key(gm, method, percentile, num_bins) + ".json"
+        )
+        ranges = _load_cached_ranges(cache_path, gm)
+        if ranges is not None:
+            logger.info(f"Loaded {len(ranges)} dynamic ranges from {cache_path}")
+            return ranges
+
+    amax: Dict[str, torch.Tensor] = {}
+
+    def observe_amax(name: str, t: torch.Tensor) -> None:
+        value = t.abs().max().float()
+        amax[name] = torch.maximum(amax[name], value) if name in amax else value
+
+    num_batches = _run_over(gm, calibration_data, observe_amax)
+    if num_batches == 0:
+        raise RuntimeError("The calibration data is empty.")
+    bounds = {name: float(value) for name, value in amax.items()}
+
+    if method == "minmax":
+        thresholds = bounds
+    else:
+        hists: Dict[str, torch.Tensor] = {}
+
+        def observe_histogram(name: str, t: torch.Tensor) -> None:
+            bound = bounds.get(name, 0.0)
+            if bound == 0.0:
+                return
+            hist = torch.histc(t.abs().float(), bins=num_bins, min=0, max=bound)
+            hists[name] = hists[name] + hist if name in hists else hist
+
+        _run_over(gm, calibration_data, observe_histogram)
+        thresholds = {}
+        for name, bound in bounds.items():
+            if name not in hists:
+                thresholds[name] = bound
+            elif method == "percentile":
+                thresholds[name] = _percentile_amax(
+                    hists[name].cpu().numpy(), bound, percentile
+                )
+            else:
+                thresholds[name] = _entropy_amax(hists[name].cpu().numpy(), bound)
+
+    # TensorRT INT8 is symmetric, all zero tensors get a tiny non empty range.
+    ranges = {
+        name: (-max(threshold, 1e-8), max(threshold, 1e-8))
+        for name, threshold in thresholds.items()
+    }
+    logger.info(
+        f"Calibrated {len(ranges)} tensors on {num_batches} batches with {method}"
+    )
+
+    if cache_path is not None:
+        _save_ranges(cache_path, gm, ranges)
+    return ranges
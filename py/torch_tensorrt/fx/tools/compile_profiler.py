@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from ..observer import Span, SPAN_OBSERVER
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+"""
+Profiling of the compile pipeline.
+
+The lowering reports spans (see `observer.span`) for every pass of the pass
+managers, every shape propagation, every converter call of `TRTInterpreter`,
+the INetwork construction and the engine build of each split. A
+`CompileProfiler` collects them, along with the host memory of the process
+when each span ended, and exports them as a Chrome trace, viewable in
+chrome://tracing or https://ui.perfetto.dev, or as a summary table:
+
+    with CompileProfiler() as profiler:
+        lowered = torch_tensorrt.fx.compile(model, inputs)
+    profiler.save_chrome_trace("lowering.json")
+    print(profiler.summary())
+
+Spans are reported to the observers registered in the current context, so
+engines built by `parallel_build` worker processes are only covered by the
+span of their split.
+"""
+
+
+def _host_memory() -> Tuple[Optional[int], Optional[int]]:
+    """Resident set size of the process and its high-water mark, in bytes."""
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    max_rss = None
+    if resource is not None:
+        # Kilobytes on Linux, bytes on macOS.
+        scale = 1 if sys.platform == "darwin" else 1024
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return rss, max_rss
+
+
+class ProfiledSpan(NamedTuple):
+    span: Span
+    # Host memory when the span ended, see `_host_memory`.
+    rss: Optional[int]
+    max_rss: Optional[int]
+
+    @property
+    def duration(self) -> float:
+        return self.span.end - self.span.start
+
+
+class CompileProfiler:
+    """
+    Collects the spans of the compile pipeline run within the `with` block.
+
+    Args:
+        record_memory: Sample the host memory when each span ends.
+    """
+
+    def __init__(self, record_memory: bool = True):
+        self.record_memory = record_memory
+        self.spans: List[ProfiledSpan] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._registration = None
+
+    def __enter__(self) -> "CompileProfiler":
+        self._origin = time.perf_counter()
+        self._registration = SPAN_OBSERVER.add(self._on_span)
+        self._registration.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._registration.__exit__(*exc_info)
+        self._registration = None
+
+    def _on_span(self, span: Span) -> None:
+        rss, max_rss = _host_memory() if self.record_memory else (None, None)
+        with self._lock:
+            self.spans.append(ProfiledSpan(span, rss, max_rss))
+
+    def _us(self, t: float) -> float:
+        return (t - self._origin) * 1e6
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The spans in the Chrome trace event format, memory as counter tracks."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for profiled in sorted(self.spans, key=lambda p: p.span.start):
+            span = profiled.span
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": self._us(span.start),
+                    "dur": self._us(span.end) - self._us(span.start),
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {k: str(v) for k, v in span.args.items()},
+                }
+            )
+            memory = {
+                name: value / 2**20
+                for name, value in (
+                    ("rss_mb", profiled.rss),
+                    ("max_rss_mb", profiled.max_rss),
+                )
+                if value is not None
+            }
+            if memory:
+                events.append(
+                    {
+                        "name": "host_memory",
+                        "ph": "C",
+                        "ts": self._us(span.end),
+                        "pid": pid,
+                        "args": memory,
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        logger.info(f"Saved the compile trace to {path}")
+
+    def totals(self) -> Dict[Tuple[str, str], Tuple[int, float, float]]:
+        """Number of spans, total and max duration in seconds per (category, name)."""
+        totals: Dict[Tuple[str, str], Tuple[int, float, float]] = {}
+        for profiled in self.spans:
+            key = (profiled.span.category, profiled.span.name)
+            count, total, longest = totals.get(key, (0, 0.0, 0.0))
+            totals[key] = (
+                count + 1,
+                total + profiled.duration,
+                max(longest, profiled.duration),
+            )
+        return totals
+
+    def peak_memory(self) -> Optional[int]:
+        """Highest host memory high-water mark seen, in bytes."""
+        marks = [p.max_rss for p in self.spans if p.max_rss is not None]
+        return max(marks) if marks else None
+
+    def summary(self, top: int = 20) -> str:
+        """
+        Table of the `top` (category, name) pairs with the highest total
+        duration. Nested spans are included in the duration of their parent,
+        e.g. converters in "network_construction".
+        """
+        rows = sorted(self.totals().items(), key=lambda item: -item[1][1])[:top]
+        header = f"{'category':<12} {'name':<48} {'count':>7} {'total (s)':>10} {'max (s)':>10}"
+        lines = [header, "-" * len(header)]
+        for (category, name), (count, total, longest) in rows:
+            lines.append(
+                f"{category:<12} {name[:48]:<48} {count:>7} {total:>10.3f} {longest:>10.3f}"
+            )
+        peak = self.peak_memory()
+        if peak is not None:
+            lines.append(f"Peak host memory: {peak / 2**20:.1f} MB")
+        return "\n".join(lines)
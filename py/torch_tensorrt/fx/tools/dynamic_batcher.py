@@ -0,0 +1,297 @@
+import asyncio
+import bisect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import torch
+
+from ..input_tensor_spec import InputTensorSpec
+
+logger = logging.getLogger(__name__)
+
+"""
+An asyncio based micro-batcher putting a lowered module, e.g. a TRTModule or
+TRTModuleNext, behind a request/response frontend.
+
+Concurrent requests are queued, concatenated along their batch dimension and
+run as one module call, then the outputs are split and handed back to each
+caller.
+"""
+
+
+class _Request:
+    def __init__(self, inputs: Sequence[torch.Tensor], batch_size: int, future):
+        self.inputs = inputs
+        self.batch_size = batch_size
+        self.future = future
+        self.enqueue_time = time.perf_counter()
+
+
+class BatcherStats:
+    """Counters of a DynamicBatcher. All times are in seconds."""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.num_requests = 0
+        self.num_batches = 0
+        self.num_samples = 0
+        self.num_padded_samples = 0
+        self.num_failed_batches = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_compute_time = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "num_requests": self.num_requests,
+            "num_batches": self.num_batches,
+            "num_samples": self.num_samples,
+            "num_padded_samples": self.num_padded_samples,
+            "num_failed_batches": self.num_failed_batches,
+            "avg_batch_size": self.num_samples / max(self.num_batches, 1),
+            "avg_latency": self.total_latency / max(self.num_requests, 1),
+            "max_latency": self.max_latency,
+            "avg_compute_time": self.total_compute_time / max(self.num_batches, 1),
+            "throughput": self.num_samples / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class DynamicBatcher:
+    """
+    Coalesce concurrent requests into batched calls of `module`.
+
+    A batch is flushed as soon as it holds `max_batch_size` samples, or
+    `max_delay_ms` after its first request was queued, whichever comes first.
+    Module calls run one at a time in a worker thread so the event loop keeps
+    accepting requests while the engine runs. A closed batcher starts again
+    on the next `submit`.
+
+    Example:
+        batcher = DynamicBatcher(trt_mod, max_batch_size=32, max_delay_ms=2)
+        output = await batcher.submit(x)
+
+    Args:
+        module: Callable taking batched inputs and returning a tensor or a
+            sequence of tensors batched along `output_batch_dim`.
+        max_batch_size: Maximum number of samples in one module call.
+        max_delay_ms: Maximum time the first request of a batch waits for
+            more requests.
+        batch_dims: Batch dimension of each input. By default it is found with
+            `InputTensorSpec.find_batch_size_dim` on the first request. Inputs
+            with batch dimension -1 are not batched, the ones of the first
+            request of a batch are used for the whole batch.
+        output_batch_dim: Batch dimension of the outputs.
+        batch_size_buckets: Batch sizes the module is optimized for, e.g. the
+            optimization profiles of a dynamic shape engine. Batches are zero
+            padded up to the smallest bucket that fits them. Batches larger
+            than the largest bucket are not padded.
+    """
+
+    def __init__(
+        self,
+        module: Callable[..., Any],
+        max_batch_size: int = 32,
+        max_delay_ms: float = 2.0,
+        batch_dims: Optional[Sequence[int]] = None,
+        output_batch_dim: int = 0,
+        batch_size_buckets: Optional[Sequence[int]] = None,
+    ):
+        assert (
+            max_batch_size > 0
+        ), f"max_batch_size must be positive, got {max_batch_size}"
+        self.module = module
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.batch_dims: Optional[List[int]] = (
+            list(batch_dims) if batch_dims is not None else None
+        )
+        self.output_batch_dim = output_batch_dim
+        self.batch_size_buckets = sorted(batch_size_buckets or [])
+        self.stats = BatcherStats()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[_Request] = None
+        # Requests of the batch being run by the module.
+        self._running: List[_Request] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def submit(self, *inputs: torch.Tensor) -> Any:
+        """
+        Queue one request and wait for its outputs, which have the structure
+        of the module outputs restricted to the request samples.
+        """
+        if self.batch_dims is None:
+            self.batch_dims = list(InputTensorSpec.find_batch_size_dim(list(inputs)))
+        assert len(inputs) == len(
+            self.batch_dims
+        ), f"Expect {len(self.batch_dims)} inputs, got {len(inputs)}."
+
+        batch_size = self._batch_size(inputs)
+        assert (
+            batch_size <= self.max_batch_size
+        ), f"Request batch size {batch_size} exceeds max_batch_size {self.max_batch_size}."
+
+        self._ensure_started()
+        assert self._queue is not None
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Request(inputs, batch_size, future))
+        return await future
+
+    async def close(self) -> None:
+        """
+        Stop the batching loop, after the running module call returns. Queued
+        requests and the requests of the running batch are cancelled.
+        """
+        # Cancelling the worker clears the running batch.
+        pending = list(self._running)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._carry is not None:
+            pending.append(self._carry)
+        self._carry = None
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for request in pending:
+            if not request.future.done():
+                request.future.cancel()
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._executor = self._executor or ThreadPoolExecutor(max_workers=1)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def _batch_size(self, inputs: Sequence[torch.Tensor]) -> int:
+        assert self.batch_dims is not None
+        for x, dim in zip(inputs, self.batch_dims):
+            if dim >= 0:
+                return x.shape[dim]
+        raise RuntimeError("None of the inputs has a batch dimension.")
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._carry is not None:
+                first, self._carry = self._carry, None
+            else:
+                first = await self._queue.get()
+
+            batch = [first]
+            batch_size = first.batch_size
+            deadline = first.enqueue_time + self.max_delay
+            while batch_size < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if batch_size + request.batch_size > self.max_batch_size:
+                    self._carry = request
+                    break
+                batch.append(request)
+                batch_size += request.batch_size
+
+            await self._run_batch(loop, batch, batch_size)
+
+    async def _run_batch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        batch: List[_Request],
+        batch_size: int,
+    ) -> None:
+        padded_size = self._padded_batch_size(batch_size)
+        start_time = time.perf_counter()
+        self._running = batch
+        try:
+            outputs = await loop.run_in_executor(
+                self._executor, self._call_module, batch, batch_size, padded_size
+            )
+            end_time = time.perf_counter()
+            # Outputs without the batch dimension, e.g. 0-dim ones, fail here.
+            results = []
+            offset = 0
+            for request in batch:
+                results.append(
+                    _map_tensors(
+                        outputs,
+                        lambda t: t.narrow(
+                            self.output_batch_dim, offset, request.batch_size
+                        ),
+                    )
+                )
+                offset += request.batch_size
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch)} requests failed: {e}")
+            self.stats.num_failed_batches += 1
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self._running = []
+
+        self.stats.num_batches += 1
+        self.stats.num_samples += batch_size
+        self.stats.num_padded_samples += padded_size - batch_size
+        self.stats.total_compute_time += end_time - start_time
+
+        for request, result in zip(batch, results):
+            latency = end_time - request.enqueue_time
+            self.stats.num_requests += 1
+            self.stats.total_latency += latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+            if not request.future.done():
+                request.future.set_result(result)
+
+    def _padded_batch_size(self, batch_size: int) -> int:
+        i = bisect.bisect_left(self.batch_size_buckets, batch_size)
+        if i == len(self.batch_size_buckets):
+            return batch_size
+        return self.batch_size_buckets[i]
+
+    def _call_module(
+        self, batch: List[_Request], batch_size: int, padded_size: int
+    ) -> Any:
+        assert self.batch_dims is not None
+        batched_inputs = []
+        for i, dim in enumerate(self.batch_dims):
+            if dim < 0:
+                batched_inputs.append(batch[0].inputs[i])
+                continue
+            tensors = [request.inputs[i] for request in batch]
+            if padded_size > batch_size:
+                pad_shape = list(tensors[0].shape)
+                pad_shape[dim] = padded_size - batch_size
+                tensors.append(tensors[0].new_zeros(pad_shape))
+            batched_inputs.append(torch.cat(tensors, dim=dim))
+
+        with torch.no_grad():
+            return self.module(*batched_inputs)
+
+
+def _map_tensors(outputs: Any, fn: Callable[[torch.Tensor], torch.Tensor]) -> Any:
+    if isinstance(outputs, torch.Tensor):
+        return fn(outputs)
+    if isinstance(outputs, (list, tuple)):
+        return type(outputs)(_map_tensors(o, fn) for o in outputs)
+    if isinstance(outputs, dict):
+        return {k: _map_tensors(v, fn) for k, v in outputs.items()}
+    return outputs
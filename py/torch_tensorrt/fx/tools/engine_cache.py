@@ -0,0 +1,305 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+# @manual=//deeplearning/trt/python:py_tensorrt
+import tensorrt as trt
+import torch
+import torch.fx
+from torch.fx.node import _get_qualified_name
+
+from ..input_tensor_spec import InputTensorSpec
+from ..utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+"""
+A persistent, content-addressed cache for serialized TensorRT engines.
+
+Entries are keyed by a stable hash of the canonicalized FX graph, its weights,
+the input specs and the builder settings, so rebuilding a split whose graph and
+settings did not change since the last run becomes a deserialization.
+"""
+
+ENGINE_CACHE_FORMAT_VERSION = 1
+
+_ENGINE_SUFFIX = ".engine"
+_META_SUFFIX = ".json"
+
+
+def _hash_tensor(hasher: "hashlib._Hash", tensor: torch.Tensor) -> None:
+    tensor = tensor.detach()
+    if tensor.is_quantized:
+        tensor = tensor.dequantize()
+    hasher.update(f"{tuple(tensor.shape)}|{tensor.dtype}|".encode())
+    data = tensor.cpu().contiguous().reshape(-1).view(torch.uint8)
+    hasher.update(data.numpy().tobytes())
+
+
+def _canonical_arg(arg: Any, node_ids: Dict[torch.fx.Node, int]) -> Any:
+    def canonicalize(a: Any) -> Any:
+        if isinstance(a, torch.fx.Node):
+            return f"%{node_ids[a]}"
+        if isinstance(a, torch.Tensor):
+            return f"tensor({tuple(a.shape)}, {a.dtype})"
+        if callable(a) and hasattr(a, "__module__"):
+            return _get_qualified_name(a)
+        return repr(a)
+
+    return torch.fx.node.map_aggregate(arg, canonicalize)
+
+
+def graph_fingerprint(
+    gm: torch.fx.GraphModule,
+    include_weights: bool = True,
+    include_names: bool = True,
+) -> str:
+    """
+    Compute a stable hash of a graph module.
+
+    Node names are replaced by their position in the graph so two traces of
+    the same model produce the same fingerprint.
+
+    Args:
+        gm: The graph module to hash.
+        include_weights: Whether the content of the parameters, buffers and
+            `get_attr` tensors is part of the hash. When False only their
+            shapes and dtypes are hashed, which gives a weight-agnostic
+            structural hash.
+        include_names: Whether placeholder and attribute names are part of the
+            hash. Placeholder names become TensorRT binding names, so they must
+            be included whenever the hash identifies a serialized engine.
+
+    Returns:
+        A hex digest string.
+    """
+    hasher = hashlib.sha256()
+    node_ids: Dict[torch.fx.Node, int] = {}
+    for i, node in enumerate(gm.graph.nodes):
+        node_ids[node] = i
+        if node.op == "call_function":
+            target = _get_qualified_name(node.target)
+        elif node.op == "call_module":
+            submod = gm.get_submodule(node.target)
+            target = f"{torch.typename(type(submod))}({submod.extra_repr()})"
+            for _, param in sorted(submod.state_dict().items()):
+                if include_weights:
+                    _hash_tensor(hasher, param)
+                else:
+                    hasher.update(f"{tuple(param.shape)}|{param.dtype}|".encode())
+        elif node.op == "get_attr":
+            attr = _fetch_attr(gm, node.target)
+            target = node.target if include_names else "attr"
+            if isinstance(attr, torch.Tensor):
+                if include_weights:
+                    _hash_tensor(hasher, attr)
+                else:
+                    hasher.update(f"{tuple(attr.shape)}|{attr.dtype}|".encode())
+        elif node.op == "placeholder":
+            target = node.target if include_names else "input"
+        else:
+            target = str(node.target)
+
+        args = _canonical_arg(node.args, node_ids)
+        kwargs = _canonical_arg(
+            {k: node.kwargs[k] for k in sorted(node.kwargs)}, node_ids
+        )
+        hasher.update(f"{node.op}|{target}|{args}|{kwargs}\n".encode())
+
+    return hasher.hexdigest()
+
+
+def _fetch_attr(gm: torch.nn.Module, target: str) -> Any:
+    attr = gm
+    for atom in target.split("."):
+        attr = getattr(attr, atom)
+    return attr
+
+
+def input_specs_fingerprint(input_specs: Sequence[InputTensorSpec]) -> str:
+    """Serialize input specs into a stable string, ignoring the sample device."""
+    return json.dumps(
+        [
+            [
+                [int(s) for s in spec.shape],
+                str(spec.dtype),
+                [[[int(d) for d in s] for s in r] for r in spec.shape_ranges],
+                bool(spec.has_batch_dim),
+            ]
+            for spec in input_specs
+        ]
+    )
+
+
+def engine_cache_key(
+    gm: torch.fx.GraphModule,
+    input_specs: Sequence[InputTensorSpec],
+    builder_settings: Dict[str, Any],
+) -> str:
+    """
+    Compute the cache key of the engine built from `gm` with `input_specs`
+    and `builder_settings`. The TensorRT version and the current GPU are part
+    of the key since serialized engines are not portable across either.
+    """
+    device = ""
+    if torch.cuda.is_available():
+        device = "{}|{}".format(
+            torch.cuda.get_device_name(), torch.cuda.get_device_capability()
+        )
+
+    hasher = hashlib.sha256()
+    hasher.update(
+        json.dumps(
+            {
+                "format": ENGINE_CACHE_FORMAT_VERSION,
+                "trt": trt.__version__,
+                "device": device,
+                "graph": graph_fingerprint(gm),
+                "input_specs": input_specs_fingerprint(input_specs),
+                "builder": {k: repr(v) for k, v in sorted(builder_settings.items())},
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    return hasher.hexdigest()
+
+
+class EngineCacheEntry(NamedTuple):
+    serialized_engine: bytes
+    input_names: List[str]
+    output_names: List[str]
+    metadata: Dict[str, Any]
+
+
+class EngineCache:
+    """
+    An on-disk store of serialized engines.
+
+    Each entry is a pair of files in `cache_dir`: `<key>.engine` holding the
+    plan and `<key>.json` holding the binding names and a sha256 of the plan
+    used as integrity check on load. Entries are evicted in least recently
+    used order once the total size of the plans exceeds `max_size_bytes`.
+
+    Args:
+        cache_dir: Directory where entries are stored, created if missing.
+        max_size_bytes: Size budget of the cache. 0 means unbounded.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key, _META_SUFFIX)) and os.path.exists(
+            self._path(key, _ENGINE_SUFFIX)
+        )
+
+    def get(self, key: str) -> Optional[EngineCacheEntry]:
+        """
+        Load the entry stored under `key`. Returns None on miss, or if the
+        entry fails its integrity check, in which case it is also removed.
+        """
+        if key not in self:
+            return None
+
+        try:
+            with open(self._path(key, _META_SUFFIX), "r") as f:
+                metadata = json.load(f)
+            with open(self._path(key, _ENGINE_SUFFIX), "rb") as f:
+                serialized_engine = f.read()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read engine cache entry {key}: {e}")
+            self.remove(key)
+            return None
+
+        if metadata.get("format") != ENGINE_CACHE_FORMAT_VERSION or hashlib.sha256(
+            serialized_engine
+        ).hexdigest() != metadata.get("sha256"):
+            logger.warning(f"Engine cache entry {key} is corrupted, removing it.")
+            self.remove(key)
+            return None
+
+        # Bump the access time used for LRU eviction.
+        now = time.time()
+        for suffix in (_META_SUFFIX, _ENGINE_SUFFIX):
+            try:
+                os.utime(self._path(key, suffix), (now, now))
+            except OSError:
+                pass
+
+        return EngineCacheEntry(
+            serialized_engine,
+            metadata["input_names"],
+            metadata["output_names"],
+            metadata,
+        )
+
+    def put(
+        self,
+        key: str,
+        serialized_engine: bytes,
+        input_names: Sequence[str],
+        output_names: Sequence[str],
+        **extra_metadata: Any,
+    ) -> None:
+        """Store a serialized engine under `key` and evict old entries if needed."""
+        serialized_engine = bytes(serialized_engine)
+        metadata = dict(extra_metadata)
+        metadata.update(
+            {
+                "format": ENGINE_CACHE_FORMAT_VERSION,
+                "sha256": hashlib.sha256(serialized_engine).hexdigest(),
+                "size": len(serialized_engine),
+                "input_names": list(input_names),
+                "output_names": list(output_names),
+            }
+        )
+        # Write the plan before the metadata so a reader never sees metadata
+        # pointing at a partially written plan.
+        with atomic_write(self._path(key, _ENGINE_SUFFIX)) as f:
+            f.write(serialized_engine)
+        with atomic_write(self._path(key, _META_SUFFIX), "w") as f:
+            json.dump(metadata, f)
+        self.evict()
+
+    def remove(self, key: str) -> None:
+        for suffix in (_META_SUFFIX, _ENGINE_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its budget."""
+        if self.max_size_bytes <= 0:
+            return
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_size_bytes:
+                break
+            logger.info(f"Evicting engine cache entry {key} ({size} bytes)")
+            self.remove(key)
+            total -= size
+
+    def _entries(self):
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(_ENGINE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield file_name[: -len(_ENGINE_SUFFIX)], stat.st_mtime, stat.st_size
@@ -0,0 +1,289 @@
+import base64
+import io
+import json
+import logging
+import mmap
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+# @manual=//deeplearning/trt/python:py_tensorrt
+import tensorrt as trt
+import torch
+
+from ..refit import weight_name_map_from_json, weight_name_map_to_json
+from ..trt_module import _init_trt_plugins, TRTModule
+from ..utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+"""
+A single file container for lowered models, laid out to be memory mapped.
+
+Pickling a lowered model embeds every engine plan in the pickle, and loading
+it copies each plan several times through Python memory. A container stores
+the plans uncompressed at page aligned offsets, followed by the pickled glue
+module, in which the TensorRT modules are replaced by placeholders, and a
+JSON manifest describing the TensorRT modules:
+
+    | header | plan 0 | plan 1 | ... | glue | manifest |
+
+Loading maps the file read only and hands each plan to
+`deserialize_cuda_engine` straight from the mapping, so worker processes of
+a host loading the same file share its pages through the page cache.
+"""
+
+MODEL_CONTAINER_FORMAT_VERSION = 1
+
+_MAGIC = b"TRTMODEL"
+# Magic, format version, manifest offset and manifest size.
+_HEADER = struct.Struct("<8sIQQ")
+_ALIGNMENT = max(mmap.ALLOCATIONGRANULARITY, 4096)
+
+
+class _EnginePlaceholder(torch.nn.Module):
+    """Stands for the TensorRT module `index` of the manifest in the glue module."""
+
+    def __init__(self, index: int):
+        super().__init__()
+        self.index = index
+
+
+def _trt_module_next_type() -> Optional[type]:
+    try:
+        from torch_tensorrt._TRTModuleNext import TRTModuleNext
+    except ImportError:
+        # FX only builds
+        return None
+    return TRTModuleNext
+
+
+def _trt_submodules(
+    module: torch.nn.Module,
+) -> List[Tuple[Optional[torch.nn.Module], str, torch.nn.Module]]:
+    """
+    (parent, attribute name, submodule) of every TensorRT module of `module`,
+    the parent being None if `module` itself is one.
+    """
+    trt_types: Tuple[type, ...] = (TRTModule,)
+    trt_module_next = _trt_module_next_type()
+    if trt_module_next is not None:
+        trt_types += (trt_module_next,)
+
+    if isinstance(module, trt_types):
+        return [(None, "", module)]
+    found = []
+    for parent in module.modules():
+        for name, child in parent.named_children():
+            if isinstance(child, trt_types):
+                found.append((parent, name, child))
+    return found
+
+
+def _align(f: io.BufferedWriter) -> None:
+    f.write(b"\0" * (-f.tell() % _ALIGNMENT))
+
+
+def _write_engine(f: io.BufferedWriter, submod: torch.nn.Module) -> Dict[str, Any]:
+    """Write the plan of `submod` at the current, aligned, offset and describe it."""
+    offset = f.tell()
+    if isinstance(submod, TRTModule):
+        submod._check_initialized()
+        # IHostMemory exposes the buffer protocol, no copy through Python.
+        f.write(submod.engine.serialize())
+        entry = {
+            "kind": "TRTModule",
+            "input_names": list(submod.input_names),
+            "output_names": list(submod.output_names),
+            "cuda_graph_batch_size": submod.cuda_graph_batch_size,
+            "reuse_output_storage": submod.reuse_output_storage,
+            "max_cuda_graphs": submod.max_cuda_graphs,
+            "num_execution_contexts": submod.num_execution_contexts,
+            "cuda_graph_shapes": [
+                [list(shape) for shape in signature]
+                for signature in submod.cuda_graph_shapes
+            ],
+        }
+    else:
+        if submod.engine is None:
+            raise RuntimeError("Cannot save a TRTModuleNext without an engine.")
+        engine_info = submod.engine.__getstate__()[0]
+        f.write(base64.b64decode(engine_info[3]))
+        entry = {
+            "kind": "TRTModuleNext",
+            "name": submod.name,
+            "abi_version": engine_info[0],
+            "engine_name": engine_info[1],
+            "device": engine_info[2],
+            "input_binding_names": list(submod.input_binding_names),
+            "output_binding_names": list(submod.output_binding_names),
+        }
+    entry["weight_name_map"] = weight_name_map_to_json(submod.weight_name_map)
+    entry["offset"] = offset
+    entry["size"] = f.tell() - offset
+    return entry
+
+
+def save_model_container(module: torch.nn.Module, path: str) -> None:
+    """
+    Save a lowered model, e.g. the result of `torch_tensorrt.fx.compile`, as a
+    container loadable with `load_model_container`. Every TRTModule and
+    TRTModuleNext of `module` is stored as a plan, the rest of it is pickled.
+    """
+    submodules = _trt_submodules(module)
+    with atomic_write(path) as f:
+        f.write(b"\0" * _HEADER.size)
+        engines = []
+        for _, _, submod in submodules:
+            _align(f)
+            engines.append(_write_engine(f, submod))
+
+        # Pickle the glue with the TensorRT modules swapped for placeholders,
+        # restoring them even if pickling fails.
+        glue: torch.nn.Module = module
+        try:
+            for i, (parent, name, _) in enumerate(submodules):
+                if parent is None:
+                    glue = _EnginePlaceholder(i)
+                else:
+                    setattr(parent, name, _EnginePlaceholder(i))
+            glue_offset = f.tell()
+            torch.save(glue, f)
+            glue_size = f.tell() - glue_offset
+        finally:
+            for parent, name, submod in submodules:
+                if parent is not None:
+                    setattr(parent, name, submod)
+
+        manifest = json.dumps(
+            {
+                "engines": engines,
+                "glue_offset": glue_offset,
+                "glue_size": glue_size,
+                "tensorrt_version": trt.__version__,
+            }
+        ).encode()
+        manifest_offset = f.tell()
+        f.write(manifest)
+        f.seek(0)
+        f.write(
+            _HEADER.pack(
+                _MAGIC,
+                MODEL_CONTAINER_FORMAT_VERSION,
+                manifest_offset,
+                len(manifest),
+            )
+        )
+    logger.info(f"Saved {len(submodules)} engines to {path}")
+
+
+def _read_manifest(buffer: Any) -> Dict[str, Any]:
+    magic, version, manifest_offset, manifest_size = _HEADER.unpack_from(buffer, 0)
+    if magic != _MAGIC:
+        raise RuntimeError("Not a lowered model container.")
+    if version != MODEL_CONTAINER_FORMAT_VERSION:
+        raise RuntimeError(
+            f"Unsupported model container format version {version}, "
+            f"expected {MODEL_CONTAINER_FORMAT_VERSION}."
+        )
+    manifest = json.loads(
+        bytes(buffer[manifest_offset : manifest_offset + manifest_size])
+    )
+    if manifest["tensorrt_version"] != trt.__version__:
+        logger.warning(
+            f"The container was saved with TensorRT {manifest['tensorrt_version']}, "
+            f"its engines may not load with TensorRT {trt.__version__}."
+        )
+    return manifest
+
+
+def read_model_container_manifest(path: str) -> Dict[str, Any]:
+    """The manifest of a container: offset, size and settings of each engine."""
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        return _read_manifest(buffer)
+
+
+def _load_engine(
+    runtime: "trt.Runtime", plan: memoryview, entry: Dict[str, Any]
+) -> torch.nn.Module:
+    weight_name_map = weight_name_map_from_json(entry["weight_name_map"])
+    if entry["kind"] == "TRTModule":
+        engine = runtime.deserialize_cuda_engine(plan)
+        if engine is None:
+            raise RuntimeError("Failed to deserialize an engine of the container.")
+        submod = TRTModule(
+            engine,
+            entry["input_names"],
+            entry["output_names"],
+            cuda_graph_batch_size=entry["cuda_graph_batch_size"],
+            reuse_output_storage=entry["reuse_output_storage"],
+            max_cuda_graphs=entry["max_cuda_graphs"],
+            num_execution_contexts=entry["num_execution_contexts"],
+            weight_name_map=weight_name_map,
+        )
+        for signature in entry["cuda_graph_shapes"]:
+            submod.register_cuda_graph_shapes(*signature)
+        return submod
+
+    trt_module_next = _trt_module_next_type()
+    if trt_module_next is None:
+        raise RuntimeError("TRTModuleNext requires the Torch-TensorRT runtime.")
+    submod = trt_module_next()
+    submod.name = entry["name"]
+    submod.input_binding_names = entry["input_binding_names"]
+    submod.output_binding_names = entry["output_binding_names"]
+    submod.weight_name_map = weight_name_map
+    submod.engine = torch.classes.tensorrt.Engine(
+        [
+            entry["abi_version"],
+            entry["engine_name"],
+            entry["device"],
+            bytearray(plan),
+            trt_module_next._pack_binding_names(submod.input_binding_names),
+            trt_module_next._pack_binding_names(submod.output_binding_names),
+        ]
+    )
+    return submod
+
+
+def load_model_container(path: str) -> torch.nn.Module:
+    """
+    Load a model saved with `save_model_container`. TRTModule engines are
+    deserialized straight from the memory mapped file. TRTModuleNext engines
+    are handed to the Torch-TensorRT runtime, which keeps its own copy.
+    """
+    _init_trt_plugins()
+    runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        view = memoryview(buffer)
+        manifest = _read_manifest(view)
+        glue_offset = manifest["glue_offset"]
+        module = torch.load(
+            io.BytesIO(view[glue_offset : glue_offset + manifest["glue_size"]])
+        )
+        engines = [
+            _load_engine(
+                runtime, view[entry["offset"] : entry["offset"] + entry["size"]], entry
+            )
+            for entry in manifest["engines"]
+        ]
+        del view
+    finally:
+        try:
+            buffer.close()
+        except BufferError:
+            # Views of the mapping are still referenced, e.g. by a traceback,
+            # it is unmapped once they are released.
+            pass
+
+    if isinstance(module, _EnginePlaceholder):
+        return engines[module.index]
+    for parent in list(module.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, _EnginePlaceholder):
+                setattr(parent, name, engines[child.index])
+    logger.info(f"Loaded {len(engines)} engines from {path}")
+    return module
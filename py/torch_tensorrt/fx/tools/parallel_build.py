@@ -0,0 +1,116 @@
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Tuple
+
+# @manual=//deeplearning/trt/python:py_tensorrt
+import tensorrt as trt
+
+from ..converter_registry import CONVERTERS, load_converters
+from ..fx2trt import TRTInterpreterResult
+from ..refit import RefitWeight
+
+logger = logging.getLogger(__name__)
+
+"""
+Helpers to build the TensorRT engines of independent splits concurrently.
+
+Each build runs in a spawned worker process, which receives the pickled
+submodule and its input specs and sends back the serialized engine along with
+its timing cache. Engines are deserialized in the parent process.
+
+Workers start with an empty converter registry. They load the converters of
+torch_tensorrt and import the modules defining the converters registered in
+the parent, e.g. user `tensorrt_converter`s, so converters must be registered
+when their module is imported, not by calling a function.
+"""
+
+
+class SerializedInterpreterResult(NamedTuple):
+    serialized_engine: bytes
+    input_names: List[str]
+    output_names: List[str]
+    serialized_cache: bytearray
+    weight_name_map: Dict[str, RefitWeight]
+
+
+def _converter_modules() -> List[str]:
+    """Modules defining the converters registered in this process."""
+    modules = {
+        getattr(converter, "__module__", None) for converter in CONVERTERS.values()
+    }
+    # The main module is run again by spawned workers as __mp_main__.
+    return sorted(m for m in modules if m and m != "__main__")
+
+
+def _build_in_worker(
+    build_fn: Callable[..., TRTInterpreterResult],
+    args: Tuple[Any, ...],
+    converter_modules: Sequence[str],
+) -> SerializedInterpreterResult:
+    load_converters()
+    for module in converter_modules:
+        importlib.import_module(module)
+
+    result = build_fn(*args)
+    return SerializedInterpreterResult(
+        bytes(result.engine.serialize()),
+        list(result.input_names),
+        list(result.output_names),
+        bytearray(result.serialized_cache),
+        dict(result.weight_name_map or {}),
+    )
+
+
+def build_engines_in_parallel(
+    build_fn: Callable[..., TRTInterpreterResult],
+    jobs: Sequence[Tuple[str, Tuple[Any, ...]]],
+    num_workers: int,
+) -> Dict[str, TRTInterpreterResult]:
+    """
+    Run `build_fn(*args)` for every `(name, args)` job in a process pool.
+
+    Args:
+        build_fn: A picklable callable (module level function or a partial of
+            one) that builds an engine and returns a `TRTInterpreterResult`.
+        jobs: Sequence of (name, args) pairs. Args must be picklable.
+        num_workers: Maximum number of concurrent worker processes.
+
+    Returns:
+        A dict from job name to `TRTInterpreterResult`, in the order of `jobs`
+        regardless of the order in which the builds finished.
+    """
+    start_time = datetime.now()
+    # CUDA can't be re-initialized in a forked subprocess.
+    mp_context = multiprocessing.get_context("spawn")
+    runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+
+    converter_modules = _converter_modules()
+    results: Dict[str, TRTInterpreterResult] = {}
+    with ProcessPoolExecutor(
+        max_workers=min(num_workers, len(jobs)), mp_context=mp_context
+    ) as pool:
+        futures = [
+            (name, pool.submit(_build_in_worker, build_fn, args, converter_modules))
+            for name, args in jobs
+        ]
+        for name, future in futures:
+            serialized_result = future.result()
+            engine = runtime.deserialize_cuda_engine(
+                serialized_result.serialized_engine
+            )
+            assert engine, f"Failed to deserialize the engine built for {name}"
+            results[name] = TRTInterpreterResult(
+                engine,
+                serialized_result.input_names,
+                serialized_result.output_names,
+                serialized_result.serialized_cache,
+                serialized_result.weight_name_map,
+            )
+
+    logger.info(
+        f"Built {len(jobs)} engines with {num_workers} workers, elapsed time {datetime.now() - start_time}"
+    )
+    return results
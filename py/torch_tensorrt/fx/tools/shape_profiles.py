@@ -0,0 +1,276 @@
+import argparse
+import json
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from ..input_tensor_spec import InputTensorSpec
+
+logger = logging.getLogger(__name__)
+
+"""
+Optimization profiles derived from served traffic.
+
+TRTModule and TRTModuleNext can record a histogram of the input shapes they
+are called with (see `enable_shape_recording`). This module clusters the batch
+sizes of such a histogram into a few optimization profiles whose opt point is
+the most frequent batch size of each cluster, to be fed back into the lowering
+through `LowerSetting.batch_size_profiles`, or into `TRTInterpreter` through
+`input_specs_from_histogram`.
+
+It can also be run as a script on a saved histogram:
+
+    python -m torch_tensorrt.fx.tools.shape_profiles histogram.json --num_profiles 4
+"""
+
+ShapeSignature = Tuple[Tuple[int, ...], ...]
+BatchSizeProfile = Tuple[int, int, int]
+
+
+class ShapeHistogram:
+    """
+    Thread safe counts of the input shape signatures a module is called with.
+    The input dtypes are the ones of the first recorded call.
+    """
+
+    def __init__(self):
+        self.counts: Dict[ShapeSignature, int] = {}
+        self.dtypes: Optional[List[torch.dtype]] = None
+        self._lock = threading.Lock()
+
+    def record(
+        self, shapes: ShapeSignature, dtypes: Optional[Sequence[torch.dtype]] = None
+    ) -> None:
+        with self._lock:
+            self.counts[shapes] = self.counts.get(shapes, 0) + 1
+            if self.dtypes is None and dtypes is not None:
+                self.dtypes = list(dtypes)
+
+    def merge(self, other: "ShapeHistogram") -> None:
+        """Add the counts of `other`, e.g. recorded by another replica."""
+        with self._lock:
+            for shapes, count in other.counts.items():
+                self.counts[shapes] = self.counts.get(shapes, 0) + count
+            if self.dtypes is None:
+                self.dtypes = other.dtypes
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def batch_size_counts(self, batch_dims: Sequence[int]) -> Dict[int, int]:
+        """Number of calls per batch size, read on the first input with a batch dim."""
+        input_index, batch_dim = next(
+            (i, dim) for i, dim in enumerate(batch_dims) if dim >= 0
+        )
+        counts: Dict[int, int] = {}
+        for shapes, count in self.counts.items():
+            batch_size = shapes[input_index][batch_dim]
+            counts[batch_size] = counts.get(batch_size, 0) + count
+        return counts
+
+    def most_frequent(self) -> ShapeSignature:
+        return max(self.counts.items(), key=lambda item: item[1])[0]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "dtypes": [str(d).split(".")[-1] for d in self.dtypes or []],
+                "counts": [
+                    [[list(s) for s in shapes], count]
+                    for shapes, count in self.counts.items()
+                ],
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "ShapeHistogram":
+        parsed = json.loads(data)
+        histogram = cls()
+        histogram.dtypes = [getattr(torch, d) for d in parsed["dtypes"]] or None
+        for shapes, count in parsed["counts"]:
+            signature = tuple(tuple(s) for s in shapes)
+            histogram.counts[signature] = histogram.counts.get(signature, 0) + count
+        return histogram
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> "ShapeHistogram":
+        with open(path, "r") as f:
+            return cls.from_json(f.read())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def cluster_batch_sizes(
+    counts: Dict[int, int],
+    num_profiles: int,
+    min_batch_size: Optional[int] = None,
+    max_batch_size: Optional[int] = None,
+) -> List[BatchSizeProfile]:
+    """
+    Split the observed batch sizes into at most `num_profiles` contiguous
+    (min, opt, max) ranges.
+
+    The ranges minimize the call-weighted squared distance, in log space,
+    between each batch size and the mean of its range, which is solved
+    exactly by dynamic programming over the sorted batch sizes. The opt point
+    of each range is its most frequent batch size, and the ranges are
+    extended to cover every batch size between `min_batch_size` (by default
+    the smallest observed one) and `max_batch_size` (by default the largest
+    observed one) without gaps.
+
+    Args:
+        counts: Number of calls per batch size, e.g. from
+            `ShapeHistogram.batch_size_counts`.
+        num_profiles: Maximum number of profiles.
+        min_batch_size: Smallest batch size the profiles must accept.
+        max_batch_size: Largest batch size the profiles must accept.
+
+    Returns:
+        List of (min, opt, max) batch sizes, in increasing order.
+    """
+    assert num_profiles > 0, f"num_profiles must be positive, got {num_profiles}"
+    sizes = sorted(bs for bs, count in counts.items() if count > 0)
+    assert sizes, "Cannot derive profiles from an empty histogram."
+    weights = [counts[bs] for bs in sizes]
+    values = [math.log(max(bs, 1)) for bs in sizes]
+    n = len(sizes)
+    k = min(num_profiles, n)
+
+    # Prefix sums give the cost of any segment in O(1).
+    w_sum = [0.0] * (n + 1)
+    wx_sum = [0.0] * (n + 1)
+    wxx_sum = [0.0] * (n + 1)
+    for i in range(n):
+        w_sum[i + 1] = w_sum[i] + weights[i]
+        wx_sum[i + 1] = wx_sum[i] + weights[i] * values[i]
+        wxx_sum[i + 1] = wxx_sum[i] + weights[i] * values[i] ** 2
+
+    def cost(i: int, j: int) -> float:
+        """Cost of the segment sizes[i:j]."""
+        w = w_sum[j] - w_sum[i]
+        wx = wx_sum[j] - wx_sum[i]
+        return (wxx_sum[j] - wxx_sum[i]) - wx * wx / w
+
+    # best[c][j]: cost of splitting sizes[:j] into c segments.
+    best = [[math.inf] * (n + 1) for _ in range(k + 1)]
+    split = [[0] * (n + 1) for _ in range(k + 1)]
+    best[0][0] = 0.0
+    for c in range(1, k + 1):
+        for j in range(c, n + 1):
+            for i in range(c - 1, j):
+                candidate = best[c - 1][i] + cost(i, j)
+                if candidate < best[c][j]:
+                    best[c][j] = candidate
+                    split[c][j] = i
+
+    bounds = []
+    j = n
+    for c in range(k, 0, -1):
+        i = split[c][j]
+        bounds.append((i, j))
+        j = i
+    bounds.reverse()
+
+    profiles = []
+    for i, j in bounds:
+        segment = sizes[i:j]
+        opt = max(segment, key=lambda bs: (counts[bs], -bs))
+        profiles.append([segment[0], opt, segment[-1]])
+
+    # Close the gaps between ranges and extend them to the requested bounds.
+    for prev, nxt in zip(profiles, profiles[1:]):
+        prev[2] = nxt[0] - 1
+    if min_batch_size is not None:
+        profiles[0][0] = min(profiles[0][0], min_batch_size)
+    if max_batch_size is not None:
+        profiles[-1][2] = max(profiles[-1][2], max_batch_size)
+    return [tuple(p) for p in profiles]  # type: ignore[misc]
+
+
+def input_specs_from_histogram(
+    histogram: ShapeHistogram,
+    num_profiles: int,
+    batch_dims: Optional[Sequence[int]] = None,
+    min_batch_size: Optional[int] = None,
+    max_batch_size: Optional[int] = None,
+    device: torch.device = torch.device("cpu"),
+) -> List[InputTensorSpec]:
+    """
+    Input specs with one optimization profile per cluster of batch sizes of
+    `histogram`. Dimensions other than the batch dimension are taken from the
+    most frequent shape signature.
+
+    Args:
+        histogram: Recorded input shapes of a module.
+        num_profiles: Maximum number of optimization profiles.
+        batch_dims: Batch dimension of each input, -1 for inputs without one.
+            By default found with `InputTensorSpec.find_batch_size_dim`.
+        min_batch_size: Smallest batch size the profiles must accept.
+        max_batch_size: Largest batch size the profiles must accept.
+        device: Device of the specs, used to create sample inputs.
+    """
+    signature = histogram.most_frequent()
+    assert histogram.dtypes is not None, "The histogram has no input dtypes."
+    if batch_dims is None:
+        batch_dims = InputTensorSpec.find_batch_size_dim(
+            [torch.empty(shape, device="meta") for shape in signature]
+        )
+    profiles = cluster_batch_sizes(
+        histogram.batch_size_counts(batch_dims),
+        num_profiles,
+        min_batch_size,
+        max_batch_size,
+    )
+    return InputTensorSpec.from_shapes_with_batch_size_profiles(
+        signature, histogram.dtypes, profiles, batch_dims, device
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Derive optimization profiles from a recorded shape histogram."
+    )
+    parser.add_argument("histogram", type=str, help="Histogram saved as JSON.")
+    parser.add_argument("--num_profiles", type=int, default=4)
+    parser.add_argument(
+        "--batch_dims",
+        type=int,
+        nargs="*",
+        default=None,
+        help="Batch dimension of each input, -1 for inputs without one.",
+    )
+    parser.add_argument("--min_batch_size", type=int, default=None)
+    parser.add_argument("--max_batch_size", type=int, default=None)
+    args = parser.parse_args()
+
+    histogram = ShapeHistogram.load(args.histogram)
+    batch_dims = args.batch_dims
+    if batch_dims is None:
+        batch_dims = InputTensorSpec.find_batch_size_dim(
+            [torch.empty(shape, device="meta") for shape in histogram.most_frequent()]
+        )
+    # Printed as the value of LowerSetting.batch_size_profiles.
+    print(
+        json.dumps(
+            cluster_batch_sizes(
+                histogram.batch_size_counts(batch_dims),
+                args.num_profiles,
+                args.min_batch_size,
+                args.max_batch_size,
+            )
+        )
+    )
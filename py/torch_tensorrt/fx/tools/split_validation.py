@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+import torch.fx
+from torch import nn
+
+from ..passes.pass_utils import _collect_tensors
+from ..utils import atomic_write
+from .engine_cache import graph_fingerprint
+
+logger = logging.getLogger(__name__)
+
+"""
+Per split accuracy validation of the lowering.
+
+Instead of running the whole original and lowered models and comparing their
+outputs, a `SplitValidator` records the inputs and outputs of every TRT split
+of the original model in one run, then checks each lowered split alone on its
+recorded inputs as soon as it is lowered. Lowering stops at the first split
+out of tolerance, with an error naming it.
+
+Reference activations are kept in an `ActivationCache`, in memory up to a
+budget and spilled to disk beyond it. When the cache directory is set, they
+are kept there, keyed by the split graph, weights included, and the model
+inputs, so later lowerings of the same model skip the reference run.
+"""
+
+SPLIT_VALIDATION_FORMAT_VERSION = 1
+
+
+class ActivationCache:
+    """
+    Tensors by key, in memory up to `max_memory` bytes, in files beyond.
+
+    Args:
+        directory: Directory of the files. When set, every entry is written
+            there and kept after `close`, so it can be read by later runs.
+            Otherwise a temporary directory holds the spilled entries only.
+        max_memory: Bytes of tensors kept in memory.
+    """
+
+    def __init__(self, directory: str = "", max_memory: int = 1 << 30):
+        self.persistent = bool(directory)
+        self.directory = directory or tempfile.mkdtemp(prefix="trt_activations_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_memory = max_memory
+        self.memory = 0
+        self._entries: Dict[str, Dict[str, List[torch.Tensor]]] = {}
+        # Temporary directories are removed even if `close` is never called,
+        # e.g. when the lowering raises.
+        self._cleanup = (
+            None
+            if self.persistent
+            else weakref.finalize(
+                self, shutil.rmtree, self.directory, ignore_errors=True
+            )
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pt")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or os.path.exists(self._path(key))
+
+    def put(self, key: str, tensors: Dict[str, List[torch.Tensor]]) -> None:
+        nbytes = sum(
+            t.numel() * t.element_size() for ts in tensors.values() for t in ts
+        )
+        in_memory = self.memory + nbytes <= self.max_memory
+        if in_memory:
+            self._entries[key] = tensors
+            self.memory += nbytes
+        if self.persistent or not in_memory:
+            with atomic_write(self._path(key)) as f:
+                torch.save(tensors, f)
+
+    def get(self, key: str) -> Dict[str, List[torch.Tensor]]:
+        if key in self._entries:
+            return self._entries[key]
+        return torch.load(self._path(key))
+
+    def close(self) -> None:
+        self._entries.clear()
+        self.memory = 0
+        if self._cleanup is not None:
+            self._cleanup()
+
+
+def _inputs_fingerprint(inputs: Sequence[Any]) -> str:
+    hasher = hashlib.sha256()
+    for t in _collect_tensors(list(inputs)):
+        t = t.detach().cpu().contiguous()
+        hasher.update(f"{t.dtype}{tuple(t.shape)}".encode())
+        hasher.update(t.view(-1).view(torch.uint8).numpy().tobytes())
+    return hasher.hexdigest()
+
+
+class SplitValidator:
+    """
+    Records the reference activations of the TRT splits of a split module
+    and checks the lowered splits against them.
+
+    Args:
+        atol: Absolute tolerance of the output comparisons.
+        rtol: Relative tolerance of the output comparisons.
+        cache: Cache of the reference activations, a temporary one by default.
+    """
+
+    def __init__(
+        self,
+        atol: float = 1e-1,
+        rtol: float = 1e-1,
+        cache: Optional[ActivationCache] = None,
+    ):
+        self.atol = atol
+        self.rtol = rtol
+        self.cache = cache if cache is not None else ActivationCache()
+        self._keys: Dict[str, str] = {}
+
+    def record(
+        self,
+        split_module: nn.Module,
+        submodule_names: Sequence[str],
+        inputs: Sequence[Any],
+    ) -> None:
+        """
+        Record the inputs and outputs of the `submodule_names` submodules of
+        `split_module`, before they are lowered, running it once on `inputs`
+        unless all of them are cached already.
+        """
+        inputs_fingerprint = _inputs_fingerprint(inputs)
+        for name in submodule_names:
+            hasher = hashlib.sha256()
+            hasher.update(
+                json.dumps(
+                    {
+                        "format": SPLIT_VALIDATION_FORMAT_VERSION,
+                        "graph": graph_fingerprint(getattr(split_module, name)),
+                        "inputs": inputs_fingerprint,
+                        "name": name,
+                    },
+                    sort_keys=True,
+                ).encode()
+            )
+            self._keys[name] = hasher.hexdigest()
+
+        missing = [
+            name for name in submodule_names if self._keys[name] not in self.cache
+        ]
+        if not missing:
+            logger.info("Reference activations of all the splits are cached")
+            return
+
+        handles = []
+        recorded_inputs: Dict[str, List[torch.Tensor]] = {}
+
+        def pre_hook(name):
+            def hook(module, args):
+                recorded_inputs[name] = [t.detach() for t in _collect_tensors(args)]
+
+            return hook
+
+        def post_hook(name):
+            def hook(module, args, output):
+                self.cache.put(
+                    self._keys[name],
+                    {
+                        "inputs": recorded_inputs.pop(name),
+                        "outputs": [t.detach() for t in _collect_tensors(output)],
+                    },
+                )
+
+            return hook
+
+        try:
+            for name in missing:
+                submod = getattr(split_module, name)
+                handles.append(submod.register_forward_pre_hook(pre_hook(name)))
+                handles.append(submod.register_forward_hook(post_hook(name)))
+            with torch.no_grad():
+                split_module(*inputs)
+        finally:
+            for handle in handles:
+                handle.remove()
+        logger.info(f"Recorded the reference activations of {len(missing)} splits")
+
+    def check(self, name: str, lowered_module: nn.Module) -> None:
+        """
+        Run `lowered_module`, the lowered split `name`, on its recorded inputs
+        and raise if its outputs are not close to the recorded ones.
+        """
+        reference = self.cache.get(self._keys[name])
+        with torch.no_grad():
+            outputs = _collect_tensors(lowered_module(*reference["inputs"]))
+        expected = reference["outputs"]
+        if len(outputs) != len(expected):
+            raise RuntimeError(
+                f"Lowered split {name} returns {len(outputs)} tensors, expected {len(expected)}."
+            )
+        for i, (actual, ref) in enumerate(zip(outputs, expected)):
+            if actual.device != ref.device:
+                actual, ref = actual.cpu(), ref.cpu()
+            try:
+                torch.testing.assert_close(
+                    actual,
+                    ref,
+                    atol=self.atol,
+                    rtol=self.rtol,
+                    equal_nan=True,
+                    check_dtype=False,
+                )
+            except AssertionError as e:
+                raise RuntimeError(
+                    f"Lowered split {name} failed the accuracy check at output {i}:\n{e}"
+                ) from e
+        logger.info(f"Lowered split {name} passed the accuracy check")
+
+    def close(self) -> None:
+        self.cache.close()
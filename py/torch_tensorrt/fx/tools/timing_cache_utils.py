@@ -1,11 +1,129 @@
+import contextlib
 import logging
 import os
+import threading
+from typing import Dict, Iterator, Optional
+
+# @manual=//deeplearning/trt/python:py_tensorrt
+import tensorrt as trt
+
+from ..utils import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
 
+@contextlib.contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive advisory lock across processes, a no-op where fcntl is missing."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class SharedTimingCache:
+    """
+    A TensorRT timing cache shared by every split built in a process and,
+    through its file, by every process using the same path.
+
+    The file is loaded once per process, use `SharedTimingCache.get` rather
+    than the constructor. Caches produced by builds are merged in memory, and
+    `save` merges the in memory cache with the file content, which may have
+    been grown by other processes since it was loaded, under a file lock and
+    writes the result atomically.
+    """
+
+    _instances: Dict[str, "SharedTimingCache"] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path: str) -> "SharedTimingCache":
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._builder_config = None
+        self._cache = None
+
+    def _create_timing_cache(self, data: bytes) -> "trt.ITimingCache":
+        # Timing caches can only be created and combined through a builder config.
+        if self._builder_config is None:
+            self._builder = trt.Builder(trt.Logger(trt.Logger.WARNING))
+            self._builder_config = self._builder.create_builder_config()
+        return self._builder_config.create_timing_cache(data)
+
+    def _combine(self, data: bytes) -> None:
+        other = self._create_timing_cache(data)
+        if not self._cache.combine(other, False):
+            logger.warning(
+                f"Skipped merging a timing cache into {self.path}, it was created "
+                "for a different device or TensorRT version."
+            )
+
+    def _load(self) -> None:
+        if self._cache is not None:
+            return
+        with _file_lock(self.path + ".lock"):
+            data = _read_file(self.path)
+        self._cache = self._create_timing_cache(data or b"")
+        if data:
+            logger.info(f"Loaded timing cache {self.path} ({len(data)} bytes)")
+
+    def serialize(self) -> Optional[bytearray]:
+        """The current content of the cache, None if it is empty."""
+        with self._lock:
+            self._load()
+            data = bytearray(self._cache.serialize())
+        return data if data else None
+
+    def merge(self, serialized_cache: bytearray) -> None:
+        """Merge a cache returned by a build, e.g. `TRTInterpreterResult.serialized_cache`."""
+        if not serialized_cache:
+            return
+        with self._lock:
+            self._load()
+            self._combine(bytes(serialized_cache))
+
+    def save(self) -> None:
+        with self._lock, _file_lock(self.path + ".lock"):
+            self._load()
+            data = _read_file(self.path)
+            if data:
+                self._combine(data)
+            with atomic_write(self.path) as f:
+                f.write(bytes(self._cache.serialize()))
+
+
 class TimingCacheManager:
-    def __init__(self, timing_cache_prefix: str = "", save_timing_cache=False):
+    def __init__(
+        self,
+        timing_cache_prefix: str = "",
+        save_timing_cache=False,
+        shared_timing_cache: str = "",
+    ):
         # Setting timing cache for TRTInterpreter
         tc = os.environ.get("TRT_TIMING_CACHE_PREFIX", "")
         timing_cache_prefix_name = timing_cache_prefix
@@ -15,10 +133,20 @@ class TimingCacheManager:
         self.timing_cache_prefix_name = timing_cache_prefix_name
         self.save_timing_cache = save_timing_cache
 
+        shared_timing_cache = shared_timing_cache or os.environ.get(
+            "TRT_SHARED_TIMING_CACHE", ""
+        )
+        self.shared_timing_cache: Optional[SharedTimingCache] = (
+            SharedTimingCache.get(shared_timing_cache) if shared_timing_cache else None
+        )
+
     def get_file_full_name(self, name: str):
         return f"{self.timing_cache_prefix_name}_{name}.npy"
 
     def get_timing_cache_trt(self, timing_cache_file: str) -> bytearray:
+        if self.shared_timing_cache is not None:
+            return self.shared_timing_cache.serialize()
+
         timing_cache_file = self.get_file_full_name(timing_cache_file)
         try:
             with open(timing_cache_file, "rb") as raw_cache:
@@ -30,10 +158,22 @@ class TimingCacheManager:
     def update_timing_cache(
         self, timing_cache_file: str, serilized_cache: bytearray
     ) -> None:
+        self.update_timing_caches({timing_cache_file: serilized_cache})
+
+    def update_timing_caches(self, serialized_caches: Dict[str, bytearray]) -> None:
+        """
+        Save the caches of several splits, keyed by split name. With a shared
+        timing cache they are all merged into it and the file is written once.
+        """
         if not self.save_timing_cache:
             return
-        timing_cache_file = self.get_file_full_name(timing_cache_file)
-        with open(timing_cache_file, "wb") as local_cache:
-            local_cache.seek(0)
-            local_cache.write(serilized_cache)
-            local_cache.truncate()
+
+        if self.shared_timing_cache is not None:
+            for serialized_cache in serialized_caches.values():
+                self.shared_timing_cache.merge(serialized_cache)
+            self.shared_timing_cache.save()
+            return
+
+        for name, serialized_cache in serialized_caches.items():
+            with atomic_write(self.get_file_full_name(name)) as f:
+                f.write(bytes(serialized_cache))
@@ -13,6 +13,7 @@ from .. import (
     TRTInterpreter,
     TRTModule,
 )
+from ..converter_registry import load_converters
 from ..tools.trt_minimizer import TensorRTMinimizer
 
 
@@ -23,6 +24,7 @@ def create_trt_operator_support(
     """Creates an `OperatorSupportBase` instance used for TRT splitting purpose."""
     # Create an `OperatorSupport` that declares a node supported if it
     # finds a registered TRT converter.
+    load_converters()
     support_dict: Dict[str, None] = {}
     for k in CONVERTERS.keys():
         if use_implicit_batch_dim:
@@ -1,11 +1,15 @@
 import os
 import sys
-from typing import Any
+from typing import Any, Sequence
 
 import torch.fx
 
 import torch_tensorrt.fx.tracer.acc_tracer.acc_ops as acc_ops
 from torch.fx.passes import shape_prop
+from torch.utils._pytree import tree_map
+
+# Tensors shape propagation can run on, see `propagate`.
+SHAPE_PROP_MODES = ("real", "fake", "meta")
 
 
 class SuppressStderrPrints:
@@ -84,7 +88,9 @@ class AccShapeProp(shape_prop.ShapeProp):
         embedding bag op indexing into the first dimension of the weight tensor
         which it expects to be bigger than it is during tracing.
 
-        For these ops, return a zeros tensor of the correct shape and dtype.
+        For these ops, return a zeros tensor of the correct shape and dtype, on
+        the device of the op inputs so this also works when shape propagation
+        runs on fake or meta tensors.
 
         # TODO(T137066700): migrate shape inference to OSS and use it here to
         determine shape/dtype of output tensor. This will enable all ops to use
@@ -100,14 +106,16 @@ class AccShapeProp(shape_prop.ShapeProp):
             total_D = n.kwargs["total_D"]
 
             D_offsets_shape = self.env[n.kwargs["D_offsets"]].shape
-            offsets_shape = self.env[n.kwargs["offsets"]].shape
-            batches = (offsets_shape[0] - 1) // (D_offsets_shape[0] - 1)
-            result = torch.zeros((batches, total_D), dtype=output_dtype)
+            offsets = self.env[n.kwargs["offsets"]]
+            batches = (offsets.shape[0] - 1) // (D_offsets_shape[0] - 1)
+            result = torch.zeros(
+                (batches, total_D), dtype=output_dtype, device=offsets.device
+            )
 
         elif op.find("acc_ops.embedding_bag"):
             weight = self.env[n.kwargs["weight"]]
-            offsets_shape = self.env[n.kwargs["offsets"]].shape
-            batches = offsets_shape[0] - int(n.kwargs["include_last_offset"])
+            offsets = self.env[n.kwargs["offsets"]]
+            batches = offsets.shape[0] - int(n.kwargs["include_last_offset"])
             output_dtype = weight.dtype
 
             embedding_size = weight.shape[1]
@@ -120,7 +128,9 @@ class AccShapeProp(shape_prop.ShapeProp):
                 # output dtype is hardcoded in https://fburl.com/code/434rkdtk
                 output_dtype = torch.float32
 
-            result = torch.zeros((batches, embedding_size), dtype=output_dtype)
+            result = torch.zeros(
+                (batches, embedding_size), dtype=output_dtype, device=offsets.device
+            )
 
         else:
             raise NotImplementedError(
@@ -128,3 +138,50 @@ class AccShapeProp(shape_prop.ShapeProp):
             )
 
         return result
+
+
+def propagate(
+    gm: torch.fx.GraphModule, sample_inputs: Sequence[Any], mode: str = "real"
+) -> None:
+    """
+    Run AccShapeProp on `gm`.
+
+    Args:
+        gm: The graph module to populate `tensor_meta` and `type` of.
+        sample_inputs: Inputs of `gm`.
+        mode: Tensors the nodes are run on. "real" runs them on the sample
+            inputs. "fake" runs them under a FakeTensorMode, so no activation
+            is materialized, real parameters are only read for their metadata.
+            "meta" runs them on the meta device, which needs the parameters of
+            `gm` to be on the meta device too, e.g. for models too large to be
+            instantiated.
+    """
+    assert mode in SHAPE_PROP_MODES, f"Unknown shape prop mode {mode}"
+    if mode == "real":
+        AccShapeProp(gm).propagate(*sample_inputs)
+        return
+
+    if mode == "meta":
+        meta_inputs = tree_map(
+            lambda x: x.to("meta") if isinstance(x, torch.Tensor) else x,
+            list(sample_inputs),
+        )
+        AccShapeProp(gm).propagate(*meta_inputs)
+        return
+
+    from torch._subclasses.fake_tensor import FakeTensor, FakeTensorMode
+
+    fake_mode = FakeTensorMode(allow_non_fake_inputs=True)
+    fake_inputs = tree_map(
+        lambda x: fake_mode.from_tensor(x) if isinstance(x, torch.Tensor) else x,
+        list(sample_inputs),
+    )
+    with fake_mode:
+        AccShapeProp(gm).propagate(*fake_inputs)
+
+    # Passes like NormalizeArgs match node.meta["type"] against schemas, make it
+    # look like a real run.
+    for node in gm.graph.nodes:
+        node_type = node.meta.get("type")
+        if isinstance(node_type, type) and issubclass(node_type, FakeTensor):
+            node.meta["type"] = torch.Tensor
@@ -613,6 +613,7 @@ def trace(
     ] = None,
     dont_retrace_gm: bool = False,
     concrete_args: Optional[Dict[str, Any]] = None,
+    shape_prop_mode: str = "real",
 ) -> torch.fx.GraphModule:
     """
     Performs tracing and arg normalization specialized for accelerator lowering.
@@ -665,6 +666,13 @@ def trace(
         dont_retrace_gm (bool): Optional bool for whether to re-trace the provided
                                 module if it's a graph module already.
 
+        shape_prop_mode (str): Tensors shape prop runs on. "real" runs the model on
+                                the sample inputs, "fake" under a FakeTensorMode and
+                                "meta" on the meta device, which requires the module
+                                parameters to be on the meta device as well. The last
+                                two only compute shapes and dtypes and don't materialize
+                                any activation.
+
     """
     if mod.training:
         warnings.warn(
@@ -695,7 +703,7 @@ def trace(
     traced.recompile()
 
     # Run shape prop to add node.meta["type"] to nodes, needed for NormalizeArgs.
-    acc_shape_prop.AccShapeProp(traced).propagate(*sample_inputs)
+    acc_shape_prop.propagate(traced, sample_inputs, shape_prop_mode)
     # Swap out tensor_meta for tensor_rank, because we don't actually want to rely on
     # tensor_meta yet for normalization/lowering, though rank shouldn't change.
     _replace_tensor_meta_with_rank(traced)
@@ -716,6 +724,6 @@ def trace(
     traced.recompile()
 
     # Run shape prop to again to populate tensor_meta after normalize.
-    acc_shape_prop.AccShapeProp(traced).propagate(*sample_inputs)
+    acc_shape_prop.propagate(traced, sample_inputs, shape_prop_mode)
 
     return traced
@@ -1,22 +1,145 @@
-from typing import Any, List, Sequence
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
 # @manual=//deeplearning/trt/python:py_tensorrt
 import tensorrt as trt
 import torch
 
+from .cuda_graph_pool import CapturedGraph, CudaGraphPool
+from .refit import refit_engine, RefitWeight
+from .runtime_metrics import DEFAULT_SAMPLE_RATE, ModuleMetrics
 from .utils import torch_dtype_from_trt
 
 
+# Maximum number of input shape signatures whose binding shapes and output
+# buffers are kept by a TRTModule.
+MAX_CACHED_SHAPE_SIGNATURES = 8
+# Maximum number of input shape signatures whose matching optimization
+# profiles are kept by a TRTModule.
+MAX_CACHED_PROFILE_SIGNATURES = 1024
+
+_plugins_initialized = False
+
+
+def _init_trt_plugins():
+    """
+    Register the TensorRT plugins engines may use. Importing the converters
+    does it as well, but they aren't loaded to only deserialize an engine.
+    """
+    global _plugins_initialized
+    if not _plugins_initialized:
+        trt.init_libnvinfer_plugins(trt.Logger(), "")
+        _plugins_initialized = True
+
+
+class _ShapeCacheEntry:
+    """
+    Output shapes, and optionally output buffers, of a TRTModule for one
+    signature of input shapes.
+    """
+
+    def __init__(
+        self,
+        output_shapes: List[Tuple[int, ...]],
+        hidden_output_shapes: List[Tuple[int, ...]],
+    ):
+        self.output_shapes = output_shapes
+        self.hidden_output_shapes = hidden_output_shapes
+        self.outputs: Optional[List[torch.Tensor]] = None
+        self.hidden_outputs: Optional[List[torch.Tensor]] = None
+
+
+class ExecutionSlot:
+    """
+    An execution context of a TRTModule along with the state forward keeps
+    for it: the binding pointer array, the input shapes currently set on the
+    context and the per input shapes signature output shapes and buffers.
+
+    Args:
+        context: TensorRT IExecutionContext.
+        profile_index: Optimization profile the context is bound to.
+        bindings_per_profile: Number of bindings of each optimization profile.
+        stream: Stream the context executes on. None means the current stream.
+    """
+
+    def __init__(
+        self,
+        context: "trt.IExecutionContext",
+        profile_index: int,
+        bindings_per_profile: int,
+        stream: Optional[torch.cuda.Stream] = None,
+    ):
+        self.context = context
+        self.profile_index = profile_index
+        self.stream = stream
+        # Bindings of profile p are at [p * bindings_per_profile, (p + 1) * bindings_per_profile).
+        self.binding_offset = profile_index * bindings_per_profile
+        self.bindings: List[int] = [0] * (self.binding_offset + bindings_per_profile)
+        self.binding_shapes_signature: Optional[Tuple[Tuple[int, ...], ...]] = None
+        self.shape_cache: "OrderedDict[Tuple[Tuple[int, ...], ...], _ShapeCacheEntry]" = (
+            OrderedDict()
+        )
+
+
 class TRTModule(torch.nn.Module):
     def __init__(
-        self, engine=None, input_names=None, output_names=None, cuda_graph_batch_size=-1
+        self,
+        engine=None,
+        input_names=None,
+        output_names=None,
+        cuda_graph_batch_size=-1,
+        reuse_output_storage=False,
+        max_cuda_graphs=4,
+        num_execution_contexts=1,
+        weight_name_map=None,
     ):
+        """
+        Args:
+            engine: TensorRT ICudaEngine.
+            input_names: Names of the engine input bindings, in the order of the forward arguments.
+            output_names: Names of the engine output bindings, in the order of the forward results.
+            cuda_graph_batch_size: Calls whose first input has this batch size are executed by
+                replaying a CUDA graph captured on the first such call for each input shapes.
+                Default to be -1, meaning CUDA graphs are only used for shapes registered with
+                `register_cuda_graph_shapes`.
+            reuse_output_storage: Return the same output tensors from every call with the same
+                input shapes instead of allocating new ones. Only safe for callers that consume
+                the outputs before the next call.
+            max_cuda_graphs: Maximum number of captured CUDA graphs kept alive. Each one owns an
+                execution context, the least recently used one is evicted when the limit is hit.
+            num_execution_contexts: Number of execution contexts sharing the engine weights. With
+                more than one, each context executes on its own stream, is bound round-robin to
+                one of the engine optimization profiles, and every forward checks a free context
+                out of the pool, so threads can call the module concurrently. For the calls to
+                overlap on the GPU, each thread should run under its own current stream.
+                Engines with several optimization profiles get at least one context per profile,
+                and each call runs on a context of the tightest profile containing its input
+                shapes, so small inputs use the kernels tuned for small shapes.
+            weight_name_map: Map from the engine weight names to the FX weights they are derived
+                from, `TRTInterpreterResult.weight_name_map` of a refittable engine. Required by
+                `refit`.
+
+        Calls are counted and sampled into `metrics`, see `enable_metrics`.
+        """
         super(TRTModule, self).__init__()
         self._register_state_dict_hook(TRTModule._on_state_dict)
         self.engine = engine
         self.input_names = input_names
         self.output_names = output_names
         self.cuda_graph_batch_size = cuda_graph_batch_size
+        self.reuse_output_storage = reuse_output_storage
+        self.max_cuda_graphs = max_cuda_graphs
+        self.cuda_graph_shapes: Set[Tuple[Tuple[int, ...], ...]] = set()
+        self.num_execution_contexts = num_execution_contexts
+        self.weight_name_map: Dict[str, RefitWeight] = weight_name_map or {}
+        # A tools.shape_profiles.ShapeHistogram while shapes are recorded.
+        self.shape_histogram = None
+        # A runtime_metrics.ModuleMetrics, None while metrics are disabled.
+        self.metrics: Optional[ModuleMetrics] = ModuleMetrics()
         self.initialized = False
 
         if engine:
@@ -24,7 +147,6 @@ class TRTModule(torch.nn.Module):
 
     def _initialize(self):
         self.initialized = True
-        self.context = self.engine.create_execution_context()
 
         # Indices of inputs/outputs in the trt engine bindings, in the order
         # as they are in the original PyTorch model.
@@ -80,6 +202,328 @@ class TRTModule(torch.nn.Module):
             else tuple()
             for idx in self.hidden_output_binding_indices_in_order
         ]
+        self._create_execution_contexts()
+
+    def _create_execution_contexts(self):
+        """
+        Create the pool of execution contexts along with their forward state,
+        and drop the captured CUDA graphs.
+        """
+        assert (
+            self.num_execution_contexts >= 1
+        ), f"num_execution_contexts must be positive, got {self.num_execution_contexts}."
+        num_profiles = self.engine.num_optimization_profiles
+        bindings_per_profile = self.engine.num_bindings // num_profiles
+        pooled = self.num_execution_contexts > 1
+        self._profile_shape_ranges = self._get_profile_shape_ranges()
+        self._profile_cache: Dict[Tuple[Tuple[int, ...], ...], List[int]] = {}
+
+        # Every optimization profile gets at least one context, so calls can
+        # run on the profile that fits their shapes best. Without a pool the
+        # contexts execute one after the other on the current stream and share
+        # their device memory.
+        num_contexts = self.num_execution_contexts
+        if self._profile_shape_ranges is not None:
+            num_contexts = max(num_contexts, num_profiles)
+        self._device_memory: Optional[torch.Tensor] = None
+        if not pooled and num_contexts > 1:
+            self._device_memory = torch.empty(
+                self.engine.device_memory_size,
+                dtype=torch.uint8,
+                device=torch.cuda.current_device(),
+            )
+
+        self._execution_slots: List[ExecutionSlot] = []
+        for i in range(num_contexts):
+            if self._device_memory is not None:
+                context = self.engine.create_execution_context_without_device_memory()
+                context.device_memory = self._device_memory.data_ptr()
+            else:
+                context = self.engine.create_execution_context()
+            profile_index = i % num_profiles
+            stream = torch.cuda.Stream() if pooled else None
+            if profile_index != 0:
+                setup_stream = stream or torch.cuda.current_stream()
+                context.set_optimization_profile_async(
+                    profile_index, setup_stream.cuda_stream
+                )
+                setup_stream.synchronize()
+            self._execution_slots.append(
+                ExecutionSlot(context, profile_index, bindings_per_profile, stream)
+            )
+
+        self.context = self._execution_slots[0].context
+        # Contexts used by forward without a pool, one per profile.
+        self._default_slots: Dict[int, ExecutionSlot] = {}
+        for slot in self._execution_slots:
+            self._default_slots.setdefault(slot.profile_index, slot)
+        self._free_slots: List[ExecutionSlot] = list(self._execution_slots)
+        self._slots_available = threading.Condition()
+        self._thread_local = threading.local()
+        self._cuda_graphs = CudaGraphPool(self.max_cuda_graphs)
+        self._cuda_graphs_lock = threading.Lock()
+
+    def _get_profile_shape_ranges(
+        self,
+    ) -> Optional[List[List[Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]]]]]:
+        """
+        (min, max) shapes of each input in each optimization profile, None for
+        shape tensor inputs. None if the engine has a single profile or an
+        implicit batch dimension, in which case there is nothing to select.
+        """
+        num_profiles = self.engine.num_optimization_profiles
+        if num_profiles == 1 or self.engine.has_implicit_batch_dimension:
+            return None
+        bindings_per_profile = self.engine.num_bindings // num_profiles
+        ranges = []
+        for profile_index in range(num_profiles):
+            offset = profile_index * bindings_per_profile
+            profile_ranges: List[Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]]] = []
+            for idx in self.input_binding_indices_in_order:
+                if self.engine.is_shape_binding(idx):
+                    profile_ranges.append(None)
+                    continue
+                min_shape, _, max_shape = self.engine.get_profile_shape(
+                    profile_index, offset + idx
+                )
+                profile_ranges.append((tuple(min_shape), tuple(max_shape)))
+            ranges.append(profile_ranges)
+        return ranges
+
+    def _select_profiles(self, signature: Tuple[Tuple[int, ...], ...]) -> List[int]:
+        """
+        Optimization profiles whose ranges contain the input shapes of
+        `signature`, tightest first: the smaller the max shapes of a profile,
+        the better its kernels are tuned for small inputs.
+        """
+        if self._profile_shape_ranges is None:
+            return [0]
+        profiles = self._profile_cache.get(signature)
+        if profiles is not None:
+            return profiles
+
+        candidates = []
+        for profile_index, profile_ranges in enumerate(self._profile_shape_ranges):
+            max_numel = 0
+            for shape, shape_range in zip(signature, profile_ranges):
+                if shape_range is None:
+                    continue
+                min_shape, max_shape = shape_range
+                if len(shape) != len(min_shape) or not all(
+                    lo <= s <= hi for s, lo, hi in zip(shape, min_shape, max_shape)
+                ):
+                    break
+                numel = 1
+                for d in max_shape:
+                    numel *= d
+                max_numel += numel
+            else:
+                candidates.append((max_numel, profile_index))
+        if not candidates:
+            raise RuntimeError(
+                f"Input shapes {list(signature)} are outside of every optimization "
+                "profile of the engine."
+            )
+
+        profiles = [profile_index for _, profile_index in sorted(candidates)]
+        if len(self._profile_cache) >= MAX_CACHED_PROFILE_SIGNATURES:
+            self._profile_cache.clear()
+        self._profile_cache[signature] = profiles
+        return profiles
+
+    def _acquire_slot(
+        self, profiles: Optional[Sequence[int]], timeout: Optional[float]
+    ) -> ExecutionSlot:
+        """
+        Check out a free context bound to one of `profiles`, or to any profile
+        if None, preferring the earlier profiles of the list.
+        """
+
+        def find_free_slot() -> Optional[ExecutionSlot]:
+            if profiles is None:
+                return self._free_slots[0] if self._free_slots else None
+            for profile_index in profiles:
+                for slot in self._free_slots:
+                    if slot.profile_index == profile_index:
+                        return slot
+            return None
+
+        with self._slots_available:
+            if not self._slots_available.wait_for(
+                lambda: find_free_slot() is not None, timeout
+            ):
+                raise queue.Empty
+            slot = find_free_slot()
+            self._free_slots.remove(slot)
+        return slot
+
+    def acquire_execution_context(
+        self, timeout: Optional[float] = None, profile_index: Optional[int] = None
+    ) -> ExecutionSlot:
+        """
+        Check out an execution context for exclusive use, blocking until one
+        is free or `timeout` seconds passed, in which case `queue.Empty` is raised.
+        With a single execution context, forward calls made outside of
+        `execution_context` don't check it out and may run concurrently.
+        With `profile_index`, only a context bound to that optimization profile
+        is checked out.
+        """
+        self._check_initialized()
+        return self._acquire_slot(
+            None if profile_index is None else [profile_index], timeout
+        )
+
+    def release_execution_context(self, slot: ExecutionSlot):
+        """Return an execution context checked out with `acquire_execution_context`."""
+        with self._slots_available:
+            self._free_slots.append(slot)
+            self._slots_available.notify_all()
+
+    @contextmanager
+    def execution_context(
+        self, timeout: Optional[float] = None, profile_index: Optional[int] = None
+    ) -> Iterator[ExecutionSlot]:
+        """
+        Check out an execution context for the duration of the block. Calls to
+        forward made by the current thread within the block run on it, and
+        must have input shapes within its optimization profile.
+        """
+        slot = self.acquire_execution_context(timeout, profile_index)
+        self._thread_local.slot = slot
+        try:
+            yield slot
+        finally:
+            self._thread_local.slot = None
+            self.release_execution_context(slot)
+
+    def _get_output_shapes(
+        self, context, batch_size: int, binding_offset: int = 0
+    ) -> Tuple[List[Tuple[int, ...]], List[Tuple[int, ...]]]:
+        """
+        Shapes of the outputs and hidden outputs, given the batch size for
+        implicit batch engines or the binding shapes set on `context`.
+        """
+        if self.engine.has_implicit_batch_dimension:
+            output_shapes = [(batch_size,) + shape for shape in self.output_shapes]
+            hidden_output_shapes = [
+                (batch_size,) + shape for shape in self.hidden_output_shapes
+            ]
+        else:
+            output_shapes = [
+                tuple(context.get_binding_shape(binding_offset + idx))
+                for idx in self.output_binding_indices_in_order
+            ]
+            hidden_output_shapes = [
+                tuple(context.get_binding_shape(binding_offset + idx))
+                for idx in self.hidden_output_binding_indices_in_order
+            ]
+        return output_shapes, hidden_output_shapes
+
+    def _get_shape_cache_entry(
+        self,
+        slot: ExecutionSlot,
+        signature: Tuple[Tuple[int, ...], ...],
+        batch_size: int,
+    ) -> _ShapeCacheEntry:
+        entry = slot.shape_cache.get(signature)
+        if entry is not None:
+            slot.shape_cache.move_to_end(signature)
+            return entry
+
+        entry = _ShapeCacheEntry(
+            *self._get_output_shapes(slot.context, batch_size, slot.binding_offset)
+        )
+        slot.shape_cache[signature] = entry
+        if len(slot.shape_cache) > MAX_CACHED_SHAPE_SIGNATURES:
+            slot.shape_cache.popitem(last=False)
+        return entry
+
+    def register_cuda_graph_shapes(self, *input_shapes: Sequence[int]):
+        """
+        Execute calls whose inputs have exactly `input_shapes`, one shape per
+        input, by replaying a CUDA graph.
+        """
+        assert len(input_shapes) == len(
+            self.input_names
+        ), f"Expect one shape per input ({len(self.input_names)}), got {len(input_shapes)}."
+        self.cuda_graph_shapes.add(tuple(tuple(shape) for shape in input_shapes))
+
+    def _use_cuda_graph(
+        self, signature: Tuple[Tuple[int, ...], ...], batch_size: int
+    ) -> bool:
+        return signature in self.cuda_graph_shapes or (
+            self.cuda_graph_batch_size > 0 and batch_size == self.cuda_graph_batch_size
+        )
+
+    def _capture_cuda_graph(
+        self,
+        inputs: List[torch.Tensor],
+        signature: Tuple[Tuple[int, ...], ...],
+        batch_size: int,
+    ) -> CapturedGraph:
+        # Each graph gets its own execution context, since the binding shapes
+        # and device memory of a context are baked into the captured launch.
+        context = self.engine.create_execution_context()
+        profile_index = self._select_profiles(signature)[0]
+        bindings_per_profile = (
+            self.engine.num_bindings // self.engine.num_optimization_profiles
+        )
+        offset = profile_index * bindings_per_profile
+        if profile_index != 0:
+            context.set_optimization_profile_async(
+                profile_index, torch.cuda.current_stream().cuda_stream
+            )
+        if not self.engine.has_implicit_batch_dimension:
+            for i, idx in enumerate(self.input_binding_indices_in_order):
+                context.set_binding_shape(offset + idx, signature[i])
+        output_shapes, hidden_output_shapes = self._get_output_shapes(
+            context, batch_size, offset
+        )
+
+        static_inputs = [x.clone() for x in inputs]
+        static_outputs = [
+            torch.empty(  # type: ignore[call-overload]
+                size=shape,
+                dtype=self.output_dtypes[i],
+                device=torch.cuda.current_device(),
+            )
+            for i, shape in enumerate(output_shapes)
+        ]
+        static_hidden_outputs = [
+            torch.empty(  # type: ignore[call-overload]
+                size=shape,
+                dtype=self.hidden_output_dtypes[i],
+                device=torch.cuda.current_device(),
+            )
+            for i, shape in enumerate(hidden_output_shapes)
+        ]
+
+        bindings: List[int] = [0] * (offset + bindings_per_profile)
+        for i, idx in enumerate(self.input_binding_indices_in_order):
+            bindings[offset + idx] = static_inputs[i].data_ptr()
+        for i, idx in enumerate(self.output_binding_indices_in_order):
+            bindings[offset + idx] = static_outputs[i].data_ptr()
+        for i, idx in enumerate(self.hidden_output_binding_indices_in_order):
+            bindings[offset + idx] = static_hidden_outputs[i].data_ptr()
+
+        def launch():
+            if self.engine.has_implicit_batch_dimension:
+                context.execute_async(
+                    batch_size, bindings, torch.cuda.current_stream().cuda_stream
+                )
+            else:
+                context.execute_async_v2(
+                    bindings, torch.cuda.current_stream().cuda_stream
+                )
+
+        return self._cuda_graphs.capture(
+            signature,
+            context,
+            static_inputs,
+            static_outputs,
+            static_hidden_outputs,
+            launch,
+        )
 
     def _check_initialized(self):
         if not self.initialized:
@@ -91,6 +535,8 @@ class TRTModule(torch.nn.Module):
         state_dict[prefix + "input_names"] = self.input_names
         state_dict[prefix + "output_names"] = self.output_names
         state_dict[prefix + "cuda_graph_batch_size"] = self.cuda_graph_batch_size
+        state_dict[prefix + "num_execution_contexts"] = self.num_execution_contexts
+        state_dict[prefix + "weight_name_map"] = self.weight_name_map
 
     def _load_from_state_dict(
         self,
@@ -106,30 +552,66 @@ class TRTModule(torch.nn.Module):
 
         logger = trt.Logger()
         runtime = trt.Runtime(logger)
+        _init_trt_plugins()
         self.engine = runtime.deserialize_cuda_engine(engine_bytes)
 
         self.input_names = state_dict[prefix + "input_names"]
         self.output_names = state_dict[prefix + "output_names"]
+        self.cuda_graph_batch_size = state_dict.get(
+            prefix + "cuda_graph_batch_size", -1
+        )
+        self.num_execution_contexts = state_dict.get(
+            prefix + "num_execution_contexts", self.num_execution_contexts
+        )
+        self.weight_name_map = state_dict.get(prefix + "weight_name_map", {})
         self._initialize()
 
     def __getstate__(self):
         state = self.__dict__.copy()
         state["engine"] = bytearray(self.engine.serialize())
-        state.pop("context", None)
+        for attr in (
+            "context",
+            "_execution_slots",
+            "_free_slots",
+            "_slots_available",
+            "_default_slots",
+            "_device_memory",
+            "_profile_shape_ranges",
+            "_profile_cache",
+            "_thread_local",
+            "_cuda_graphs",
+            "_cuda_graphs_lock",
+        ):
+            state.pop(attr, None)
         return state
 
     def __setstate__(self, state):
         logger = trt.Logger()
         runtime = trt.Runtime(logger)
+        _init_trt_plugins()
         state["engine"] = runtime.deserialize_cuda_engine(state["engine"])
+        state.setdefault("reuse_output_storage", False)
+        state.setdefault("max_cuda_graphs", 4)
+        state.setdefault("cuda_graph_shapes", set())
+        state.setdefault("num_execution_contexts", 1)
+        state.setdefault("weight_name_map", {})
+        state.setdefault("shape_histogram", None)
+        if "metrics" not in state:
+            state["metrics"] = ModuleMetrics()
         self.__dict__.update(state)
         if self.engine:
-            self.context = self.engine.create_execution_context()
+            self._create_execution_contexts()
 
     def forward(self, *inputs):
         with torch.autograd.profiler.record_function("TRTModule:Forward"):
             self._check_initialized()
 
+            metrics = self.metrics
+            # Timestamps of the ends of the stages of a sampled call.
+            marks: Optional[List[float]] = None
+            if metrics is not None and metrics.sample():
+                marks = [time.perf_counter()]
+
             with torch.autograd.profiler.record_function("TRTModule:ProcessInputs"):
                 assert len(inputs) == len(
                     self.input_names
@@ -138,11 +620,7 @@ class TRTModule(torch.nn.Module):
                 # This is only used when the trt engine is using implicit batch dim.
                 batch_size = inputs[0].shape[0]
                 contiguous_inputs: List[torch.Tensor] = [i.contiguous() for i in inputs]
-                bindings: List[Any] = [None] * (
-                    len(self.input_names)
-                    + len(self.output_names)
-                    + len(self.hidden_output_names)
-                )
+                signature = tuple(tuple(i.shape) for i in contiguous_inputs)
 
                 for i, input_name in enumerate(self.input_names):
                     assert inputs[
@@ -152,84 +630,260 @@ class TRTModule(torch.nn.Module):
                         inputs[i].dtype == self.input_dtypes[i]
                     ), f"Dtype mismatch for {i}th input({input_name}). Expect {self.input_dtypes[i]}, got {inputs[i].dtype}."
 
-                    idx = self.input_binding_indices_in_order[i]
-                    bindings[idx] = contiguous_inputs[i].data_ptr()
+                if self.shape_histogram is not None:
+                    self.shape_histogram.record(signature, self.input_dtypes)
+
+            if self._use_cuda_graph(signature, batch_size):
+                with torch.autograd.profiler.record_function(
+                    "TRTModule:CudaGraphReplay"
+                ), self._cuda_graphs_lock:
+                    captured = self._cuda_graphs.get(signature)
+                    if captured is None:
+                        captured = self._capture_cuda_graph(
+                            contiguous_inputs, signature, batch_size
+                        )
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    outputs = captured.replay(contiguous_inputs)
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    if not self.reuse_output_storage:
+                        outputs = [output.clone() for output in outputs]
+
+                if marks is not None:
+                    marks.append(time.perf_counter())
+                    metrics.record(
+                        signature,
+                        {
+                            "process_inputs": marks[1] - marks[0],
+                            "execute": marks[2] - marks[1],
+                            "allocate_outputs": marks[3] - marks[2],
+                        },
+                        outputs,
+                    )
 
+                if len(outputs) == 1:
+                    return outputs[0]
+
+                return tuple(outputs)
+
+            profiles = self._select_profiles(signature)
+            slot = getattr(self._thread_local, "slot", None)
+            if slot is not None:
+                if slot.profile_index not in profiles:
+                    raise RuntimeError(
+                        f"Input shapes {list(signature)} are outside of optimization "
+                        f"profile {slot.profile_index} of the checked out execution "
+                        f"context, use one of the profiles {profiles}."
+                    )
+                outputs = self._execute(
+                    slot, inputs, contiguous_inputs, signature, batch_size, marks
+                )
+            elif self.num_execution_contexts == 1:
+                outputs = self._execute(
+                    self._default_slots[profiles[0]],
+                    inputs,
+                    contiguous_inputs,
+                    signature,
+                    batch_size,
+                    marks,
+                )
+            else:
+                slot = self._acquire_slot(profiles, None)
+                try:
+                    outputs = self._execute(
+                        slot, inputs, contiguous_inputs, signature, batch_size, marks
+                    )
+                finally:
+                    self.release_execution_context(slot)
+
+            if marks is not None:
+                metrics.record(
+                    signature,
+                    {
+                        "process_inputs": marks[1] - marks[0],
+                        "allocate_outputs": marks[2] - marks[1],
+                        "execute": marks[3] - marks[2],
+                    },
+                    outputs,
+                )
+
+            if len(outputs) == 1:
+                return outputs[0]
+
+            return tuple(outputs)
+
+    def _execute(
+        self,
+        slot: ExecutionSlot,
+        inputs: Sequence[torch.Tensor],
+        contiguous_inputs: List[torch.Tensor],
+        signature: Tuple[Tuple[int, ...], ...],
+        batch_size: int,
+        marks: Optional[List[float]] = None,
+    ) -> List[torch.Tensor]:
+        """
+        Execute the engine on `slot`. With `marks`, the end times of the input
+        processing, the output allocation and the execution are appended to it.
+        """
+        bindings = slot.bindings
+        offset = slot.binding_offset
+
+        with torch.autograd.profiler.record_function("TRTModule:ProcessInputs"):
+            for i, idx in enumerate(self.input_binding_indices_in_order):
+                bindings[offset + idx] = contiguous_inputs[i].data_ptr()
+
+            # Binding shapes only need to be set on the context when they
+            # differ from the ones set by the previous call.
+            if signature != slot.binding_shapes_signature:
+                for i, input_name in enumerate(self.input_names):
+                    idx = self.input_binding_indices_in_order[i]
                     if not self.engine.has_implicit_batch_dimension:
-                        self.context.set_binding_shape(
-                            idx, tuple(contiguous_inputs[i].shape)
-                        )
+                        slot.context.set_binding_shape(offset + idx, signature[i])
                     else:
                         assert inputs[i].size()[1:] == self.input_shapes[i], (
                             f"Shape mismatch for {i}th input({input_name}). "
                             f"Expect {self.input_shapes[i]}, got {inputs[i].size()[1:]}."
                         )
+                slot.binding_shapes_signature = signature
 
-            with torch.autograd.profiler.record_function("TRTModule:ProcessOutputs"):
-                # create output tensors
-                outputs: List[torch.Tensor] = []
+            if marks is not None:
+                marks.append(time.perf_counter())
 
-                for i, idx in enumerate(self.output_binding_indices_in_order):
-                    if self.engine.has_implicit_batch_dimension:
-                        shape = (batch_size,) + self.output_shapes[i]
-                    else:
-                        shape = tuple(self.context.get_binding_shape(idx))
+        with torch.autograd.profiler.record_function("TRTModule:ProcessOutputs"):
+            entry = self._get_shape_cache_entry(slot, signature, batch_size)
 
-                    output = torch.empty(  # type: ignore[call-overload]
+            # create output tensors
+            if entry.outputs is not None:
+                outputs = entry.outputs
+            else:
+                outputs = [
+                    torch.empty(  # type: ignore[call-overload]
                         size=shape,
                         dtype=self.output_dtypes[i],
                         device=torch.cuda.current_device(),
                     )
-                    outputs.append(output)
-                    bindings[idx] = output.data_ptr()
-
-                for i, idx in enumerate(self.hidden_output_binding_indices_in_order):
-                    if self.engine.has_implicit_batch_dimension:
-                        shape = (batch_size,) + self.hidden_output_shapes[i]
-                    else:
-                        shape = tuple(self.context.get_binding_shape(idx))
-
-                    output = torch.empty(  # type: ignore[call-overload]
+                    for i, shape in enumerate(entry.output_shapes)
+                ]
+                if self.reuse_output_storage:
+                    entry.outputs = outputs
+
+            # Hidden outputs are never returned, so their storage is
+            # always reused.
+            if entry.hidden_outputs is None:
+                entry.hidden_outputs = [
+                    torch.empty(  # type: ignore[call-overload]
                         size=shape,
                         dtype=self.hidden_output_dtypes[i],
                         device=torch.cuda.current_device(),
                     )
-                    bindings[idx] = output.data_ptr()
+                    for i, shape in enumerate(entry.hidden_output_shapes)
+                ]
 
-            with torch.autograd.profiler.record_function("TRTModule:TensorRTRuntime"):
-                if self.engine.has_implicit_batch_dimension:
-                    self.context.execute_async(
-                        batch_size, bindings, torch.cuda.current_stream().cuda_stream
-                    )
-                else:
-                    self.context.execute_async_v2(
-                        bindings, torch.cuda.current_stream().cuda_stream
-                    )
+            for i, idx in enumerate(self.output_binding_indices_in_order):
+                bindings[offset + idx] = outputs[i].data_ptr()
+            for i, idx in enumerate(self.hidden_output_binding_indices_in_order):
+                bindings[offset + idx] = entry.hidden_outputs[i].data_ptr()
 
-            if len(outputs) == 1:
-                return outputs[0]
+            if marks is not None:
+                marks.append(time.perf_counter())
 
-            return tuple(outputs)
+        with torch.autograd.profiler.record_function("TRTModule:TensorRTRuntime"):
+            # Inputs and outputs live on the current stream, so a context with
+            # its own stream waits for the work queued so far and the current
+            # stream waits for the execution before anything else touches them.
+            current_stream = torch.cuda.current_stream()
+            stream = slot.stream or current_stream
+            if slot.stream is not None:
+                slot.stream.wait_stream(current_stream)
+
+            if self.engine.has_implicit_batch_dimension:
+                slot.context.execute_async(batch_size, bindings, stream.cuda_stream)
+            else:
+                slot.context.execute_async_v2(bindings, stream.cuda_stream)
+
+            if slot.stream is not None:
+                current_stream.wait_stream(slot.stream)
+
+            if marks is not None:
+                marks.append(time.perf_counter())
+
+        return outputs
 
     def enable_profiling(self, profiler: "trt.IProfiler" = None):
         """
         Enable TensorRT profiling. After calling this function, TensorRT will report
-        time spent on each layer in stdout for each forward run.
+        time spent on each layer in stdout for each forward run, on every execution
+        context. Calls replayed from captured CUDA graphs are not profiled.
         """
         self._check_initialized()
 
-        if not self.context.profiler:
-            self.context.profiler = trt.Profiler() if profiler is None else profiler
+        profiler = trt.Profiler() if profiler is None else profiler
+        for slot in self._execution_slots:
+            if not slot.context.profiler:
+                slot.context.profiler = profiler
 
     def disable_profiling(self):
         """
-        Disable TensorRT profiling.
+        Disable TensorRT profiling, by creating the execution contexts anew.
         """
         self._check_initialized()
 
         torch.cuda.synchronize()
         del self.context
-        self.context = self.engine.create_execution_context()
+        self._create_execution_contexts()
+
+    def enable_shape_recording(self, histogram=None):
+        """
+        Count the input shapes of every forward call in `histogram`, a new one by
+        default, e.g. to derive optimization profiles from served traffic with
+        `tools.shape_profiles`. Returns the histogram.
+        """
+        from .tools.shape_profiles import ShapeHistogram
+
+        self.shape_histogram = histogram if histogram is not None else ShapeHistogram()
+        return self.shape_histogram
+
+    def disable_shape_recording(self):
+        """Stop recording input shapes and return the recorded histogram."""
+        histogram, self.shape_histogram = self.shape_histogram, None
+        return histogram
+
+    def enable_metrics(
+        self, name: Optional[str] = None, sample_rate: float = DEFAULT_SAMPLE_RATE
+    ) -> ModuleMetrics:
+        """
+        Start the runtime metrics of the module over, exported with the `name`
+        label, one call out of `1 / sample_rate` being timed and recorded. See
+        `runtime_metrics`. Returns the metrics.
+        """
+        self.metrics = ModuleMetrics(name, sample_rate)
+        return self.metrics
+
+    def disable_metrics(self) -> Optional[ModuleMetrics]:
+        """Stop counting calls and return the metrics recorded so far."""
+        metrics, self.metrics = self.metrics, None
+        return metrics
+
+    def refit(self, state_dict: Mapping[str, torch.Tensor], strict: bool = False):
+        """
+        Update the engine weights in place with the values of `state_dict`, keyed
+        by FX weight names, e.g. the state dict of the module that was lowered.
+        Entries that are not weights of the engine are ignored, with `strict` the
+        weights of the engine missing from `state_dict` raise an error.
+        """
+        self._check_initialized()
+        if not self.weight_name_map:
+            raise RuntimeError(
+                "TRTModule has no refittable weights, the engine must be built with refit enabled "
+                "from a module whose weights are not graph inputs, e.g. lifted by AOTAutograd."
+            )
+
+        torch.cuda.synchronize()
+        refit_engine(self.engine, self.weight_name_map, state_dict, strict)
+        # Captured graphs may reference the previous weights.
+        with self._cuda_graphs_lock:
+            self._cuda_graphs.clear()
 
     def get_layer_info(self) -> str:
         """
@@ -1,16 +1,13 @@
+import os
+import tempfile
+from contextlib import contextmanager
 from enum import Enum
-from typing import List, Optional, Callable
+from typing import IO, Iterator, List, Optional, Callable
 from packaging import version
 
 # @manual=//deeplearning/trt/python:py_tensorrt
 import tensorrt as trt
 import torch
-from functorch import make_fx
-from functorch.experimental import functionalize
-from torch_tensorrt.fx.passes.lower_basic_pass import (
-    replace_op_with_indices,
-    run_const_fold,
-)
 
 from .types import Shape, TRTDataType
 
@@ -106,6 +103,14 @@ def get_dynamic_dims(shape: Shape) -> List[int]:
 
 
 def proxytensor_trace(mod, inputs):
+    # Imported here since the lowering passes register the acc ops, which
+    # processes that only run lowered modules don't need.
+    from functorch import make_fx
+    from functorch.experimental import functionalize
+    from torch_tensorrt.fx.passes.lower_basic_pass import (
+        replace_op_with_indices,
+        run_const_fold,
+    )
 
     mod.eval()
 
@@ -152,3 +157,28 @@ def req_torch_version(min_torch_version: str = "2.dev"):
         return function_wrapper
 
     return nested_decorator
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb") -> Iterator[IO]:
+    """
+    Open a temporary file next to `path` for writing, and move it to `path`
+    once the block exits without error, so readers never see a partially
+    written file. On error the temporary file is removed and `path` is left
+    untouched.
+
+    Args:
+        path (str): The file to write.
+        mode (str): The mode the temporary file is opened with, "wb" or "w".
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
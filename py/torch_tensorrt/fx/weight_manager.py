@@ -0,0 +1,212 @@
+import contextlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.fx
+
+logger = logging.getLogger(__name__)
+
+"""
+Staging of the host copies of the weights converters hand to TensorRT.
+
+TensorRT reads the weight arrays of a network when the engine is built, so
+every array created by the converters must stay alive until then. While a
+network is built by `TRTInterpreter`, a `WeightManager` creates these arrays:
+each view of a module weight, e.g. a parameter shared by several layers or
+read by several `get_attr` nodes, is converted to numpy once and the same
+array is handed to every layer using it. The interpreter releases the arrays
+as soon as the engine is built and logs the staged and deduplicated bytes.
+
+Arrays of tensors that are not module weights, e.g. constants computed by a
+converter, are converted every time and not kept, their lifetime is the
+converters' business.
+
+Once built, engines hold their own copy of the weights. With
+`LowerSetting.drop_lowered_weights`, `release_lowered_weights` frees the
+PyTorch tensors read only by the lowered submodules, or offloads them to
+another device, so the model doesn't occupy GPU memory twice.
+"""
+
+# Device and storage address of a tensor.
+_StorageKey = Tuple[torch.device, int]
+# View of a weight cast to a dtype.
+_WeightKey = Tuple[
+    _StorageKey, int, Tuple[int, ...], Tuple[int, ...], torch.dtype, torch.dtype
+]
+
+
+def _storage(tensor: torch.Tensor) -> _StorageKey:
+    return tensor.device, tensor.untyped_storage().data_ptr()
+
+
+def _convert(tensor: torch.Tensor, dtype: Optional[torch.dtype]) -> np.ndarray:
+    tensor = tensor.detach()
+    if dtype is not None:
+        tensor = tensor.to(dtype)
+    return tensor.cpu().contiguous().numpy()
+
+
+class WeightManager:
+    """
+    Converts the weights of the module being converted to numpy, once per
+    distinct view and dtype, and keeps the arrays alive until `release`.
+
+    Args:
+        named_tensors: (FX name, tensor) pairs of the weights of the module
+            being converted.
+    """
+
+    def __init__(self, named_tensors: Iterable[Tuple[str, Any]]):
+        self._storages = {
+            _storage(tensor)
+            for _, tensor in named_tensors
+            if isinstance(tensor, torch.Tensor)
+            and not tensor.is_quantized
+            and tensor.numel() > 0
+        }
+        self._arrays: Dict[_WeightKey, np.ndarray] = {}
+        self._lock = threading.Lock()
+        # Bytes of the arrays created, and of the arrays reused instead.
+        self.staged_bytes = 0
+        self.deduplicated_bytes = 0
+
+    def _key(
+        self, tensor: torch.Tensor, dtype: Optional[torch.dtype]
+    ) -> Optional[_WeightKey]:
+        if tensor.is_quantized or tensor.numel() == 0:
+            return None
+        storage = _storage(tensor)
+        if storage not in self._storages:
+            return None
+        return (
+            storage,
+            tensor.storage_offset(),
+            tuple(tensor.shape),
+            tuple(tensor.stride()),
+            tensor.dtype,
+            dtype or tensor.dtype,
+        )
+
+    def to_numpy(
+        self, tensor: torch.Tensor, dtype: Optional[torch.dtype] = None
+    ) -> np.ndarray:
+        """`tensor` cast to `dtype` as a numpy array, shared with the previous
+        conversions of the same weight view."""
+        key = self._key(tensor, dtype)
+        if key is not None:
+            with self._lock:
+                array = self._arrays.get(key)
+                if array is not None:
+                    self.deduplicated_bytes += array.nbytes
+                    return array
+
+        array = _convert(tensor, dtype)
+        with self._lock:
+            self.staged_bytes += array.nbytes
+            if key is not None:
+                self._arrays[key] = array
+        return array
+
+    def release(self) -> None:
+        """Drop the staged arrays, once the engine is built."""
+        with self._lock:
+            self._arrays.clear()
+            self._storages.clear()
+
+
+_active = threading.local()
+
+
+@contextlib.contextmanager
+def stage_weights(manager: WeightManager) -> Iterator[WeightManager]:
+    """Make `manager` convert the weights converted in this thread."""
+    previous = getattr(_active, "manager", None)
+    _active.manager = manager
+    try:
+        yield manager
+    finally:
+        _active.manager = previous
+
+
+def stage_weight(
+    tensor: torch.Tensor, dtype: Optional[torch.dtype] = None
+) -> np.ndarray:
+    """`tensor` cast to `dtype` as a numpy array, staged by the active manager, if any."""
+    manager = getattr(_active, "manager", None)
+    if manager is not None:
+        return manager.to_numpy(tensor, dtype)
+    return _convert(tensor, dtype)
+
+
+def _module_tensors(module: torch.nn.Module) -> List[torch.Tensor]:
+    """
+    The parameters, buffers and plain tensor attributes read by the
+    `get_attr` nodes of `module` and its submodules, as the very objects
+    referenced by the modules, not detached copies.
+    """
+    tensors = [p for _, p in module.named_parameters(remove_duplicate=False)]
+    tensors += [b for _, b in module.named_buffers(remove_duplicate=False)]
+    for submod in module.modules():
+        if isinstance(submod, torch.fx.GraphModule):
+            for node in submod.graph.nodes:
+                if node.op != "get_attr":
+                    continue
+                attr: Any = submod
+                for atom in str(node.target).split("."):
+                    attr = getattr(attr, atom, None)
+                if isinstance(attr, torch.Tensor):
+                    tensors.append(attr)
+    return tensors
+
+
+def release_lowered_weights(
+    lowered_submodules: Iterable[torch.nn.Module],
+    lowered_module: torch.nn.Module,
+    offload_device: Optional[str] = None,
+) -> int:
+    """
+    Free the tensors of the original `lowered_submodules`, replaced by
+    engines, that `lowered_module` no longer reads, e.g. through a fallback
+    submodule. The tensor objects are emptied in place, so the copies of the
+    module the lowering started from, which share them, are released as well
+    and can't run anymore.
+
+    Args:
+        lowered_submodules: The submodules that were lowered to TensorRT.
+        lowered_module: The module resulting from the lowering.
+        offload_device: Move the tensors to this device, e.g. "cpu", instead
+            of freeing them, so the original model can still be used, e.g. to
+            refit the engines.
+
+    Returns:
+        The bytes of memory released on the devices the tensors were on.
+    """
+    kept = {_storage(t) for t in _module_tensors(lowered_module) if t.numel() > 0}
+    released: Dict[int, torch.Tensor] = {}
+    for submod in lowered_submodules:
+        for tensor in _module_tensors(submod):
+            if tensor.numel() > 0 and _storage(tensor) not in kept:
+                released[id(tensor)] = tensor
+
+    released_bytes = 0
+    storages = set()
+    for tensor in released.values():
+        if offload_device is not None and tensor.device == torch.device(offload_device):
+            continue
+        storage = _storage(tensor)
+        if storage not in storages:
+            storages.add(storage)
+            released_bytes += tensor.untyped_storage().nbytes()
+        if offload_device is None:
+            tensor.data = torch.empty(0, dtype=tensor.dtype, device=tensor.device)
+        else:
+            tensor.data = tensor.data.to(offload_device)
+
+    logger.info(
+        f"{'Offloaded' if offload_device else 'Released'} {len(storages)} "
+        f"lowered weights, {released_bytes / 2**20:.1f} MB"
+    )
+    return released_bytes
@@ -1,6 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import torch
 import os
+import queue
+import threading
 
 from torch_tensorrt import _C
 from torch_tensorrt._version import __version__
@@ -39,6 +41,155 @@ def get_batch(self, names):
     return inputs_gpu
 
 
+class _PrefetchSlot(object):
+    """Pinned host and device buffers holding one calibration batch."""
+
+    def __init__(self):
+        self.host_buffers: List[torch.Tensor] = []
+        self.device_buffers: List[torch.Tensor] = []
+        self.copied = None
+
+    @staticmethod
+    def _matching(buffer, tensor):
+        return (
+            buffer is not None
+            and buffer.shape == tensor.shape
+            and buffer.dtype == tensor.dtype
+        )
+
+    def fill(self, tensors, device, stream, reuse_device_buffers):
+        """Stage `tensors` in pinned memory and copy them to `device` on `stream`."""
+        if len(self.host_buffers) != len(tensors):
+            self.host_buffers = [None] * len(tensors)
+            self.device_buffers = [None] * len(tensors)
+
+        sources = []
+        for i, t in enumerate(tensors):
+            if t.is_cuda or t.is_pinned():
+                sources.append(t)
+                continue
+            if not self._matching(self.host_buffers[i], t):
+                self.host_buffers[i] = torch.empty(
+                    t.shape, dtype=t.dtype, pin_memory=True
+                )
+            self.host_buffers[i].copy_(t)
+            sources.append(self.host_buffers[i])
+
+        # Tensors already on the device were produced on the current stream.
+        stream.wait_stream(torch.cuda.current_stream(device))
+        with torch.cuda.stream(stream):
+            for i, source in enumerate(sources):
+                if not (
+                    reuse_device_buffers
+                    and self._matching(self.device_buffers[i], source)
+                ):
+                    self.device_buffers[i] = torch.empty(
+                        source.shape, dtype=source.dtype, device=device
+                    )
+                self.device_buffers[i].copy_(source, non_blocking=True)
+            self.copied = torch.cuda.Event()
+            self.copied.record(stream)
+
+
+class _BatchPrefetcher(object):
+    """
+    Loads the batches of a dataloader on a background thread, stages them in
+    pinned host buffers and copies them to the device on a side stream, keeping
+    up to `num_batches` batches on the device ahead of TensorRT.
+
+    The batch handed to TensorRT stays valid until the next one is requested,
+    its buffers are then recycled for the batches to come.
+    """
+
+    def __init__(self, dataloader, device, num_batches, reuse_device_buffers):
+        self.data_loader = dataloader
+        self.device = torch.device(device)
+        self.reuse_device_buffers = reuse_device_buffers
+        self._ready = queue.Queue()
+        # One slot per prefetched batch, plus the one TensorRT is reading.
+        self._free_slots = queue.Queue()
+        for _ in range(num_batches + 1):
+            self._free_slots.put(_PrefetchSlot())
+        self._current = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _next_free_slot(self) -> Optional[_PrefetchSlot]:
+        while not self._stopped.is_set():
+            try:
+                return self._free_slots.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _run(self):
+        try:
+            with torch.cuda.device(self.device):
+                stream = torch.cuda.Stream(self.device)
+                for batch in self.data_loader:
+                    slot = self._next_free_slot()
+                    if slot is None:
+                        return
+                    tensors = (
+                        list(batch) if isinstance(batch, (list, tuple)) else [batch]
+                    )
+                    slot.fill(tensors, self.device, stream, self.reuse_device_buffers)
+                    self._ready.put(slot)
+        except Exception as e:
+            self._ready.put(e)
+            return
+        self._ready.put(None)
+
+    def next_batch(self) -> Optional[List[int]]:
+        """Device pointers of the next batch, None once the dataloader is exhausted."""
+        if self._stopped.is_set():
+            return None
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="calibration-prefetch", daemon=True
+            )
+            self._thread.start()
+        if self._current is not None:
+            self._free_slots.put(self._current)
+            self._current = None
+
+        slot = self._ready.get()
+        if slot is None:
+            self.close()
+            return None
+        if isinstance(slot, Exception):
+            self.close()
+            raise slot
+        slot.copied.synchronize()
+        self._current = slot
+        return [buffer.data_ptr() for buffer in slot.device_buffers]
+
+    def close(self):
+        """Stop the background thread and release the buffers."""
+        self._stopped.set()
+        self._current = None
+        for q in (self._ready, self._free_slots):
+            while not q.empty():
+                q.get_nowait()
+        # Later calls see an exhausted dataloader.
+        self._ready.put(None)
+
+
+def get_prefetched_batch(self, names):
+    if self.current_batch_idx + self.batch_size > len(self.data_loader.dataset):
+        self.prefetcher.close()
+        return None
+
+    try:
+        inputs_gpu = self.prefetcher.next_batch()
+    except Exception as e:
+        log(Level.Error, "Failed to load a calibration batch: {}".format(e))
+        return None
+    if inputs_gpu is not None:
+        self.current_batch_idx += self.batch_size
+    return inputs_gpu
+
+
 def read_calibration_cache(self):
     if self.cache_file and self.use_cache:
         if os.path.exists(self.cache_file):
@@ -73,6 +224,11 @@ class DataLoaderCalibrator(object):
         cache_file: path to cache file.
         use_cache: flag which enables usage of pre-existing cache.
         device: device on which calibration data is copied to.
+        prefetch_batches: number of batches loaded, staged in pinned memory and copied to the device
+            on a background thread ahead of TensorRT. Default to 0, loading each batch when TensorRT
+            requests it.
+        reuse_device_buffers: with prefetch_batches, copy the batches into a fixed pool of device
+            buffers instead of allocating new ones for each batch.
     """
 
     def __init__(self, **kwargs):
@@ -84,6 +240,8 @@ class DataLoaderCalibrator(object):
         cache_file = kwargs.get("cache_file", None)
         use_cache = kwargs.get("use_cache", False)
         device = kwargs.get("device", torch.device("cuda:0"))
+        prefetch_batches = kwargs.get("prefetch_batches", 0)
+        reuse_device_buffers = kwargs.get("reuse_device_buffers", False)
 
         if not isinstance(dataloader, torch.utils.data.DataLoader):
             log(
@@ -108,17 +266,29 @@ class DataLoaderCalibrator(object):
                     "Input cache file is None but use_cache is set to True in INT8 mode.",
                 )
 
+        if use_cache:
+            batch_getter = get_cache_mode_batch
+        elif prefetch_batches > 0:
+            batch_getter = get_prefetched_batch
+        else:
+            batch_getter = get_batch
+
         # Define attributes and member functions for the calibrator class
         attribute_mapping = {
             "data_loader": dataloader,
             "current_batch_idx": 0,
             "batch_size": dataloader.batch_size,
-            "dataset_iterator": iter(dataloader),
+            "dataset_iterator": iter(dataloader) if prefetch_batches <= 0 else None,
+            "prefetcher": _BatchPrefetcher(
+                dataloader, device, prefetch_batches, reuse_device_buffers
+            )
+            if prefetch_batches > 0 and not use_cache
+            else None,
             "cache_file": cache_file,
             "device": device,
             "use_cache": use_cache,
             "get_batch_size": get_batch_size,
-            "get_batch": get_cache_mode_batch if use_cache else get_batch,
+            "get_batch": batch_getter,
             "read_calibration_cache": read_calibration_cache,
             "write_calibration_cache": write_calibration_cache,
             "__reduce__": __reduce__,  # used when you deepcopy the DataLoaderCalibrator object
@@ -50,8 +50,7 @@ def compute_accuracy(testing_dataloader, model):
 
 
 class TestAccuracy(unittest.TestCase):
-    def test_compile_script(self):
-
+    def setUp(self):
         self.model = (
             torch.jit.load(MODULE_DIR + "/trained_vgg16.jit.pt").eval().to("cuda")
         )
@@ -73,12 +72,15 @@ class TestAccuracy(unittest.TestCase):
         self.testing_dataloader = torch.utils.data.DataLoader(
             self.testing_dataset, batch_size=1, shuffle=False, num_workers=1
         )
+
+    def _check_calibration(self, **calibrator_kwargs):
         self.calibrator = torchtrt.ptq.DataLoaderCalibrator(
             self.testing_dataloader,
             cache_file="./calibration.cache",
             use_cache=False,
             algo_type=torchtrt.ptq.CalibrationAlgo.ENTROPY_CALIBRATION_2,
             device=torch.device("cuda:0"),
+            **calibrator_kwargs,
         )
 
         compile_spec = {
@@ -103,6 +105,12 @@ class TestAccuracy(unittest.TestCase):
         acc_diff = fp32_test_acc - int8_test_acc
         self.assertTrue(abs(acc_diff) < 3)
 
+    def test_compile_script(self):
+        self._check_calibration()
+
+    def test_compile_script_prefetch(self):
+        self._check_calibration(prefetch_batches=8, reuse_device_buffers=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,356 @@
+"""
+CPU benchmark of the FX lowering pipeline.
+
+Times the Python compile stages (tracing, acc normalization, shape
+propagation, splitting, partitioning, CSE and the fuse passes) on synthetic
+graphs. No GPU is needed, engines are never built.
+
+Run the suite and save the results as a baseline:
+
+    python compile_benchmark.py --output baseline.json
+
+Compare a later run against it, exiting with status 1 on regressions:
+
+    python compile_benchmark.py --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import copy
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import torch
+import torch.nn as nn
+
+import torch_tensorrt.fx.tracer.acc_tracer.acc_normalizer as acc_normalizer
+import torch_tensorrt.fx.tracer.acc_tracer.acc_tracer as acc_tracer
+from torch_tensorrt.fx.converter_registry import load_converters
+from torch_tensorrt.fx.lower_setting import LowerSetting
+from torch_tensorrt.fx.passes.graph_opts import common_subexpression_elimination
+from torch_tensorrt.fx.passes.lower_basic_pass import (
+    fix_reshape_batch_dim,
+    run_const_fold,
+)
+from torch_tensorrt.fx.passes.lower_pass_manager_builder import wrapper
+from torch_tensorrt.fx.tools.trt_splitter import TRTSplitter
+from torch_tensorrt.fx.tracer.acc_tracer.acc_shape_prop import AccShapeProp
+
+BASELINE_FORMAT_VERSION = 1
+
+
+# Synthetic models
+class DeepMLP(nn.Module):
+    def __init__(self, depth=64, width=256):
+        super().__init__()
+        self.layers = nn.ModuleList(nn.Linear(width, width) for _ in range(depth))
+
+    def forward(self, x):
+        for layer in self.layers:
+            x = torch.relu(layer(x))
+        return x
+
+
+class TransformerBlock(nn.Module):
+    def __init__(self, dim, heads):
+        super().__init__()
+        self.heads = heads
+        self.qkv = nn.Linear(dim, 3 * dim)
+        self.proj = nn.Linear(dim, dim)
+        self.norm1 = nn.LayerNorm(dim)
+        self.norm2 = nn.LayerNorm(dim)
+        self.fc1 = nn.Linear(dim, 4 * dim)
+        self.fc2 = nn.Linear(4 * dim, dim)
+
+    def forward(self, x):
+        batch, seq, dim = x.shape
+        q, k, v = self.qkv(self.norm1(x)).chunk(3, dim=-1)
+        q = q.reshape(batch, seq, self.heads, -1).permute(0, 2, 1, 3)
+        k = k.reshape(batch, seq, self.heads, -1).permute(0, 2, 3, 1)
+        v = v.reshape(batch, seq, self.heads, -1).permute(0, 2, 1, 3)
+        attention = torch.softmax(torch.matmul(q, k) * (dim // self.heads) ** -0.5, -1)
+        out = torch.matmul(attention, v).permute(0, 2, 1, 3).reshape(batch, seq, dim)
+        x = x + self.proj(out)
+        return x + self.fc2(nn.functional.gelu(self.fc1(self.norm2(x))))
+
+
+class Transformer(nn.Module):
+    def __init__(self, depth=48, dim=128, heads=4):
+        super().__init__()
+        self.blocks = nn.ModuleList(TransformerBlock(dim, heads) for _ in range(depth))
+
+    def forward(self, x):
+        for block in self.blocks:
+            x = block(x)
+        return x
+
+
+class WideEmbeddingBag(nn.Module):
+    def __init__(self, tables=64, rows=1000, dim=32):
+        super().__init__()
+        self.bags = nn.ModuleList(
+            nn.EmbeddingBag(rows, dim, mode="sum") for _ in range(tables)
+        )
+        self.top = nn.Sequential(
+            nn.Linear(tables * dim, 256), nn.ReLU(), nn.Linear(256, 1)
+        )
+
+    def forward(self, indices, offsets):
+        pooled = [bag(indices[i], offsets) for i, bag in enumerate(self.bags)]
+        return torch.sigmoid(self.top(torch.cat(pooled, dim=1)))
+
+
+class ManyBranch(nn.Module):
+    def __init__(self, branches=64, width=64):
+        super().__init__()
+        self.branches = nn.ModuleList(nn.Linear(width, width) for _ in range(branches))
+
+    def forward(self, x):
+        outputs = []
+        for branch in self.branches:
+            # The repeated relu(x) and its scaling are left for CSE to merge.
+            shared = torch.relu(x) * 2.0
+            outputs.append(torch.sigmoid(branch(shared)) + shared)
+        return torch.cat(outputs, dim=1).sum(dim=1)
+
+
+def _embedding_bag_inputs(tables=64, rows=1000, batch=32, pooling=8):
+    indices = torch.randint(0, rows, (tables, batch * pooling))
+    offsets = torch.arange(0, batch * pooling, pooling)
+    return [indices, offsets]
+
+
+MODELS: Dict[str, Callable[[], Tuple[nn.Module, List[Any]]]] = {
+    "deep_mlp": lambda: (DeepMLP(), [torch.randn(8, 256)]),
+    "transformer_48": lambda: (Transformer(), [torch.randn(2, 32, 128)]),
+    "wide_embedding_bag": lambda: (WideEmbeddingBag(), _embedding_bag_inputs()),
+    "many_branch": lambda: (ManyBranch(), [torch.randn(8, 64)]),
+}
+
+
+# Stages, each taking the model, its inputs and its traced graph and
+# returning a (setup, run) pair, run being timed on the result of setup.
+def _trace(model, inputs, traced):
+    return (lambda: None, lambda _: acc_tracer.trace(model, inputs))
+
+
+def _normalize(model, inputs, traced):
+    unnormalized = acc_tracer.trace(model, inputs, use_acc_normalization=False)
+    return _on_copy(unnormalized, acc_normalizer.normalize)
+
+
+def _shape_prop(model, inputs, traced):
+    return _on_copy(traced, lambda gm: AccShapeProp(gm).propagate(*inputs))
+
+
+def _split(model, inputs, traced):
+    return _on_copy(traced, lambda gm: TRTSplitter(gm, inputs).generate_split_results())
+
+
+def _partition(model, inputs, traced):
+    try:
+        from torch_tensorrt.dynamo.backend.lowering._partition import (
+            TorchTensorRTOperatorSupport,
+            TRTPartitioner,
+        )
+    except (ImportError, RuntimeError):
+        # The dynamo frontend requires torch 2, and importing it queries the
+        # current CUDA device, which fails on CPU only hosts.
+        return None
+    return _on_copy(
+        traced,
+        lambda gm: TRTPartitioner(
+            gm, TorchTensorRTOperatorSupport()
+        ).partition_and_fuse(),
+    )
+
+
+def _cse(model, inputs, traced):
+    return _on_copy(traced, common_subexpression_elimination)
+
+
+def _lower_passes(model, inputs, traced):
+    # The passes of LowerPassManagerBuilder._const_fold_pass and
+    # graph_optimization_pass, except the tracing and CSE, timed separately.
+    fuse_passes = LowerSetting().lower_basic_fuse_pass.passes
+    passes = [
+        run_const_fold,
+        *(wrapper(p, inputs) for p in fuse_passes),
+        fix_reshape_batch_dim,
+    ]
+
+    def run(gm):
+        for p in passes:
+            gm = p(gm)
+        return gm
+
+    return _on_copy(traced, run)
+
+
+def _on_copy(gm: torch.fx.GraphModule, fn: Callable) -> Tuple[Callable, Callable]:
+    """A (setup, run) pair running `fn` on a fresh copy of `gm`, copied untimed."""
+    return (lambda: copy.deepcopy(gm), fn)
+
+
+STAGES: Dict[str, Callable] = {
+    "trace": _trace,
+    "normalize": _normalize,
+    "shape_prop": _shape_prop,
+    "split": _split,
+    "partition": _partition,
+    "cse": _cse,
+    "lower_passes": _lower_passes,
+}
+
+
+def time_stage(
+    stage: Optional[Tuple[Callable, Callable]], repeat: int
+) -> Optional[Dict[str, float]]:
+    """
+    Min and median seconds of `repeat` runs of a (setup, run) stage, after a
+    warmup run, None if the stage is not available.
+    """
+    if stage is None:
+        return None
+    setup, run = stage
+    run(setup())
+    timings = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def run_suite(
+    models: Sequence[str], stages: Sequence[str], repeat: int
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    load_converters()
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for model_name in models:
+        torch.manual_seed(0)
+        model, inputs = MODELS[model_name]()
+        model.eval()
+        traced = acc_tracer.trace(model, inputs)
+        print(f"{model_name}: {len(traced.graph.nodes)} nodes", flush=True)
+        results[model_name] = {}
+        for stage_name in stages:
+            timing = time_stage(STAGES[stage_name](model, inputs, traced), repeat)
+            if timing is None:
+                print(f"  {stage_name:<14} skipped", flush=True)
+                continue
+            results[model_name][stage_name] = timing
+            print(
+                f"  {stage_name:<14} {timing['median'] * 1000:10.1f} ms "
+                f"(min {timing['min'] * 1000:.1f} ms)",
+                flush=True,
+            )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    threshold: float,
+    min_delta: float,
+) -> List[str]:
+    """
+    Stages whose median got slower than the baseline by more than `threshold`
+    (relative) and `min_delta` seconds.
+    """
+    regressions = []
+    for model_name, stages in results.items():
+        for stage_name, timing in stages.items():
+            base = baseline.get(model_name, {}).get(stage_name)
+            if base is None:
+                continue
+            now, before = timing["median"], base["median"]
+            if now > before * (1 + threshold) and now - before > min_delta:
+                regressions.append(
+                    f"{model_name}/{stage_name}: {before * 1000:.1f} ms -> "
+                    f"{now * 1000:.1f} ms (+{(now / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="CPU benchmark of the FX lowering pipeline"
+    )
+    arg_parser.add_argument(
+        "--models",
+        default=",".join(MODELS),
+        help="Comma separated models to run, among " + ", ".join(MODELS),
+    )
+    arg_parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help="Comma separated stages to time, among " + ", ".join(STAGES),
+    )
+    arg_parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed runs per stage"
+    )
+    arg_parser.add_argument("--output", help="Path of the JSON results to write")
+    arg_parser.add_argument(
+        "--baseline", help="Path of JSON results to compare against"
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown of a stage median flagged as a regression",
+    )
+    arg_parser.add_argument(
+        "--min_delta",
+        type=float,
+        default=0.005,
+        help="Slowdown in seconds below which a stage is never flagged, to ignore noise",
+    )
+    args = arg_parser.parse_args()
+
+    models = args.models.split(",")
+    stages = args.stages.split(",")
+    for name, known in ((models, MODELS), (stages, STAGES)):
+        unknown = set(name) - set(known)
+        if unknown:
+            arg_parser.error(f"Unknown {sorted(unknown)}, expected among {list(known)}")
+
+    results = run_suite(models, stages, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "version": BASELINE_FORMAT_VERSION,
+                    "torch": torch.__version__,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Saved the results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("version") != BASELINE_FORMAT_VERSION:
+            sys.exit(f"Unsupported baseline format in {args.baseline}")
+        regressions = compare(
+            results, baseline["results"], args.threshold, args.min_delta
+        )
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regression against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()